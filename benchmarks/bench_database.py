@@ -0,0 +1,73 @@
+"""Compares the write throughput of InstagramDatabase with the previous write path that grew a pandas.DataFrame one row at a time
+and rewrote the whole csv file after every post. Uses synthetic rows, no browser or network needed.
+
+Run from the root of the project:
+    python benchmarks/bench_database.py -rows 20000 -rows-per-post 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import InstagramDatabase
+from src.records import Entry
+
+COLUMNS = ["post_url", "is_post", "commenter", "text", "replies_to", "replies_count", "likes", "date", "crawl_time"]
+
+def synthetic_rows(n_rows, rows_per_post):
+    """Yields (uuid, entry) tuples that look like the rows crawl_post() produces.
+    """
+    for i in range(n_rows):
+        post = i // rows_per_post
+        yield uuid.uuid4(), Entry(f"https://www.instagram.com/p/post{post}/", i % rows_per_post == 0, f"user{i % 997}", f"synthetic comment number {i}", None, i % 5, f"{i % 1000} likes", "2022-12-01T01:40:25.000Z", datetime.now())
+
+def legacy_write(directory, rows, rows_per_post):
+    """Previous write path: df.loc[uuid] = entry per row and a full to_csv() per post.
+    """
+    path = os.path.join(directory, "legacy.csv")
+    df = pd.DataFrame(columns=COLUMNS)
+    for i, (post_uuid, entry) in enumerate(rows):
+        df.loc[post_uuid] = list(entry.as_tuple())
+        if (i + 1) % rows_per_post == 0:
+            df.to_csv(path)
+    df.to_csv(path)
+
+def buffered_write(directory, rows, rows_per_post):
+    DB = InstagramDatabase(directory, "buffered")
+    for i, (post_uuid, entry) in enumerate(rows):
+        DB.add_entry(post_uuid, entry)
+        if (i + 1) % rows_per_post == 0:
+            DB.save_db_state()
+    DB.save_db_state()
+
+def measure(write_function, n_rows, rows_per_post):
+    rows = list(synthetic_rows(n_rows, rows_per_post))
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write_function(directory, rows, rows_per_post)
+        return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-rows', default=20000, type=int, help="Default: 20000. Number of synthetic rows to write.")
+    parser.add_argument('-rows-per-post', default=500, type=int, help="Default: 500. Rows written between two save_db_state() calls.")
+    parser.add_argument('-skip-legacy', action='store_true', help="If set, only the buffered write path is measured.")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.simplefilter(action='ignore', category=FutureWarning)
+
+    results = {"buffered": measure(buffered_write, args.rows, args.rows_per_post)}
+    if not args.skip_legacy:
+        results["legacy"] = measure(legacy_write, args.rows, args.rows_per_post)
+
+    for name, seconds in results.items():
+        print(f"{name:>10}: {seconds:8.2f}s  {args.rows / seconds:10.0f} rows/s")
+    if "legacy" in results:
+        print(f"speedup: {results['legacy'] / results['buffered']:.1f}x")
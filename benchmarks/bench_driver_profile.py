@@ -0,0 +1,67 @@
+"""Compares the browser profiles of DRIVER_PROFILES in config.py on a media-heavy post page served by a local http server:
+seconds until driver.get() returns and until the comments can be read, bytes and requests served and the memory of the browser
+processes. Needs a local Chrome or Edge with its driver on the PATH, the memory is only measured if psutil is installed.
+Both profiles run headless here, so the difference leaves out the cost of a window.
+
+Run from the root of the project:
+    python benchmarks/bench_driver_profile.py -profiles full light
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+import config
+from src.browser import DriverProfile
+from src.instagram_crawler import get_selector
+from fixtures import media_post_page, write_media_fixtures, write_fixture, serve_directory, local_driver, browser_memory_mb
+
+def bench_profile(name, post_urls, stats, browser):
+    driver = local_driver(browser, profile=DriverProfile.from_config(name))
+    try:
+        stats.clear()
+        get_seconds = []
+        ready_seconds = []
+        for post_url in post_urls:
+            start = time.perf_counter()
+            driver.get(post_url)
+            get_seconds.append(time.perf_counter() - start)
+            WebDriverWait(driver, 30).until(EC.presence_of_element_located(get_selector("ALL_COMMENTS_CONTAINER")))
+            ready_seconds.append(time.perf_counter() - start)
+        # memory after all posts, like a worker after a while
+        memory = browser_memory_mb()
+    finally:
+        driver.quit()
+    return {
+        "profile": name, "get_s": sum(get_seconds) / len(post_urls), "ready_s": sum(ready_seconds) / len(post_urls),
+        "mb_per_post": stats.get("bytes", 0) / len(post_urls) / 2**20, "requests_per_post": stats.get("requests", 0) / len(post_urls), "memory_mb": memory,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-profiles', default=list(config.DRIVER_PROFILES), nargs="+", choices=list(config.DRIVER_PROFILES), help="Default: all profiles of config.py.")
+    parser.add_argument('-posts', default=5, type=int, help="Default: 5. Number of post pages loaded per profile.")
+    parser.add_argument('-comments', default=100, type=int, help="Default: 100. Comments per post.")
+    parser.add_argument('-images', default=12, type=int, help="Default: 12. Images per post.")
+    parser.add_argument('-video-mb', default=4, type=int, help="Default: 4. Size of the video of every post.")
+    parser.add_argument('-browser', default="chrome", choices=["chrome", "edge"], help="Default: chrome.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_media_fixtures(os.path.join(directory, "media"), n_images=args.images, video_mb=args.video_mb)
+        for i in range(args.posts):
+            write_fixture(os.path.join(directory, "p", f"post{i}"), "index.html", media_post_page(args.comments, n_images=args.images, post_id=i))
+        stats = {}
+        server, base_url = serve_directory(directory, stats)
+        post_urls = [f"{base_url}p/post{i}/" for i in range(args.posts)]
+        try:
+            for name in args.profiles:
+                result = bench_profile(name, post_urls, stats, args.browser)
+                memory = "n/a" if result["memory_mb"] is None else f"{result['memory_mb']:.0f} MB"
+                print(f"{name:>8}: get {result['get_s']:6.2f}s  readable {result['ready_s']:6.2f}s  {result['mb_per_post']:7.2f} MB/post  {result['requests_per_post']:5.1f} requests/post  browser memory {memory}")
+        finally:
+            server.shutdown()
@@ -0,0 +1,52 @@
+"""Compares the extraction phase of crawl_post with one WebDriver command per element ("elements") against the single
+execute_script extraction ("bulk") on a local post fixture. Needs a local Chrome or Edge with its driver on the PATH.
+
+Run from the root of the project:
+    python benchmarks/bench_extraction.py -comments 1000 -replies 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import InstagramDatabase
+from src.instagram_crawler import InstagramCrawler
+from fixtures import post_page, write_fixture, local_driver
+
+def measure(driver, url, extraction, batch_size):
+    """Loads the fixture and returns the seconds spent extracting and the number of entries added to the database.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        DB = InstagramDatabase(directory, "bench")
+        crawler = InstagramCrawler(driver, DB, extraction=extraction, extraction_batch_size=batch_size)
+        crawler.go_to_link(url)
+        driver.implicitly_wait(3)
+        start = time.perf_counter()
+        if extraction == "bulk":
+            crawler.extract_comments_with_script(url, "bench")
+        else:
+            crawler.extract_comments_with_elements(url, "bench")
+        seconds = time.perf_counter() - start
+        return seconds, len(DB.df)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-comments', default=1000, type=int, help="Default: 1000. Number of comments on the fixture page.")
+    parser.add_argument('-replies', default=2, type=int, help="Default: 2. Number of replies per comment.")
+    parser.add_argument('-batch-size', default=None, type=int, help="Default: None. Comments per execute_script call in bulk mode.")
+    parser.add_argument('-browser', default="chrome", choices=["chrome", "edge"], help="Default: chrome.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fixture_directory:
+        url = write_fixture(fixture_directory, "post.html", post_page(args.comments, args.replies))
+        driver = local_driver(args.browser)
+        try:
+            results = {extraction: measure(driver, url, extraction, args.batch_size) for extraction in ["bulk", "elements"]}
+        finally:
+            driver.quit()
+
+    for extraction, (seconds, entries) in results.items():
+        print(f"{extraction:>10}: {seconds:8.2f}s  {entries} entries  {entries / seconds:10.0f} entries/s")
+    print(f"speedup: {results['elements'][0] / results['bulk'][0]:.1f}x")
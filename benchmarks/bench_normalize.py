@@ -0,0 +1,106 @@
+"""Measures src.normalize.normalize_frame() on a synthetic frame of raw scraped values: likes in several formats ("1,234 likes",
+"12.3K likes", "Like", missing), ISO date strings and replies counts mixed with missing values. Compares it with a row by row
+cleanup through Series.apply, which is timed on a sample and extrapolated, and with normalizing the frame in flush sized blocks
+like InstagramDatabase(normalize=True) does. No browser or network needed, 10M rows need about 3 GB of memory.
+
+Run from the root of the project:
+    python benchmarks/bench_normalize.py -rows 10000000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.normalize import normalize_frame
+
+def pool(values):
+    return np.array(values, dtype=object)
+
+def synthetic_frame(rows, seed = 0):
+    """Raw entries as the csv backend reads them, drawn from pools of distinct values like a real account: few posts and
+    like counts, many commenters and dates.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.minimum(rng.zipf(1.6, 20000), 5000000)
+    likes = pool([None, "Like"] + [f"{n:,} likes" if n < 10000 else f"{n / 1000:.1f}K likes" for n in counts])
+    seconds = rng.integers(0, 365 * 24 * 3600, 200000)
+    dates = pool(pd.Timestamp("2022-01-01") + pd.to_timedelta(seconds, unit="s")).astype(object)
+    dates = pool([date.strftime("%Y-%m-%dT%H:%M:%S.000Z") for date in dates])
+    crawl_times = pool([date.replace("T", " ").replace(".000Z", ".123456") for date in dates[:1000]])
+    post_urls = pool([f"https://www.instagram.com/p/post{i}/" for i in range(2000)])
+    commenters = pool([f"user{i}" for i in range(100000)])
+    texts = pool([f"synthetic comment number {i}" for i in range(100000)])
+    replies_counts = pool([None] + list(range(50)))
+
+    def take(values, distribution = None):
+        return values[rng.integers(0, len(values), rows) if distribution is None else distribution]
+
+    return pd.DataFrame({
+        "post_url": take(post_urls),
+        "is_post": rng.random(rows) < 0.001,
+        "commenter": take(commenters),
+        "text": take(texts),
+        "replies_to": take(pool([None, "00e608ee-df46-556e-a4c4-3441f19a768a"])),
+        "replies_count": take(replies_counts),
+        "likes": take(likes, np.minimum(rng.zipf(1.3, rows), len(likes) - 1)),
+        "date": take(dates),
+        "crawl_time": take(crawl_times),
+    })
+
+COUNT = re.compile(r"([\d.,]+)\s*([km])?", re.IGNORECASE)
+
+def parse_likes_row(value):
+    """Row by row cleanup of one likes value, as done in a notebook.
+    """
+    if not isinstance(value, str):
+        return None
+    match = COUNT.search(value)
+    if match is None:
+        return None
+    number, suffix = match.groups()
+    if suffix is None:
+        return int(number.replace(",", "").replace(".", ""))
+    return round(float(number.replace(",", ".")) * {"k": 1e3, "m": 1e6}[suffix.lower()])
+
+def normalize_rows(frame):
+    normalized = frame.copy()
+    normalized["likes"] = frame["likes"].apply(parse_likes_row)
+    normalized["replies_count"] = frame["replies_count"].apply(lambda value: None if value is None else int(value))
+    normalized["date"] = frame["date"].apply(lambda value: pd.Timestamp(value) if value is not None else pd.NaT)
+    normalized["crawl_time"] = frame["crawl_time"].apply(pd.Timestamp)
+    return normalized
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-rows', default=10000000, type=int, help="Default: 10000000. Rows of the synthetic frame.")
+    parser.add_argument('-apply-rows', default=200000, type=int, help="Default: 200000. Rows of the sample the row by row cleanup is timed on.")
+    parser.add_argument('-block-rows', default=10000, type=int, help="Default: 10000. Rows per block of the incremental run, the buffer size of InstagramDatabase.")
+    parser.add_argument('-blocks', default=100, type=int, help="Default: 100. Number of blocks of the incremental run.")
+    args = parser.parse_args()
+
+    frame, seconds = timed(lambda: synthetic_frame(args.rows))
+    print(f"built {len(frame):,} rows in {seconds:.1f}s")
+
+    sample = frame.iloc[:args.apply_rows]
+    _, seconds = timed(lambda: normalize_rows(sample))
+    print(f"row by row (apply): {seconds / len(sample) * 1e6:6.2f} us/row  {len(sample) / seconds:12,.0f} rows/s  ~{seconds / len(sample) * len(frame):7.1f}s for {len(frame):,} rows (extrapolated)")
+
+    normalized, seconds = timed(lambda: normalize_frame(frame))
+    print(f"vectorized:         {seconds / len(frame) * 1e6:6.2f} us/row  {len(frame) / seconds:12,.0f} rows/s  {seconds:8.1f}s for {len(frame):,} rows")
+    print(f"  {normalized['likes'].notna().sum():,} likes parsed, {normalized['date'].notna().sum():,} dates parsed, dtypes: {', '.join(f'{column}={dtype}' for column, dtype in normalized.dtypes.items())}")
+    del normalized
+
+    blocks = [frame.iloc[i * args.block_rows:(i + 1) * args.block_rows] for i in range(args.blocks)]
+    _, seconds = timed(lambda: [normalize_frame(block, categorical=False) for block in blocks])
+    rows = sum(len(block) for block in blocks)
+    print(f"per flush block:    {seconds / rows * 1e6:6.2f} us/row  {rows / seconds:12,.0f} rows/s  {seconds / len(blocks) * 1000:8.1f}ms per block of {args.block_rows:,} rows")
@@ -0,0 +1,99 @@
+"""Compares the query methods of InstagramDatabase, which use src.index.EntryIndex, with boolean masks over the whole df: entries of
+a post, entries of a commenter, the thread of a comment and per post aggregates. Also measures building the index from df and the
+cost of keeping it up to date in add_entry(). No browser or network needed.
+
+Run from the root of the project:
+    python benchmarks/bench_queries.py -posts 2000 -comments 250 -replies 2 -queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import InstagramDatabase, typed_frame
+from src.records import Entry
+
+def fill(DB, posts, comments, replies, seed = 0):
+    """Adds posts with comments and replies of a pool of commenters, returns the post urls and comment ids.
+    """
+    rng = random.Random(seed)
+    crawl_time = datetime(2022, 12, 1)
+    post_urls, comment_ids = [], []
+    for p in range(posts):
+        post_url = f"https://www.instagram.com/p/post{p}/"
+        post_urls.append(post_url)
+        DB.add_entry(f"{p}", Entry(post_url, True, "account", "caption", None, comments, f"{rng.randint(0, 99999):,} likes", "2022-12-01T01:40:25.000Z", crawl_time))
+        for c in range(comments):
+            comment_id = f"{p}-{c}"
+            comment_ids.append(comment_id)
+            DB.add_entry(comment_id, Entry(post_url, False, f"user{rng.randint(0, 49999)}", "comment", None, replies, f"{rng.randint(0, 999)} likes", "2022-12-01T01:40:25.000Z", crawl_time))
+            for r in range(replies):
+                DB.add_entry(f"{comment_id}-{r}", Entry(post_url, False, f"user{rng.randint(0, 49999)}", "reply", comment_id, None, "Like", "2022-12-01T01:40:25.000Z", crawl_time))
+    DB.save_db_state()
+    return post_urls, comment_ids
+
+def scan_thread(df, id):
+    """Thread of a comment by following replies_to with a mask over df per level.
+    """
+    levels = [df.loc[[id]]]
+    while len(levels[-1]) > 0:
+        levels.append(df[df["replies_to"].isin(levels[-1].index)])
+    return pd.concat(levels)
+
+def scan_stats(df):
+    typed = typed_frame(df)
+    is_reply = typed["replies_to"].notna()
+    comments = typed[~typed["is_post"].astype(bool)]
+    return comments.groupby([comments["post_url"].astype(str), is_reply[comments.index]], observed=True)["likes"].agg(["count", "sum"])
+
+def per_query(function, values):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return (time.perf_counter() - start) / len(values)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-posts', default=2000, type=int, help="Default: 2000. Number of posts.")
+    parser.add_argument('-comments', default=250, type=int, help="Default: 250. Comments per post.")
+    parser.add_argument('-replies', default=2, type=int, help="Default: 2. Replies per comment.")
+    parser.add_argument('-queries', default=200, type=int, help="Default: 200. Queries per method, the scans run a tenth of them.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        DB = InstagramDatabase(directory, "bench", buffer_size=100000)
+        post_urls, comment_ids = fill(DB, args.posts, args.comments, args.replies)
+        rng = random.Random(1)
+        df = DB.df
+        print(f"{len(df):,} entries")
+
+        start = time.perf_counter()
+        DB.index
+        print(f"index built from df in {time.perf_counter() - start:.2f}s")
+
+        queries = {
+            "entries of post": ([rng.choice(post_urls) for _ in range(args.queries)], DB.entries_of_post, lambda value: df[df["post_url"] == value]),
+            "entries of commenter": ([f"user{rng.randint(0, 49999)}" for _ in range(args.queries)], DB.entries_of_commenter, lambda value: df[df["commenter"] == value]),
+            "thread of comment": ([rng.choice(comment_ids) for _ in range(args.queries)], DB.thread, lambda value: scan_thread(df, value)),
+            "stats of all posts": ([None] * max(args.queries // 100, 1), DB.post_stats, lambda value: scan_stats(df)),
+        }
+        for name, (values, indexed, scan) in queries.items():
+            indexed_seconds = per_query(indexed, values)
+            scan_seconds = per_query(scan, values[:max(len(values) // 10, 1)])
+            print(f"{name:>20}: index {indexed_seconds * 1000:9.3f}ms  scan {scan_seconds * 1000:9.3f}ms  {scan_seconds / indexed_seconds:8.0f}x")
+
+        # add_entry() with and without an index to keep up to date
+        for indexed in [False, True]:
+            other = InstagramDatabase(directory, f"add{indexed}", buffer_size=100000)
+            if indexed:
+                other.index
+            start = time.perf_counter()
+            fill(other, max(args.posts // 10, 1), args.comments, args.replies)
+            seconds = time.perf_counter() - start
+            print(f"add_entry {'with' if indexed else 'without'} index: {seconds / len(other.df) * 1e6:6.2f} us/entry")
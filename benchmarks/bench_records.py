@@ -0,0 +1,65 @@
+"""Compares building the entries of a post as pandas.Series, as the crawler did before, with src.records.Entry, both added to
+the csv database and saved. Measures the time and allocated memory per entry, no browser or network needed.
+
+Run from the root of the project:
+    python benchmarks/bench_records.py -entries 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import InstagramDatabase, entry_key
+from src.records import Entry
+
+POST_URL = "https://www.instagram.com/p/post/"
+
+def comment(i):
+    # new strings per comment, like the ones the driver returns
+    return "".join(["user", str(i % 997)]), f"synthetic comment number {i}", f"{i % 1000} likes", "2022-12-01T01:40:25.000Z"
+
+def series_entries(n):
+    for i in range(n):
+        owner, text, likes, date = comment(i)
+        yield entry_key(POST_URL, owner, date, text), pd.Series({
+            "post_url": POST_URL, "is_post": False, "commenter": owner, "text": text, "replies_to": None,
+            "replies_count": 0, "likes": likes, "date": date, "crawl_time": datetime.now()
+        })
+
+def record_entries(n):
+    crawl_time = datetime.now()
+    for i in range(n):
+        owner, text, likes, date = comment(i)
+        yield entry_key(POST_URL, owner, date, text), Entry(POST_URL, False, sys.intern(owner), text, None, 0, likes, date, crawl_time)
+
+def measure(make_entries, n, memory):
+    with tempfile.TemporaryDirectory() as directory:
+        DB = InstagramDatabase(directory, "bench", buffer_size=n + 1)
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        for key, entry in make_entries(n):
+            DB.add_entry(key, entry)
+        added = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if memory else None
+        if memory:
+            tracemalloc.stop()
+        DB.save_db_state()
+        return added, time.perf_counter() - start, peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-entries', default=50000, type=int, help="Default: 50000. Entries of the synthetic post.")
+    parser.add_argument('-memory', action='store_true', help="If set, also measures the peak of allocated memory until the save with tracemalloc, which makes the timings slower.")
+    args = parser.parse_args()
+
+    for name, make_entries in [("pd.Series", series_entries), ("Entry", record_entries)]:
+        added, total, peak = measure(make_entries, args.entries, args.memory)
+        memory = "" if peak is None else f"  peak {peak:7.1f} MB"
+        print(f"{name:>10}: {added / args.entries * 1e6:7.2f} us/entry until added  {total:7.2f}s with save{memory}")
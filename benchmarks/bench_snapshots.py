@@ -0,0 +1,67 @@
+"""Compares the time the browser is busy extracting a loaded post in the "elements", "bulk" and "snapshot" extraction modes,
+and how fast a pool of processes parses the stored snapshots afterwards. The posts are served by the fake driver of
+fake_driver.py, whose commands cost no round trip, so the elements and bulk numbers are a lower bound of a real browser.
+Needs lxml and cssselect.
+
+Run from the root of the project:
+    python benchmarks/bench_snapshots.py -posts 4 -comments 1000 -replies 2 -processes 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import open_database
+from src.instagram_crawler import InstagramCrawler
+from src.profiling import CrawlProfiler
+from src.snapshots import SnapshotParser, SnapshotStore
+from fake_driver import FakeDriver, FakeSite
+
+def bench_extraction(extraction, site, post_urls, directory, processes):
+    profiler = CrawlProfiler()
+    DB = open_database(directory, extraction)
+    store = SnapshotStore(os.path.join(directory, "snapshots"))
+    parser = SnapshotParser(processes) if extraction == "snapshot" else None
+    crawler = InstagramCrawler(FakeDriver(site), DB, extraction=extraction, profiler=profiler, snapshot_store=store, snapshot_parser=parser)
+    start = time.perf_counter()
+    for post_url in post_urls:
+        crawler.crawl_post(post_url, "bench")
+    crawled = time.perf_counter() - start
+    if parser is not None:
+        parser.close()
+    phases = {row["phase"]: row["total_s"] for row in profiler.summary()[0]}
+    browser_seconds = phases.get("snapshot" if extraction == "snapshot" else "extraction", 0)
+    return {"extraction": extraction, "browser_s": browser_seconds / len(post_urls), "crawled_s": crawled, "done_s": time.perf_counter() - start, "entries": len(DB.df)}
+
+def bench_parse(directory, processes):
+    store = SnapshotStore(os.path.join(directory, "snapshots"))
+    paths = store.paths("bench")
+    DB = open_database(directory, f"parsed{processes}")
+    parser = SnapshotParser(processes)
+    start = time.perf_counter()
+    entries = parser.parse(paths, DB)
+    seconds = time.perf_counter() - start
+    parser.close()
+    kb = sum(os.path.getsize(path) for path in paths) / len(paths) / 1024
+    return {"processes": processes, "seconds": seconds, "entries": entries, "posts_per_s": len(paths) / seconds, "kb_per_snapshot": kb}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-posts', default=4, type=int, help="Default: 4. Number of posts crawled per extraction mode.")
+    parser.add_argument('-comments', default=1000, type=int, help="Default: 1000. Comments per post.")
+    parser.add_argument('-replies', default=2, type=int, help="Default: 2. Replies per comment.")
+    parser.add_argument('-page-size', default=250, type=int, help="Default: 250. Comments rendered per click on 'Load more comments'.")
+    parser.add_argument('-processes', default=4, type=int, help="Default: 4. Worker processes parsing the snapshots.")
+    args = parser.parse_args()
+
+    site = FakeSite(n_comments=args.comments, replies_per_comment=args.replies, page_size=args.page_size, n_posts=args.posts)
+    post_urls = site.post_urls("bench")
+    with tempfile.TemporaryDirectory() as directory:
+        for extraction in InstagramCrawler.EXTRACTION_MODES:
+            result = bench_extraction(extraction, site, post_urls, directory, args.processes)
+            print(f"{extraction:>9}: browser busy {result['browser_s']:7.3f}s/post extracting  {result['crawled_s']:7.2f}s crawled  {result['done_s']:7.2f}s until saved  {result['entries']} entries")
+        for processes in sorted({1, args.processes}):
+            result = bench_parse(directory, processes)
+            print(f"parse {processes:>2} process(es): {result['seconds']:6.2f}s  {result['posts_per_s']:6.2f} posts/s  {result['entries']} entries  {result['kb_per_snapshot']:.0f} KB/snapshot")
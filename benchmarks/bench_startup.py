@@ -0,0 +1,81 @@
+"""Measures the startup costs of crawl.py that come before the browser: importing its modules in a fresh interpreter, with and
+without the modules that are only imported for optional features, and resolving the driver with resolve_driver_path() from the
+cache, from the PATH and from a fake driver manager that stands in for webdriver_manager's online lookup. No browser or network needed.
+
+Run from the root of the project:
+    python benchmarks/bench_startup.py -runs 5
+"""
+import argparse
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from src.browser import resolve_driver_path
+
+IMPORTS = {
+    "crawl.py": "import src.database, src.instagram_crawler, src.journal, src.profiling, src.browser, src.sessions, src.selector_registry",
+    "+ optional features": "import src.database, src.instagram_crawler, src.journal, src.profiling, src.browser, src.sessions, src.selector_registry, src.workers, src.tabs, src.watch, src.tracing, src.snapshots",
+    "+ webdriver_manager": "import src.database, src.instagram_crawler, src.journal, src.profiling, src.browser, src.sessions, src.selector_registry, webdriver_manager.microsoft",
+}
+
+def import_seconds(statement, runs):
+    """Best of runs wall times of a fresh interpreter that runs statement, minus the best time of an empty interpreter.
+    """
+    def best(code):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+            times.append(time.perf_counter() - start)
+        return min(times)
+    return best(statement) - best("pass")
+
+def per_call(function, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-runs', default=5, type=int, help="Default: 5. Interpreters started per import measurement, the best one counts.")
+    parser.add_argument('-calls', default=1000, type=int, help="Default: 1000. Calls per driver resolution.")
+    parser.add_argument('-lookup-seconds', default=1.0, type=float, help="Default: 1.0. Time the fake driver manager spends on the online lookup.")
+    args = parser.parse_args()
+
+    for name, statement in IMPORTS.items():
+        try:
+            print(f"{'import ' + name:>28}: {import_seconds(statement, args.runs):6.3f}s")
+        except subprocess.CalledProcessError:
+            print(f"{'import ' + name:>28}: not installed")
+
+    with tempfile.TemporaryDirectory() as directory:
+        driver_path = os.path.join(directory, "msedgedriver")
+        with open(driver_path, "w") as fp:
+            fp.write("")
+        os.chmod(driver_path, os.stat(driver_path).st_mode | stat.S_IXUSR)
+        cache_path = os.path.join(directory, "msedgedriver.json")
+
+        class EdgeChromiumDriverManager():
+            def install(self):
+                time.sleep(args.lookup_seconds)
+                return driver_path
+        module = types.ModuleType("webdriver_manager.microsoft")
+        module.EdgeChromiumDriverManager = EdgeChromiumDriverManager
+        with mock.patch.dict(sys.modules, {"webdriver_manager.microsoft": module}), mock.patch.dict(os.environ, {"PATH": ""}):
+            os.environ.pop("EDGE_DRIVER_PATH", None)
+            manager_seconds = per_call(lambda: resolve_driver_path(cache_path=cache_path, refresh=True), 1)
+            cache_seconds = per_call(lambda: resolve_driver_path(cache_path=cache_path), args.calls)
+            os.remove(cache_path)
+            os.environ["PATH"] = directory
+            path_seconds = per_call(lambda: resolve_driver_path(cache_path=cache_path, offline=True), args.calls)
+        print(f"{'driver from manager':>28}: {manager_seconds * 1000:9.3f}ms")
+        print(f"{'driver from cache':>28}: {cache_seconds * 1000:9.3f}ms")
+        print(f"{'driver from PATH':>28}: {path_seconds * 1000:9.3f}ms")
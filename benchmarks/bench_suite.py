@@ -0,0 +1,166 @@
+"""Offline benchmark suite: measures crawl_post on synthetic posts of several sizes, get_all_posts on a synthetic account page
+and the write/read throughput of the database backends. The pages are served by the fake driver of fake_driver.py, so neither a
+browser nor network access is needed. The results are saved as json to compare them between commits.
+
+Run from the root of the project:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py -quick -compare benchmarks/results/[earlier results].json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import BACKENDS, open_database, pa
+from src.instagram_crawler import InstagramCrawler
+from src.profiling import CrawlProfiler
+from src.snapshots import SnapshotParser, SnapshotStore
+from fake_driver import FakeDriver, FakeSite
+from bench_database import synthetic_rows
+
+def measured(function, memory):
+    """Runs function and returns its result, the seconds it took and the peak of traced memory in MB (None if memory is False).
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    return result, seconds, peak
+
+def bench_crawl_post(comments, replies_per_comment, extraction, latency_ms, memory):
+    site = FakeSite(n_comments=comments, replies_per_comment=replies_per_comment, latency_ms=latency_ms)
+    driver = FakeDriver(site)
+    profiler = CrawlProfiler()
+    with tempfile.TemporaryDirectory() as directory:
+        DB = open_database(directory, "bench")
+        parser = SnapshotParser(1) if extraction == "snapshot" else None
+        crawler = InstagramCrawler(driver, DB, extraction=extraction, profiler=profiler, snapshot_store=SnapshotStore(os.path.join(directory, "snapshots")), snapshot_parser=parser)
+
+        def crawl():
+            crawler.crawl_post(site.post_urls("bench")[0], "bench")
+            # snapshot mode is done once its snapshot is parsed
+            if parser is not None:
+                parser.close()
+
+        _, seconds, peak = measured(crawl, memory)
+        entries = len(DB.df)
+    rows, _ = profiler.summary()
+    return {
+        "benchmark": "crawl_post", "extraction": extraction, "comments": comments, "replies_per_comment": replies_per_comment,
+        "seconds": seconds, "entries": entries, "entries_per_s": entries / seconds, "commands": driver.commands, "peak_mb": peak,
+        "phases": {row["phase"]: row["total_s"] for row in rows},
+    }
+
+def bench_get_all_posts(posts, latency_ms, memory):
+    site = FakeSite(n_posts=posts, latency_ms=latency_ms)
+    driver = FakeDriver(site)
+    crawler = InstagramCrawler(driver, None)
+    # login isn't part of the benchmark
+    crawler.refresh_crawler = lambda logged_in = False: None
+    found, seconds, peak = measured(lambda: crawler.get_all_posts("bench"), memory)
+    return {"benchmark": "get_all_posts", "posts": posts, "seconds": seconds, "found": len(found), "posts_per_s": len(found) / seconds, "commands": driver.commands, "peak_mb": peak}
+
+def bench_database(backend, rows, rows_per_post, memory):
+    entries = list(synthetic_rows(rows, rows_per_post))
+    with tempfile.TemporaryDirectory() as directory:
+        def write():
+            DB = open_database(directory, "bench", backend)
+            for i, (post_uuid, entry) in enumerate(entries):
+                DB.add_entry(post_uuid, entry)
+                if (i + 1) % rows_per_post == 0:
+                    DB.save_db_state()
+            DB.save_db_state()
+            if hasattr(DB, "close"):
+                DB.close()
+        _, write_seconds, write_peak = measured(write, memory)
+        # a new database object reads what the first one saved
+        frame, read_seconds, read_peak = measured(lambda: open_database(directory, "bench", backend).df, memory)
+    return {
+        "benchmark": "database", "backend": backend, "rows": rows, "rows_per_post": rows_per_post,
+        "write_seconds": write_seconds, "write_rows_per_s": rows / write_seconds, "write_peak_mb": write_peak,
+        "read_seconds": read_seconds, "read_rows_per_s": len(frame) / read_seconds, "read_peak_mb": read_peak,
+    }
+
+def result_key(result):
+    """Identifies the same benchmark in two result files.
+    """
+    return tuple((name, value) for name, value in result.items() if name in ["benchmark", "extraction", "comments", "replies_per_comment", "posts", "backend", "rows"])
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def print_comparison(results, previous):
+    """Prints the ratio of every measured time to the same benchmark in an earlier result file, below 1 is faster.
+    """
+    earlier = {result_key(result): result for result in previous["results"]}
+    print(f"Compared to {previous['commit']} from {previous['time']}:")
+    for result in results:
+        other = earlier.get(result_key(result))
+        if other is None:
+            continue
+        ratios = [f"{name} {result[name] / other[name]:.2f}x" for name in ["seconds", "write_seconds", "read_seconds"] if name in result and other.get(name)]
+        print(f"  {dict(result_key(result))}: {', '.join(ratios)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-comments', default=[10, 1000, 10000], type=int, nargs="+", help="Default: 10 1000 10000. Comments per synthetic post.")
+    parser.add_argument('-replies', default=[0, 2], type=int, nargs="+", help="Default: 0 2. Replies per comment.")
+    parser.add_argument('-extraction', default=InstagramCrawler.EXTRACTION_MODES, nargs="+", choices=InstagramCrawler.EXTRACTION_MODES, help="Default: all modes.")
+    parser.add_argument('-posts', default=1200, type=int, help="Default: 1200. Posts on the synthetic account page.")
+    parser.add_argument('-rows', default=100000, type=int, help="Default: 100000. Rows written and read per database backend.")
+    parser.add_argument('-rows-per-post', default=500, type=int, help="Default: 500. Rows between two save_db_state() calls.")
+    parser.add_argument('-latency-ms', default=0, type=int, help="Default: 0. Milliseconds until the fake pages render new comments or posts.")
+    parser.add_argument('-memory', action='store_true', help="If set, also measures the peak memory with tracemalloc, which makes the timings slower.")
+    parser.add_argument('-quick', action='store_true', help="If set, only runs the small sizes: 10 and 1000 comments, 120 posts and 10000 rows.")
+    parser.add_argument('-output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"), help="Default: benchmarks/results/. Directory of the result files.")
+    parser.add_argument('-compare', help="Default: None. Path of an earlier result file to compare with.")
+    args = parser.parse_args()
+    if args.quick:
+        args.comments, args.posts, args.rows = [size for size in args.comments if size <= 1000], min(args.posts, 120), min(args.rows, 10000)
+
+    warnings.simplefilter(action='ignore', category=FutureWarning)
+    results = []
+    for comments in args.comments:
+        for replies_per_comment in args.replies:
+            for extraction in args.extraction:
+                result = bench_crawl_post(comments, replies_per_comment, extraction, args.latency_ms, args.memory)
+                results.append(result)
+                print(f"crawl_post {extraction:>8} {comments:>6} comments x {replies_per_comment} replies: {result['seconds']:8.2f}s  {result['entries_per_s']:8.0f} entries/s  {result['commands']} commands")
+    result = bench_get_all_posts(args.posts, args.latency_ms, args.memory)
+    results.append(result)
+    print(f"get_all_posts {args.posts} posts: {result['seconds']:8.2f}s  {result['posts_per_s']:8.0f} posts/s")
+    for backend in BACKENDS:
+        if backend == "parquet" and pa is None:
+            print("Skipping parquet, pyarrow isn't installed.")
+            continue
+        result = bench_database(backend, args.rows, args.rows_per_post, args.memory)
+        results.append(result)
+        print(f"database {backend:>8}: write {result['write_rows_per_s']:10.0f} rows/s  read {result['read_rows_per_s']:10.0f} rows/s")
+
+    report = {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(), "memory_traced": args.memory, "results": results}
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    with open(path, "w") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"Saved results to {path}")
+
+    if args.compare is not None:
+        with open(args.compare) as fp:
+            print_comparison(results, json.load(fp))
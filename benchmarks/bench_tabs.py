@@ -0,0 +1,69 @@
+"""Compares crawling posts with one browser per worker (CrawlWorkerPool) and with several tabs of one browser (TabPool):
+posts per minute, peak memory of the browsers and posts per minute per GB of that memory. The posts are served by a local http
+server, so no login is needed. Needs a local Chrome or Edge with its driver on the PATH, the memory is only measured if psutil
+is installed. With -fake, the posts are served by the fake driver of fake_driver.py instead, which measures how well the waits
+overlap without a browser, but not the memory.
+
+Run from the root of the project:
+    python benchmarks/bench_tabs.py -posts 12 -parallel 4
+    python benchmarks/bench_tabs.py -fake -posts 12 -parallel 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.browser import DriverProfile
+from src.database import InstagramDatabase
+from src.tabs import TabPool
+from src.workers import CrawlWorkerPool
+from fixtures import dynamic_post_page, write_fixture, serve_directory, local_driver, MemorySampler
+
+def bench_pool(mode, parallel, make_driver, post_urls, directory):
+    DB = InstagramDatabase(os.path.join(directory, "db"), f"{mode}{parallel}")
+    pool_class = TabPool if mode == "tabs" else CrawlWorkerPool
+    pool = pool_class(make_driver, DB, parallel, login=False)
+    with MemorySampler() as memory:
+        start = time.perf_counter()
+        states = pool.crawl(post_urls, "bench")
+        seconds = time.perf_counter() - start
+    done = sum(state == CrawlWorkerPool.DONE for state in states.values())
+    return {"mode": mode, "parallel": parallel, "seconds": seconds, "done": done, "entries": len(DB.df), "posts_per_min": done / seconds * 60, "peak_mb": memory.peak_mb}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-posts', default=12, type=int, help="Default: 12. Number of post pages served.")
+    parser.add_argument('-comments', default=60, type=int, help="Default: 60. Comments per post.")
+    parser.add_argument('-replies', default=1, type=int, help="Default: 1. Replies per comment.")
+    parser.add_argument('-latency-ms', default=500, type=int, help="Default: 500. Milliseconds until new comments are rendered.")
+    parser.add_argument('-parallel', default=4, type=int, help="Default: 4. Number of browsers, and of tabs of the one browser.")
+    parser.add_argument('-driver-profile', default="light", help="Default: light. Profile of DRIVER_PROFILES in config.py of every browser.")
+    parser.add_argument('-browser', default="chrome", choices=["chrome", "edge"], help="Default: chrome.")
+    parser.add_argument('-fake', action='store_true', help="If set, uses the fake driver instead of a browser.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        if args.fake:
+            from fake_driver import FakeDriver, FakeSite
+            site = FakeSite(n_comments=args.comments, replies_per_comment=args.replies, latency_ms=args.latency_ms)
+            make_driver = lambda: FakeDriver(site)
+            post_urls = site.post_urls("bench")[:args.posts]
+        else:
+            for i in range(args.posts):
+                write_fixture(os.path.join(directory, "p", f"post{i}"), "index.html", dynamic_post_page(args.comments, args.replies, latency_ms=args.latency_ms))
+            server, base_url = serve_directory(directory)
+            profile = DriverProfile.from_config(args.driver_profile)
+            make_driver = lambda: local_driver(args.browser, profile=profile)
+            post_urls = [f"{base_url}p/post{i}/" for i in range(args.posts)]
+        try:
+            for mode, parallel in [("drivers", 1), ("drivers", args.parallel), ("tabs", args.parallel)]:
+                result = bench_pool(mode, parallel, make_driver, post_urls, directory)
+                per_gb = "n/a" if not result["peak_mb"] else f"{result['posts_per_min'] / result['peak_mb'] * 1024:6.1f}"
+                memory = "n/a" if result["peak_mb"] is None else f"{result['peak_mb']:.0f} MB"
+                print(f"{parallel:>3} {mode:<8}: {result['seconds']:8.2f}s  {result['done']}/{args.posts} posts  {result['entries']} entries  {result['posts_per_min']:6.1f} posts/min  peak memory {memory}  {per_gb} posts/min per GB")
+        finally:
+            if server is not None:
+                server.shutdown()
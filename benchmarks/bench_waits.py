@@ -0,0 +1,80 @@
+"""Compares loading all comments and replies of a post with the previous fixed sleeps against the adaptive waits of InstagramCrawler
+on a local page that renders comments with a configurable latency. Needs a local Chrome or Edge with its driver on the PATH.
+
+Run from the root of the project:
+    python benchmarks/bench_waits.py -comments 150 -page-size 15 -latency-ms 500 -replies 1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from time import sleep
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from src.instagram_crawler import InstagramCrawler, get_selector
+from fixtures import dynamic_post_page, write_fixture, local_driver
+
+class FixedSleepCrawler(InstagramCrawler):
+    """InstagramCrawler with the fixed sleeps it used before the adaptive waits.
+    """
+
+    def load_all_comments(self, selector, query):
+        while True:
+            try:
+                sleep(1)
+                self.driver.implicitly_wait(0)
+                WebDriverWait(self.driver, 2).until(EC.element_to_be_clickable((selector, query))).click()
+                self.driver.implicitly_wait(3)
+                sleep(3)
+            except TimeoutException:
+                return
+
+    def load_all_comment_replies(self, selector, query):
+        while True:
+            try:
+                self.driver.implicitly_wait(0)
+                WebDriverWait(self.driver, 2).until(EC.element_to_be_clickable((selector, query))).click()
+                self.driver.implicitly_wait(3)
+                sleep(1)
+            except TimeoutException:
+                return
+
+def measure(crawler_class, driver, url):
+    """Loads all comments and replies of the fixture and returns the seconds it took and the number of comments and replies rendered.
+    """
+    crawler = crawler_class(driver, None)
+    crawler.go_to_link(url)
+    crawler.wait_for_page_to_load(*get_selector("WAIT_FOR_POST_TO_LOAD"))
+    start = time.perf_counter()
+    crawler.load_all_comments(*get_selector("LOAD_MORE_COMMENTS_BUTTON"))
+    crawler.load_all_comment_replies(*get_selector("VIEW_MORE_REPLIES_BUTTON"))
+    seconds = time.perf_counter() - start
+    driver.implicitly_wait(0)
+    comments = len(driver.find_elements(*get_selector("ALL_COMMENTS_CONTAINER")))
+    replies = len(driver.find_elements(*get_selector("REPLIES_TO_COMMENT_CONTAINER")))
+    return seconds, comments, replies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-comments', default=150, type=int, help="Default: 150. Number of comments on the fixture page.")
+    parser.add_argument('-page-size', default=15, type=int, help="Default: 15. Comments rendered per click on 'Load more comments'.")
+    parser.add_argument('-latency-ms', default=500, type=int, help="Default: 500. Milliseconds until new comments or replies are rendered.")
+    parser.add_argument('-replies', default=1, type=int, help="Default: 1. Replies per comment, loaded through 'View replies'.")
+    parser.add_argument('-browser', default="chrome", choices=["chrome", "edge"], help="Default: chrome.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fixture_directory:
+        url = write_fixture(fixture_directory, "post.html", dynamic_post_page(args.comments, args.replies, args.page_size, args.latency_ms))
+        driver = local_driver(args.browser)
+        try:
+            results = {name: measure(crawler_class, driver, url) for name, crawler_class in [("adaptive", InstagramCrawler), ("fixed", FixedSleepCrawler)]}
+        finally:
+            driver.quit()
+
+    for name, (seconds, comments, replies) in results.items():
+        print(f"{name:>10}: {seconds:8.2f}s  {comments} comments  {replies} replies")
+    print(f"speedup: {results['fixed'][0] / results['adaptive'][0]:.1f}x")
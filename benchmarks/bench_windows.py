@@ -0,0 +1,46 @@
+"""Compares the peak size of the page of a huge post in the "bulk" and "windowed" extraction modes: the number of DOM elements and
+characters of the page source after every step of the crawl, plus the crawl time and the number of entries. The post is served by
+the fake driver of fake_driver.py, so the page size stands in for the memory of the browser tab. Needs lxml and cssselect.
+
+Run from the root of the project:
+    python benchmarks/bench_windows.py -comments 5000 -replies 2 -windows 200 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import open_database
+from src.instagram_crawler import InstagramCrawler
+from src.waits import WaitBudget
+from fake_driver import FakeDriver, FakeSite
+
+def bench_mode(site, directory, extraction, window):
+    driver = FakeDriver(site)
+    DB = open_database(directory, f"{extraction}{window}")
+    crawler = InstagramCrawler(driver, DB, extraction=extraction, extraction_window=window)
+    # the fake page answers right away, only the idle detection is shortened
+    crawler.wait_budgets = {name: WaitBudget(timeout=5, appear=0.2, idle=0.2) for name in crawler.wait_budgets}
+    peak_elements = peak_chars = 0
+    start = time.perf_counter()
+    for step in crawler.crawl_post_steps(site.post_urls("bench")[0], "bench"):
+        peak_elements = max(peak_elements, sum(1 for _ in driver.page.root.iter()))
+        peak_chars = max(peak_chars, len(driver.page_source))
+    return {"seconds": time.perf_counter() - start, "peak_elements": peak_elements, "peak_chars": peak_chars, "entries": len(DB.df)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-comments', default=5000, type=int, help="Default: 5000. Comments of the post.")
+    parser.add_argument('-replies', default=2, type=int, help="Default: 2. Replies per comment.")
+    parser.add_argument('-page-size', default=50, type=int, help="Default: 50. Comments rendered per click on 'Load more comments'.")
+    parser.add_argument('-windows', default=[200, 1000], type=int, nargs="+", help="Default: 200 1000. Extraction windows of the windowed runs.")
+    args = parser.parse_args()
+
+    site = FakeSite(n_comments=args.comments, replies_per_comment=args.replies, page_size=args.page_size, n_posts=1)
+    with tempfile.TemporaryDirectory() as directory:
+        for extraction, window in [("bulk", None)] + [("windowed", window) for window in args.windows]:
+            result = bench_mode(site, directory, extraction, window)
+            name = extraction if window is None else f"{extraction} {window}"
+            print(f"{name:>15}: peak {result['peak_elements']:9,} elements  {result['peak_chars'] / 1e6:7.2f} MB page source  {result['seconds']:7.1f}s  {result['entries']} entries")
@@ -0,0 +1,42 @@
+"""Measures posts per minute of CrawlWorkerPool with a different number of workers. The posts are served by a local http server
+instead of instagram.com, so no login is needed. Needs a local Chrome or Edge with its driver on the PATH.
+
+Run from the root of the project:
+    python benchmarks/bench_workers.py -posts 12 -workers 1 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import InstagramDatabase
+from src.workers import CrawlWorkerPool
+from fixtures import dynamic_post_page, write_fixture, serve_directory, local_driver
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-posts', default=12, type=int, help="Default: 12. Number of post pages served.")
+    parser.add_argument('-comments', default=60, type=int, help="Default: 60. Comments per post.")
+    parser.add_argument('-latency-ms', default=500, type=int, help="Default: 500. Milliseconds until new comments are rendered.")
+    parser.add_argument('-workers', default=[1, 4], type=int, nargs="+", help="Default: 1 4. Worker counts to measure.")
+    parser.add_argument('-browser', default="chrome", choices=["chrome", "edge"], help="Default: chrome.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(args.posts):
+            write_fixture(os.path.join(directory, "p", f"post{i}"), "index.html", dynamic_post_page(args.comments, 1, latency_ms=args.latency_ms))
+        server, base_url = serve_directory(directory)
+        post_urls = [f"{base_url}p/post{i}/" for i in range(args.posts)]
+        try:
+            for workers in args.workers:
+                DB = InstagramDatabase(os.path.join(directory, "db"), f"workers{workers}")
+                pool = CrawlWorkerPool(lambda: local_driver(args.browser), DB, workers, login=False)
+                start = time.perf_counter()
+                states = pool.crawl(post_urls, "bench")
+                seconds = time.perf_counter() - start
+                done = sum(state == CrawlWorkerPool.DONE for state in states.values())
+                print(f"{workers:>3} worker(s): {seconds:8.2f}s  {done}/{args.posts} posts  {len(DB.df)} entries  {done / seconds * 60:6.1f} posts/min")
+        finally:
+            server.shutdown()
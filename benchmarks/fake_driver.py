@@ -0,0 +1,360 @@
+"""A fake selenium webdriver that serves the synthetic pages of fixtures.py from memory, so InstagramCrawler can be benchmarked
+on a headless box without a browser or network. Selectors are evaluated with lxml (CSS through cssselect) with the same
+semantics as find_element/find_elements, and the scripts of the crawler are answered by Python implementations.
+
+Like a browser, the post page renders page_size comments at first and the next page_size comments latency_ms after every click
+on "Load more comments". The account page renders posts_per_scroll more post links after every END key. A lookup that doesn't
+match waits for the implicit wait, like selenium does.
+"""
+import time
+from time import sleep
+
+import lxml.html
+from selenium.common.exceptions import NoSuchElementException, NoSuchWindowException
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.webelement import WebElement
+
+from src.extraction import EXTRACT_COMMENTS_SCRIPT, NEW_POST_URLS_SCRIPT
+from src.snapshots import compiled_xpath, inner_text
+from src.waits import RESOURCE_COUNT_SCRIPT
+from fixtures import comment_html, post_page
+
+SCROLL_HEIGHT_SCRIPT = "return document.body.scrollHeight"
+
+class FakeElement(WebElement):
+    """WebElement backed by an lxml node of the current page of a FakeDriver.
+    """
+
+    def __init__(self, driver, node):
+        super().__init__(driver, driver.node_id(node))
+        self.node = node
+
+    @property
+    def text(self):
+        return self.parent._command(lambda: inner_text(self.node))
+
+    @property
+    def tag_name(self):
+        return self.node.tag
+
+    def get_attribute(self, name):
+        return self.parent._command(lambda: self.node.get(name))
+
+    def is_displayed(self):
+        return self.parent._command(lambda: True)
+
+    def is_enabled(self):
+        return self.parent._command(lambda: True)
+
+    def click(self):
+        self.parent._command(lambda: self.parent.page.click(self.node))
+
+    def send_keys(self, *value):
+        self.parent._command(lambda: self.parent.page.send_keys(self.node, "".join(value)))
+
+    def find_element(self, by, value):
+        return self.parent._find(self.node, by, value, single=True)
+
+    def find_elements(self, by, value):
+        return self.parent._find(self.node, by, value, single=False)
+
+class FakePage():
+    """Base class of the pages of a FakeSite. Renders an html document and changes it on clicks and key presses.
+    """
+
+    def __init__(self, html):
+        self.root = lxml.html.document_fromstring(html)
+        self.pending = []
+        self.requests = 0
+        # results of absolute xpaths, they don't depend on the context node and are cleared when the document changes
+        self.absolute_results = {}
+
+    def schedule(self, delay, change):
+        """Applies change to the document after delay seconds, like a response of Instagram that arrives later.
+        """
+        self.requests += 1
+        self.pending.append((time.monotonic() + delay, change))
+
+    def update(self):
+        now = time.monotonic()
+        due = [change for ready, change in self.pending if ready <= now]
+        self.pending = [(ready, change) for ready, change in self.pending if ready > now]
+        for change in due:
+            change()
+        if len(due) > 0:
+            self.absolute_results = {}
+
+    def click(self, node):
+        pass
+
+    def send_keys(self, node, keys):
+        pass
+
+    def scroll_height(self):
+        return 1000
+
+class FakePostPage(FakePage):
+    """Post page with n_comments comments, of which page_size are rendered at first.
+    """
+
+    def __init__(self, n_comments, replies_per_comment = 0, page_size = 15, latency_ms = 0):
+        page = post_page(0).replace("<ul></ul>", "<ul id='comments'></ul><div><button aria-label='Load more comments' id='load-more'>+</button></div>")
+        super().__init__(page)
+        self.n_comments = n_comments
+        self.replies_per_comment = replies_per_comment
+        self.page_size = page_size
+        self.latency = latency_ms / 1000
+        self.shown = 0
+        self.loading = False
+        self.show_more_comments()
+
+    def show_more_comments(self):
+        end = min(self.n_comments, self.shown + self.page_size)
+        comments = self.root.get_element_by_id("comments")
+        for i in range(self.shown, end):
+            comments.append(lxml.html.fragment_fromstring(comment_html(i, self.replies_per_comment)))
+        self.shown = end
+        self.loading = False
+        if self.shown >= self.n_comments:
+            button = self.root.get_element_by_id("load-more", None)
+            if button is not None:
+                button.getparent().remove(button)
+
+    def click(self, node):
+        if node.get("aria-label") == "Load more comments" and not self.loading:
+            self.loading = True
+            self.schedule(self.latency, self.show_more_comments)
+
+class FakeAccountPage(FakePage):
+    """Account page with the links of the given posts, of which posts_per_scroll are rendered at first.
+    """
+
+    def __init__(self, account_name, post_urls, posts_per_scroll = 12, latency_ms = 0):
+        super().__init__(f"<!DOCTYPE html><html><body><h2>{account_name}</h2><main><article id='posts'></article></main></body></html>")
+        self.post_urls = post_urls
+        self.posts_per_scroll = posts_per_scroll
+        self.latency = latency_ms / 1000
+        self.shown = 0
+        self.show_more_posts()
+
+    def show_more_posts(self):
+        end = min(len(self.post_urls), self.shown + self.posts_per_scroll)
+        posts = self.root.get_element_by_id("posts")
+        for post_url in self.post_urls[self.shown:end]:
+            posts.append(lxml.html.fragment_fromstring(f"<a href='{post_url}'><div>post</div></a>"))
+        self.shown = end
+
+    def send_keys(self, node, keys):
+        if Keys.END in keys and self.shown < len(self.post_urls):
+            self.schedule(self.latency, self.show_more_posts)
+
+    def scroll_height(self):
+        return 1000 + 100 * self.shown
+
+class FakeSite():
+    """Synthetic pages by url: every url containing /p/ is a post page, every other url under base_url is the page of the account named by its path.
+    """
+
+    def __init__(self, base_url = "https://www.instagram.com/", n_comments = 100, replies_per_comment = 0, n_posts = 120, page_size = 15, posts_per_scroll = 12, latency_ms = 0):
+        self.base_url = base_url
+        self.n_comments = n_comments
+        self.replies_per_comment = replies_per_comment
+        self.n_posts = n_posts
+        self.page_size = page_size
+        self.posts_per_scroll = posts_per_scroll
+        self.latency_ms = latency_ms
+
+    def post_urls(self, account_name):
+        return [f"{self.base_url}p/{account_name}{i}/" for i in range(self.n_posts)]
+
+    def page(self, url):
+        if "/p/" in url:
+            return FakePostPage(self.n_comments, self.replies_per_comment, self.page_size, self.latency_ms)
+        account_name = url[len(self.base_url):].strip("/")
+        return FakeAccountPage(account_name, self.post_urls(account_name), self.posts_per_scroll, self.latency_ms)
+
+class FakeSwitchTo():
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver._command(lambda: None)
+        if handle not in self.driver.pages:
+            raise NoSuchWindowException(f"No window with handle {handle}")
+        self.driver.current_window_handle = handle
+
+    def new_window(self, type_hint = "tab"):
+        self.driver._command(lambda: None)
+        handle = f"window{len(self.driver.pages)}"
+        self.driver.pages[handle] = None
+        self.driver.current_window_handle = handle
+
+class FakeDriver():
+    """Stands in for selenium.webdriver with the commands InstagramCrawler uses. Every window has its own page, like a tab.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.pages = {"window0": None}
+        self.current_window_handle = "window0"
+        self.switch_to = FakeSwitchTo(self)
+        self.implicit_wait = 0
+        self.commands = 0
+        self.next_id = 0
+
+    @property
+    def page(self):
+        return self.pages.get(self.current_window_handle)
+
+    @page.setter
+    def page(self, page):
+        self.pages[self.current_window_handle] = page
+
+    @property
+    def window_handles(self):
+        return list(self.pages)
+
+    def node_id(self, node):
+        """Stable element id of an lxml node, lxml can return different proxy objects for the same node.
+        """
+        node_id = node.get("data-fake-id")
+        if node_id is None:
+            self.next_id += 1
+            node_id = str(self.next_id)
+            node.set("data-fake-id", node_id)
+        return node_id
+
+    def _command(self, function):
+        """Runs one WebDriver command after applying the page changes that are due.
+        """
+        self.commands += 1
+        if self.page is not None:
+            self.page.update()
+        return function()
+
+    def _match(self, context, by, value):
+        xpath = compiled_xpath(by, value)
+        # an absolute xpath like //div matches the whole document from every context node, like in the browser
+        if by == "xpath" and value.startswith("/"):
+            cache = self.page.absolute_results
+            if value not in cache:
+                cache[value] = [node for node in xpath(self.page.root) if isinstance(node, lxml.html.HtmlElement)]
+            return list(cache[value])
+        return [node for node in xpath(context) if isinstance(node, lxml.html.HtmlElement)]
+
+    def _find(self, context, by, value, single):
+        """find_element/find_elements with the implicit wait: a lookup without a match is retried until the implicit wait is over.
+        """
+        deadline = time.monotonic() + self.implicit_wait
+        while True:
+            nodes = self._command(lambda: self._match(context if context is not None else self.page.root, by, value))
+            if len(nodes) > 0 or time.monotonic() >= deadline:
+                break
+            sleep(0.05)
+        if single:
+            if len(nodes) == 0:
+                raise NoSuchElementException(f"Unable to locate element: {by}={value}")
+            return FakeElement(self, nodes[0])
+        return [FakeElement(self, node) for node in nodes]
+
+    @property
+    def page_source(self):
+        return self._command(lambda: lxml.html.tostring(self.page.root, encoding="unicode"))
+
+    def get(self, url):
+        self._command(lambda: None)
+        self.page = self.site.page(url)
+
+    def implicitly_wait(self, seconds):
+        self._command(lambda: None)
+        self.implicit_wait = seconds
+
+    def find_element(self, by, value):
+        return self._find(None, by, value, single=True)
+
+    def find_elements(self, by, value):
+        return self._find(None, by, value, single=False)
+
+    def execute_script(self, script, *args):
+        return self._command(lambda: self._run_script(script, args))
+
+    def _run_script(self, script, args):
+        if script == EXTRACT_COMMENTS_SCRIPT:
+            return self._extract_comments(*args)
+        if script == NEW_POST_URLS_SCRIPT:
+            return self._new_post_urls(*args)
+        if script == SCROLL_HEIGHT_SCRIPT:
+            return self.page.scroll_height()
+        if script == RESOURCE_COUNT_SCRIPT:
+            return self.page.requests
+        return None
+
+    def _extract_comments(self, selectors, start = 0, limit = None, prune = False):
+        """Python version of EXTRACT_COMMENTS_SCRIPT.
+        """
+        def find_all(context, name):
+            return self._match(context, *selectors[name])
+
+        def find(context, name):
+            nodes = find_all(context, name)
+            return nodes[0] if len(nodes) > 0 else None
+
+        def datetime(node):
+            return None if node is None else node.get("datetime")
+
+        start = start or 0
+        containers = find_all(self.page.root, "ALL_COMMENTS_CONTAINER")
+        end = len(containers) if limit is None else min(len(containers), start + limit)
+        comments = []
+        for container in containers[start:end]:
+            comment = find(container, "COMMENT_CONTAINER")
+            if comment is None:
+                comments.append(None)
+                continue
+            replies = [{
+                "text": inner_text(find(reply, "REPLY_TEXT")),
+                "owner": inner_text(find(reply, "REPLY_OWNER")),
+                "likes": inner_text(find(reply, "REPLY_LIKES")),
+                "date": datetime(find(reply, "REPLY_DATE")),
+            } for reply in find_all(container, "REPLIES_TO_COMMENT_CONTAINER")]
+            comments.append({
+                "text": inner_text(find(comment, "COMMENT_TEXT")),
+                "owner": inner_text(find(comment, "COMMENT_OWNER")),
+                "likes": inner_text(find(comment, "COMMENT_LIKES")),
+                "date": datetime(find(comment, "COMMENT_DATE")),
+                "replies": replies,
+            })
+        if prune is True:
+            for container in containers[start:end]:
+                for child in list(container):
+                    container.remove(child)
+                container.text = None
+            self.page.absolute_results = {}
+        post = None
+        if start == 0:
+            root = self.page.root
+            post = {"comment": inner_text(find(root, "POST_COMMENT")), "likes": inner_text(find(root, "POST_LIKES")), "date": datetime(find(root, "POST_DATE"))}
+        return {"post": post, "comments": comments, "total": len(containers)}
+
+    def _new_post_urls(self, selector):
+        """Python version of NEW_POST_URLS_SCRIPT, the seen urls are kept per page like the window variable of the script.
+        """
+        seen = self.page.__dict__.setdefault("seen_post_urls", set())
+        found = []
+        for node in self._match(self.page.root, *selector):
+            href = node.get("href")
+            if href and href not in seen:
+                seen.add(href)
+                found.append(href)
+        return found
+
+    def get_cookies(self):
+        return []
+
+    def close(self):
+        self._command(lambda: None)
+        del self.pages[self.current_window_handle]
+
+    def quit(self):
+        self.pages = {}
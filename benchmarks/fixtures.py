@@ -0,0 +1,288 @@
+"""Generates synthetic Instagram-like pages that match the selectors in config.py, so the crawler can be benchmarked
+against local files instead of instagram.com.
+"""
+import functools
+import html
+import json
+import os
+import random
+import struct
+import threading
+import zlib
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def _comment_body(owner, text, likes, date):
+    # li > div > div > [avatar, content]: content matches COMMENT_CONTAINER / REPLIES_TO_COMMENT_CONTAINER
+    likes_html = f"<div>{likes} likes</div>" if likes else ""
+    return (
+        "<div><div><div><img alt=''></div><div>"
+        f"<h3>{html.escape(owner)}</h3>"
+        f"<div class='_a9zs'><span>{html.escape(text)}</span></div>"
+        f"<div><time datetime='{date}'>1w</time>{likes_html}</div>"
+        "</div></div></div>"
+    )
+
+def comment_html(index, replies_per_comment):
+    """Returns one ALL_COMMENTS_CONTAINER element with its comment and replies.
+    """
+    replies = "".join(
+        f"<div role='button'><li>{_comment_body(f'replier{index}_{j}', f'reply {j} to comment {index}', j % 3, '2022-12-02T10:00:00.000Z')}</li></div>"
+        for j in range(replies_per_comment)
+    )
+    replies_html = f"<ul>{replies}</ul>" if replies_per_comment > 0 else ""
+    return f"<ul><li>{_comment_body(f'user{index}', f'comment number {index}', index % 5, '2022-12-01T01:40:25.000Z')}{replies_html}</li></ul>"
+
+def post_page(n_comments, replies_per_comment = 0, caption = "synthetic post caption", post_likes = "1,234"):
+    """Returns the html of a post page with all comments and replies already rendered.
+
+    Args:
+        n_comments (int): Number of comments on the page.
+        replies_per_comment (int, optional): Number of replies under every comment. Defaults to 0.
+        caption (str, optional): Text of the post. Defaults to "synthetic post caption".
+        post_likes (str, optional): Likes of the post as shown on the page. Defaults to "1,234".
+
+    Returns:
+        string: The html document.
+    """
+    comments = "".join(comment_html(i, replies_per_comment) for i in range(n_comments))
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>post</title></head><body>"
+        "<div role='presentation'><div>"
+        "<div><span>header</span></div>"
+        "<div><time datetime='2022-11-30T12:00:00.000Z'>November 30</time></div>"
+        f"<div><section><span>icons</span></section><section><div><div><div><a><div>{post_likes} likes</div></a></div></div></div></section></div>"
+        f"<div role='button'><li><div><div><div></div><div><div><span>{html.escape(caption)}</span></div></div></div></div></li></div>"
+        f"<ul>{comments}</ul>"
+        "</div></div></body></html>"
+    )
+
+DYNAMIC_PAGE_SCRIPT = """
+const comments = %(comments)s;
+const replies = %(replies)s;
+const pageSize = %(page_size)d;
+const latency = %(latency_ms)d;
+let shown = 0;
+let loading = false;
+
+function showMoreComments() {
+    const end = Math.min(comments.length, shown + pageSize);
+    document.getElementById("comments").insertAdjacentHTML("beforeend", comments.slice(shown, end).join(""));
+    shown = end;
+    loading = false;
+    if (shown >= comments.length) {
+        document.getElementById("load-more").remove();
+    }
+}
+
+document.addEventListener("click", function (event) {
+    const target = event.target;
+    if (target.closest("[aria-label='Load more comments']")) {
+        if (!loading) {
+            loading = true;
+            setTimeout(showMoreComments, latency);
+        }
+    } else if (target.classList.contains("_a9yi") && target.textContent.startsWith("View replies")) {
+        target.textContent = "Loading...";
+        setTimeout(function () {
+            target.closest("li").insertAdjacentHTML("beforebegin", replies[Number(target.dataset.comment)]);
+            target.textContent = "Hide replies";
+        }, latency);
+    }
+});
+showMoreComments();
+"""
+
+def dynamic_post_page(n_comments, replies_per_comment = 0, page_size = 15, latency_ms = 500):
+    """Returns the html of a post page that behaves like Instagram: only page_size comments are rendered at first and every click on
+    "Load more comments" renders the next page_size comments after latency_ms. Replies are rendered after a click on "View replies".
+
+    Args:
+        n_comments (int): Number of comments on the page.
+        replies_per_comment (int, optional): Number of replies under every comment. Defaults to 0.
+        page_size (int, optional): Number of comments rendered per click. Defaults to 15.
+        latency_ms (int, optional): Milliseconds until new comments or replies are rendered after a click. Defaults to 500.
+
+    Returns:
+        string: The html document.
+    """
+    comments = []
+    replies = []
+    for i in range(n_comments):
+        comment = comment_html(i, 0)
+        if replies_per_comment > 0:
+            button = f"<ul><li><div><span class='_a9yi' data-comment='{i}'>View replies ({replies_per_comment})</span></div></li></ul>"
+            comment = comment.replace("</li></ul>", button + "</li></ul>")
+        comments.append(comment)
+        # the replies are the reply list of the static page without the surrounding <ul>
+        replies.append(comment_html(i, replies_per_comment).split("<ul>", 2)[2].rsplit("</ul>", 2)[0])
+    script = DYNAMIC_PAGE_SCRIPT % {"comments": json.dumps(comments), "replies": json.dumps(replies), "page_size": page_size, "latency_ms": latency_ms}
+    page = post_page(0)
+    page = page.replace("<ul></ul>", "<ul id='comments'></ul><div><button aria-label='Load more comments' id='load-more'>+</button></div>")
+    return page.replace("</body>", f"<script>{script}</script></body>")
+
+def random_bytes(n, seed = 0):
+    # same bytes as Random.randbytes(), which needs Python 3.9, the docker image runs Python 3.8
+    return random.Random(seed).getrandbits(n * 8).to_bytes(n, "little") if n > 0 else b""
+
+def png_bytes(width, height, seed = 0):
+    """Returns a valid RGB png of noise. Noise doesn't compress, so the file has about width * height * 3 bytes like a photo would.
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    noise = random_bytes(width * height * 3, seed)
+    rows = b"".join(b"\x00" + noise[y * width * 3:(y + 1) * width * 3] for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+def write_media_fixtures(directory, n_images = 12, image_size = 512, video_mb = 4, n_fonts = 2):
+    """Writes the media files of media_post_page() to directory: images, a video and fonts with random content.
+
+    Args:
+        directory (string): Directory the files are written to.
+        n_images (int, optional): Number of png images. Defaults to 12.
+        image_size (int, optional): Width and height of the images in pixels. Defaults to 512 (about 0.75 MB per image).
+        video_mb (int, optional): Size of the video in MB. Defaults to 4.
+        n_fonts (int, optional): Number of font files. Defaults to 2.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for i in range(n_images):
+        with open(os.path.join(directory, f"image{i}.png"), "wb") as fp:
+            fp.write(png_bytes(image_size, image_size, seed=i))
+    with open(os.path.join(directory, "video.mp4"), "wb") as fp:
+        fp.write(random_bytes(video_mb * 2**20))
+    for i in range(n_fonts):
+        with open(os.path.join(directory, f"font{i}.woff2"), "wb") as fp:
+            fp.write(random_bytes(100 * 2**10, i))
+
+def media_post_page(n_comments, n_images = 12, n_fonts = 2, media_path = "/media/", post_id = 0):
+    """Returns the html of a post page like post_page() with the images, video and fonts of write_media_fixtures(), like a real
+    post page loads the post's photos, a reel, the profile pictures of the commenters and web fonts the crawler never reads.
+
+    Args:
+        n_comments (int): Number of comments on the page.
+        n_images (int, optional): Number of images on the page. Defaults to 12.
+        n_fonts (int, optional): Number of fonts used by the page. Defaults to 2.
+        media_path (str, optional): Url path of the media files. Defaults to "/media/".
+        post_id (int, optional): Added to the media urls, so pages with different ids aren't served from the browser cache. Defaults to 0.
+
+    Returns:
+        string: The html document.
+    """
+    fonts = "".join(f"@font-face {{font-family: 'font{i}'; src: url('{media_path}font{i}.woff2?post={post_id}') format('woff2');}} span:nth-of-type({i + 1}) {{font-family: 'font{i}';}}" for i in range(n_fonts))
+    # the query string is there like on Instagram's CDN, the blocked url patterns have to match it
+    images = "".join(f"<img src='{media_path}image{i}.png?stp=dst-jpg&_nc_ht=local&post={post_id}' width='64' height='64'>" for i in range(n_images))
+    video = f"<video src='{media_path}video.mp4?efg=local&post={post_id}' preload='auto' autoplay muted></video>"
+    page = post_page(n_comments)
+    page = page.replace("</head>", f"<style>{fonts}</style></head>")
+    return page.replace("</body>", f"<div>{images}{video}</div></body>")
+
+def write_fixture(directory, name, content):
+    """Writes a fixture to directory/name and returns its file:// url.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.abspath(os.path.join(directory, name))
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write(content)
+    return "file://" + path
+
+def serve_directory(directory, stats = None):
+    """Serves a directory of fixtures over http on a free local port in a background thread, like a stand-in for instagram.com.
+
+    Args:
+        directory (string): Directory with the fixture files.
+        stats (dict, optional): If set, the number of served "requests" and "bytes" are added to it. Defaults to None.
+
+    Returns:
+        tuple: The http.server object (call shutdown() to stop it) and the base url ending with a slash.
+    """
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def copyfile(self, source, outputfile):
+            start = source.tell()
+            try:
+                super().copyfile(source, outputfile)
+            finally:
+                if stats is not None:
+                    with lock:
+                        stats["requests"] = stats.get("requests", 0) + 1
+                        stats["bytes"] = stats.get("bytes", 0) + source.tell() - start
+
+    lock = threading.Lock()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+def local_driver(browser = "chrome", headless = True, profile = None):
+    """Starts a local headless browser for the benchmarks. The matching driver binary (chromedriver or msedgedriver) has to be on the PATH.
+
+    Args:
+        browser (str, optional): "chrome" or "edge". Defaults to "chrome".
+        headless (bool, optional): Defaults to True.
+        profile (src.browser.DriverProfile, optional): Browser options of the crawler added to the benchmark's options. Defaults to None.
+
+    Returns:
+        selenium.webdriver: The started driver.
+    """
+    from selenium import webdriver
+    if browser == "edge":
+        options = webdriver.EdgeOptions()
+    else:
+        options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    if profile is not None:
+        options = profile.options(options)
+    if browser == "edge":
+        driver = webdriver.ChromiumEdge(options=options)
+    else:
+        driver = webdriver.Chrome(options=options)
+    return profile.apply(driver) if profile is not None else driver
+
+def browser_memory_mb():
+    """Returns the resident memory in MB of all processes started by this process, i.e. the drivers and their browsers, None without psutil.
+    """
+    if psutil is None:
+        return None
+    total = 0
+    for process in psutil.Process().children(recursive=True):
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / 2**20
+
+class MemorySampler():
+    """Samples browser_memory_mb() in a background thread and keeps the peak. Use as a context manager around a benchmark.
+    """
+
+    def __init__(self, interval = 0.5):
+        self.interval = interval
+        self.peak_mb = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while True:
+            memory = browser_memory_mb()
+            if memory is not None:
+                self.peak_mb = max(self.peak_mb or 0, memory)
+            if self.stopped.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
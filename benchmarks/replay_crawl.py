@@ -0,0 +1,38 @@
+"""Replays the crawl of a post from a recording made with `crawl.py -record [path]`, without a browser. The crawler sends the
+same WebDriver commands and gets the recorded responses, so a slow post can be profiled and debugged offline. The replayed
+crawl has to use the same extraction mode as the recorded one.
+
+Run from the root of the project:
+    python benchmarks/replay_crawl.py -recording ./data/recording.jsonl -post-url https://www.instagram.com/p/[post id]/ -account-name [account name]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.database import InstagramDatabase
+from src.instagram_crawler import InstagramCrawler
+from src.profiling import CrawlProfiler
+from src.tracing import ReplayDriver
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-recording', required=True, help="Required. Path of the recording.")
+    parser.add_argument('-post-url', required=True, help="Required. Url of the recorded post to replay.")
+    parser.add_argument('-account-name', required=True, help="Required. Account name the post was crawled with.")
+    parser.add_argument('-extraction', default="elements", choices=InstagramCrawler.EXTRACTION_MODES, help="Default: elements. Has to match the recorded crawl.")
+    parser.add_argument('-realtime', action='store_true', help="If set, every command takes as long as it did when recording.")
+    args = parser.parse_args()
+
+    profiler = CrawlProfiler()
+    driver = ReplayDriver(args.recording, profiler, args.realtime)
+    with tempfile.TemporaryDirectory() as directory:
+        DB = InstagramDatabase(directory, "replay")
+        crawler = InstagramCrawler(driver, DB, extraction=args.extraction, profiler=profiler)
+        start = time.perf_counter()
+        crawler.crawl_post(args.post_url, args.account_name)
+        seconds = time.perf_counter() - start
+        print(f"Replayed {args.post_url} in {seconds:.2f}s, {len(DB.df)} entries")
+    profiler.print_summary()
@@ -3,6 +3,34 @@ FAN_ACCOUNT_NAMES = ["elonmuskoffiicial", "elonmuskofflcial"]
 BASE_URL = "https://www.instagram.com/"
 TEST_ACCOUNT = "wdb_crawler"
 
+# Wait budgets in seconds of the crawler operations, see src/waits.py. Instead of sleeping a fixed time, the crawler waits at most
+# "timeout" seconds for new content after a click/scroll and "appear" seconds for a button to show up. "floor" and "jitter"
+# add a random politeness delay before every click/scroll.
+WAIT_BUDGETS = {
+    "load_more_comments": {"timeout": 10, "appear": 1, "idle": 2, "floor": 0, "jitter": 0},
+    "load_more_replies": {"timeout": 5, "appear": 0.5, "idle": 2, "floor": 0, "jitter": 0},
+    "scroll_posts": {"timeout": 10, "appear": 3, "idle": 2, "floor": 0, "jitter": 0},
+}
+
+# Lookup budgets of the selectors used to extract a loaded post element by element, see src/lookup.py. A required selector is
+# waited for up to "timeout" seconds and fails the post if it doesn't match. An optional selector is missing after "timeout" seconds.
+# Selectors without an entry are required with a timeout of 3 seconds.
+SELECTOR_BUDGETS = {
+    "POST_COMMENT": {"required": False, "timeout": 0},
+    "POST_LIKES": {"required": False, "timeout": 0},
+    "POST_DATE": {"required": False, "timeout": 0},
+    "ALL_COMMENTS_CONTAINER": {"required": False, "timeout": 0},
+    "COMMENT_LIKES": {"required": False, "timeout": 0},
+    "REPLIES_TO_COMMENT_CONTAINER": {"required": False, "timeout": 0},
+    "REPLY_LIKES": {"required": False, "timeout": 0},
+}
+
+# browser options of the crawler drivers by profile name, see src/browser.py
+DRIVER_PROFILES = {
+    "full": {},
+    "light": {"headless": True, "page_load_strategy": "eager", "block_media": True, "disable_extensions": True, "disable_gpu": True, "cache_size_mb": 32, "window_size": "1280,2000", "background_throttling": False},
+}
+
 COOKIE_POPUP = "XPATH,//*[text()='Allow essential and optional cookies']"
 NOTIFICATION_POPUP = "XPATH,//*[text()='Not now']"
 CURRENTLY_VISIBLE_POSTS = "CSS_SELECTOR,article a"
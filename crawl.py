@@ -1,19 +1,33 @@
+import time
+# the startup of the run is measured from here
+STARTED = time.perf_counter()
+
 import argparse
+import atexit
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 sys.path.insert(0, '../')
-from src.database import InstagramDatabase
+from src.database import open_database, BACKENDS
 
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
+# modules of optional features (workers, tabs, watch mode, tracing, snapshots) are imported when they are used.
+# selenium isn't deferred: importing any selenium.webdriver module, even By for the selectors, loads the whole package,
+# every mode including -parse-snapshots needs the selectors and the browser start needs selenium first thing anyway.
 from src.instagram_crawler import InstagramCrawler
+from src.journal import CrawlJournal, RetrySchedule
+from src.profiling import CrawlProfiler, StartupTimer
+from src.browser import DriverProfile, make_driver, resolve_driver_path
+import config
+from src.sessions import SessionStore
+from src.selector_registry import registry as selector_registry
+IMPORTED = time.perf_counter()
 
 def print_checkpoint_messages(path, last_post_crawled, current_post):
     """Prints useful comments to retry crawling of posts.
@@ -27,29 +41,129 @@ def print_checkpoint_messages(path, last_post_crawled, current_post):
     print(f"Use the arguments: \n'-posts {path} -from-post-url {last_post_crawled}'\nto retry crawling starting from the same post.")
     print("********************************")
     print(f"Use the arguments: \n'-posts {path} -from-post-url {current_post}'\nto retry and skip the current post.")
+    print("********************************")
+    print(f"Or use the arguments: \n'-posts {path} -resume'\nto continue with all posts that are not done yet, retrying failed ones.")
 
 if __name__ == "__main__":
     
     parser = argparse.ArgumentParser()
-    parser.add_argument('-account-name', required=True, help="Required. The account name of the account to be crawled.")
+    parser.add_argument('-account-name', help="Required unless -watch is set. The account name of the account to be crawled.")
     parser.add_argument('-posts', required=False, help="Default: None. If set to a valid path to a parseable file of post urls, then crawler will skip getting all post urls step and use the urls in the file instead.")
     parser.add_argument('-only-get-post-urls', default=False, type=bool, help="Default: False. If set to True, script ends after storing all post urls.")
     parser.add_argument('-from-post-url', help="Default: None. If set to a valid post-url, the crawler will begin crawling posts from the index of the given post url in the parseable file of post urls. ATTENTION: Instaram Posts will be stored in the following format: 'https://www.instagram.com/p/[post id]/'")
+    parser.add_argument('-db-backend', default="csv", choices=list(BACKENDS), help="Default: csv. Storage backend of the database. 'sqlite' stores the data in [account name].sqlite and allows multiple crawler processes to write to the same file. 'ndjson' and 'ndjson-gzip' stream every entry to disk as soon as it is extracted.")
+    parser.add_argument('-normalize', action='store_true', help="If set, the csv backend stores likes and reply counts as numbers and dates as datetimes instead of the text shown on the page, normalizing every block of new entries when it is flushed. The parquet backend always does.")
+    parser.add_argument('-extraction', default="elements", choices=InstagramCrawler.EXTRACTION_MODES, help="Default: elements. How comments are extracted from a loaded post. 'bulk' extracts all comments and replies with a single JavaScript call instead of several WebDriver commands per comment. 'snapshot' stores the page source in -snapshot-dir and parses it in -snapshot-processes worker processes while the browser goes on with the next post. 'windowed' loads, extracts, saves and removes -extraction-window comments at a time to bound the memory of the browser on huge posts.")
+    parser.add_argument('-extraction-window', default=200, type=int, help="Default: 200. Only used with -extraction windowed. Number of newly loaded comments after which they are extracted, saved and removed from the page.")
+    parser.add_argument('-snapshot-dir', default="./data/snapshots/", help="Default: ./data/snapshots/. Directory of the compressed page sources of -extraction snapshot, one file per post in [account name]/[post id].html.gz.")
+    parser.add_argument('-snapshot-processes', type=int, help="Default: None (one per CPU). Number of worker processes parsing the snapshots of -extraction snapshot and -parse-snapshots.")
+    parser.add_argument('-parse-snapshots', action='store_true', help="If set, parses all stored snapshots of -account-name with the current selectors into the database and exits, without starting a browser.")
+    parser.add_argument('-workers', default=1, type=int, help="Default: 1. Number of browser drivers crawling posts in parallel. Every worker logs in with its own driver.")
+    parser.add_argument('-tabs', default=1, type=int, help="Default: 1. Number of tabs of one browser crawling posts in parallel, instead of one browser per worker. Can't be combined with -workers.")
+    parser.add_argument('-session-dir', default="./data/sessions/", help="Default: ./data/sessions/. Directory where the logged in session (cookies and local storage) is stored and reused by new drivers instead of logging in again. Set to an empty string to always log in. Only used if INSTAGRAM_USERNAME is set.")
+    parser.add_argument('-selector-overrides', help="Default: None. Path to a json file of {\"SELECTOR_NAME\": \"BY_STRATEGY,query\"} entries that override the selectors of config.py. The file is reloaded while crawling whenever it changes.")
+    parser.add_argument('-incremental', action='store_true', help="If set, only comments and replies that are not in the database yet are added and loading more comments of a post stops at the first page of known comments.")
+    parser.add_argument('-resume', action='store_true', help="If set, skips posts that are done in the crawl journal ./data/[account name]-journal.jsonl, retries failed posts with a backoff and keeps crawling past posts that fail.")
+    parser.add_argument('-max-attempts', default=3, type=int, help="Default: 3. Only used with -resume and -watch. Maximum number of attempts per post, counted across runs.")
+    parser.add_argument('-retry-backoff', default=60, type=int, help="Default: 60. Only used with -resume. Seconds before the first retry of a failed post, doubled for every further retry.")
+    parser.add_argument('-watch', nargs='*', help="Default: None. Keeps checking the given accounts for new posts and only crawls those. Without account names, watches OFFICIAL_ACCOUNT_NAME and FAN_ACCOUNT_NAMES of config.py.")
+    parser.add_argument('-watch-interval', default=3600, type=int, help="Default: 3600. Only used with -watch. Seconds between two checks of the same account.")
+    parser.add_argument('-profile', action='store_true', help="If set, writes the durations of the crawl phases of every post to ./data/[account name]-profile.jsonl and prints a summary table at exit.")
+    parser.add_argument('-trace', action='store_true', help="If set, counts and times every WebDriver command per post and prints them in the profile summary at exit.")
+    parser.add_argument('-record', help="Default: None. Path of a file to record every WebDriver command and its response to. The recording can be replayed without a browser with benchmarks/replay_crawl.py. Only records the first driver, not the -workers drivers.")
+    parser.add_argument('-driver-path', help="Default: None (the EDGE_DRIVER_PATH environment variable, then the driver cached by an earlier run, then msedgedriver on the PATH, then a download by webdriver_manager). Path of the msedgedriver binary, used without any network check.")
+    parser.add_argument('-refresh-driver', action='store_true', help="If set, ignores the cached driver and resolves it again with webdriver_manager, e.g. after a browser update.")
+    parser.add_argument('-offline', action='store_true', help="If set, never looks up or downloads the driver online and fails if no local driver is found.")
+    parser.add_argument('-driver-profile', default="full", choices=list(config.DRIVER_PROFILES), help="Default: full. Browser options of all drivers from DRIVER_PROFILES in config.py. 'light' runs headless, doesn't wait for or download images, videos and fonts and caps the disk cache, so a host can run more -workers.")
     args = parser.parse_args()
-    DB = InstagramDatabase(os.getenv("DB_CONNECTION_STRING"), args.account_name)
-    driver = webdriver.ChromiumEdge(service=Service(EdgeChromiumDriverManager().install()))
-    crawler = InstagramCrawler(driver, DB)
+    if args.account_name is None and args.watch is None:
+        parser.error("-account-name is required unless -watch is set.")
+    if args.workers > 1 and args.tabs > 1:
+        parser.error("-workers and -tabs can't be combined.")
+    if args.normalize and args.db_backend != "csv":
+        parser.error("-normalize is only used with the csv backend.")
+    db_kwargs = {"normalize": True} if args.normalize else {}
+    startup = StartupTimer(STARTED)
+    startup.add("imports", IMPORTED - STARTED)
+
+    # the browser starts in the background while the database is opened
+    driver_profile = DriverProfile.from_config(args.driver_profile)
+
+    def start_driver():
+        with startup.step("driver_path"):
+            path = resolve_driver_path(args.driver_path, refresh=args.refresh_driver, offline=args.offline)
+        with startup.step("browser"):
+            return path, make_driver(path, driver_profile)
+
+    driver_start = ThreadPoolExecutor(1).submit(start_driver) if not args.parse_snapshots else None
+    if args.selector_overrides is not None:
+        selector_registry.watch(args.selector_overrides)
+    with startup.step("database"):
+        DB = open_database(os.getenv("DB_CONNECTION_STRING"), args.account_name, args.db_backend, **db_kwargs) if args.account_name is not None else None
+    if hasattr(DB, "close"):
+        atexit.register(DB.close)
+
+    # extract stored page sources again, e.g. after a selector changed
+    if args.parse_snapshots:
+        if DB is None:
+            parser.error("-parse-snapshots needs -account-name.")
+        from src.snapshots import SnapshotStore, SnapshotParser
+        paths = SnapshotStore(args.snapshot_dir).paths(args.account_name)
+        snapshot_parser = SnapshotParser(args.snapshot_processes, incremental=args.incremental)
+        entries = snapshot_parser.parse(paths, DB)
+        snapshot_parser.close()
+        print(f"Added {entries} entries from {len(paths) - len(snapshot_parser.errors)} of {len(paths)} snapshot(s). Exiting...")
+        exit()
+
+    profiler = None
+    if args.profile:
+        profiler = CrawlProfiler('./data/' + (args.account_name or "watch") + '-profile.jsonl')
+        atexit.register(profiler.print_summary)
+    with startup.step("wait_for_browser"):
+        driver_path, driver = driver_start.result()
+    # count the WebDriver commands of every post and record them to replay the crawl without a browser
+    if args.trace or args.record is not None:
+        from src.tracing import TracingDriver
+        if profiler is None:
+            profiler = CrawlProfiler()
+            atexit.register(profiler.print_summary)
+        driver = TracingDriver(driver, profiler, args.record)
+        atexit.register(driver.close_recording)
+    session_store = None
+    if args.session_dir:
+        if os.getenv("INSTAGRAM_USERNAME"):
+            session_store = SessionStore(args.session_dir, os.getenv("INSTAGRAM_USERNAME"))
+        else:
+            print("INSTAGRAM_USERNAME is not set, the session isn't stored.")
+    snapshot_store = snapshot_parser = None
+    if args.extraction == "snapshot":
+        from src.snapshots import SnapshotStore, SnapshotParser
+        snapshot_store = SnapshotStore(args.snapshot_dir)
+        snapshot_parser = SnapshotParser(args.snapshot_processes, incremental=args.incremental)
+        # runs before DB.close, which was registered earlier
+        atexit.register(snapshot_parser.close)
+    crawler = InstagramCrawler(driver, DB, extraction=args.extraction, session_store=session_store, incremental=args.incremental, profiler=profiler, snapshot_store=snapshot_store, snapshot_parser=snapshot_parser, extraction_window=args.extraction_window)
+    startup.finish(profiler)
+
+    # watch mode runs until it is interrupted, new posts of every account are stored in the account's own database
+    if args.watch is not None:
+        from src.watch import AccountWatcher
+        accounts = args.watch if len(args.watch) > 0 else [config.OFFICIAL_ACCOUNT_NAME] + config.FAN_ACCOUNT_NAMES
+        watcher = AccountWatcher(crawler, accounts, lambda account_name: open_database(os.getenv("DB_CONNECTION_STRING"), account_name, args.db_backend, **db_kwargs), args.watch_interval, max_attempts=args.max_attempts)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print("Keyboard interrupt detected.")
+        watcher.close()
+        print("Exiting...")
+        exit()
     
     # if -posts argument is None, we can generate a new post url list file
     if args.posts is None:
-        posts = crawler.get_all_posts(args.account_name)
-        
-        # open file in write mode
+        # post urls are written to the file while scrolling
         path = './data/' + args.account_name + '-post-urls.txt'
-        with open(path, 'w+') as fp:
-            for post_url in posts:
-                # write each item on a new line
-                fp.write("%s\n" % posts[post_url])
+        os.makedirs('./data/', exist_ok=True)
+        posts = crawler.get_all_posts(args.account_name, post_urls_path=path)
         print(f'Done saving {len(posts)} post url(s) to file.')
 
     # if -only_get_post_urls is True, we can exit the script 
@@ -103,16 +217,94 @@ if __name__ == "__main__":
         print("No posts found to crawl. Exiting...")
         exit()
 
+    # every state change of every post is recorded in the crawl journal
+    journal = CrawlJournal('./data/' + args.account_name + '-journal.jsonl')
+    journal.add(posts)
+    if snapshot_parser is not None:
+        # a post is only done once the snapshot parser saved its entries
+        snapshot_parser.journal = journal
+    max_attempts = args.max_attempts if args.resume else 1
+
+    # crawl posts in parallel, every worker uses its own driver or its own tab of one driver
+    if args.workers > 1 or args.tabs > 1:
+        driver.quit()
+        crawler_kwargs = {"extraction": args.extraction, "session_store": session_store, "incremental": args.incremental, "profiler": profiler, "snapshot_store": snapshot_store, "snapshot_parser": snapshot_parser, "extraction_window": args.extraction_window}
+        if args.tabs > 1:
+            from src.tabs import TabPool
+            make_tab_driver = (lambda tab: TracingDriver(tab, profiler)) if args.trace else None
+            pool = TabPool(lambda: make_driver(driver_path, driver_profile), DB, args.tabs, crawler_kwargs=crawler_kwargs, journal=journal, make_tab_driver=make_tab_driver, profile=driver_profile)
+        else:
+            from src.workers import CrawlWorkerPool
+            make_worker_driver = lambda: make_driver(driver_path, driver_profile)
+            if args.trace:
+                make_worker_driver = lambda: TracingDriver(make_driver(driver_path, driver_profile), profiler)
+            pool = CrawlWorkerPool(make_worker_driver, DB, args.workers, crawler_kwargs=crawler_kwargs, journal=journal)
+        states = pool.crawl([posts[i] for i in iterator], args.account_name, max_attempts, args.retry_backoff, resume=args.resume)
+        unfinished = pool.unfinished()
+        print(f"Done Crawling {len(states) - len(unfinished)} of {len(states)} posts.")
+        if len(unfinished) > 0:
+            remaining_path = './data/' + args.account_name + '-remaining-post-urls.txt'
+            with open(remaining_path, 'w') as fp:
+                fp.write("".join(post_url + "\n" for post_url in unfinished))
+            for post_url in unfinished:
+                print(f"{states[post_url]}: {post_url} {pool.errors.get(post_url, '')}")
+            print(f"Use the arguments: \n'-posts {remaining_path}'\nto retry crawling the {len(unfinished)} unfinished post(s).")
+        print("Exiting...")
+        exit()
+
     #if args.posts is not None it won't have crawled the posts before, therefore we need to login.
     crawler.refresh_crawler(logged_in=(args.posts is None))
+
+    # crawl the posts in the order of the journal's schedule and keep going past failing posts
+    if args.resume:
+        schedule = RetrySchedule([posts[i] for i in iterator], max_attempts, args.retry_backoff, journal)
+        print(f"Skipping {len(schedule.skipped)} post(s) that are done or reached {max_attempts} attempt(s).")
+        # rows of a failing post are discarded instead of being saved with the next post
+        from src.workers import SynchronizedDatabase
+        crawler.DB = SynchronizedDatabase(DB, threading.Lock())
+        while True:
+            try:
+                post_url = schedule.next()
+            except KeyboardInterrupt:
+                # interrupted during the backoff wait of a retry, the schedule put the post back and it wasn't started
+                print("Keyboard interrupt detected.")
+                break
+            if post_url is None:
+                break
+            journal.start(post_url)
+            try:
+                crawler.crawl_post(post_url, args.account_name)
+                if not crawler.marks_posts_done:
+                    journal.done(post_url)
+            except Exception as e:
+                crawler.DB.discard()
+                journal.fail(post_url, e)
+                delay = schedule.retry(post_url)
+                retry_message = f"retrying in {delay:.0f}s" if delay is not None else f"giving up after {max_attempts} attempt(s)"
+                print(f"Error trying to crawl post with url {post_url}, {retry_message}: ", e)
+            except KeyboardInterrupt:
+                print("Keyboard interrupt detected.")
+                journal.release(post_url)
+                break
+        if snapshot_parser is not None:
+            snapshot_parser.join()
+        print(f"Crawl journal: {journal.summary([posts[i] for i in iterator])}. Use -resume again to continue. Exiting...")
+        journal.close()
+        exit()
+
     for i in iterator:
+        journal.start(posts[i])
         try:
             last_post_crawled = crawler.crawl_post(posts[i], args.account_name)
+            if not crawler.marks_posts_done:
+                journal.done(posts[i])
         except Exception as e:
+            journal.fail(posts[i], e)
             print(f"Error trying to crawl post with url {posts[i]}: ", e)
             print_checkpoint_messages(path, last_post_crawled, posts[i])
             exit()
         except KeyboardInterrupt:
+            journal.release(posts[i])
             print("Keyboard interrupt detected.")
             print_checkpoint_messages(path, last_post_crawled, posts[i])
             exit()
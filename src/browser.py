@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+from selenium import webdriver
+from selenium.webdriver.edge.service import Service
+
+import config
+
+# file in which resolve_driver_path() remembers the driver that EdgeChromiumDriverManager resolved
+DRIVER_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "wdb-crawler", "msedgedriver.json")
+
+# url patterns of images, videos, audio and fonts, Instagram's CDN urls have a query string after the extension
+BLOCKED_URL_PATTERNS = [
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.heic*", "*.avif*", "*.svg*", "*.ico*",
+    "*.mp4*", "*.webm*", "*.m4v*", "*.m4a*", "*.mp3*", "*.m3u8*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+]
+
+class DriverProfile():
+    """Browser options of the crawler drivers. The crawler only reads text, likes and dates, so a light profile can skip most of what
+    a browser does for a human: rendering without a window, waiting for images and videos, downloading media and fonts, extensions and the GPU.
+    """
+
+    def __init__(self, headless = False, page_load_strategy = "normal", block_media = False, blocked_url_patterns = BLOCKED_URL_PATTERNS, disable_extensions = False, disable_gpu = False, cache_size_mb = None, window_size = None, background_throttling = True):
+        """
+        Args:
+            headless (bool, optional): If True, the browser runs without a window. Defaults to False.
+            page_load_strategy (str, optional): "normal" waits for all resources in driver.get(), "eager" only for the DOM. Defaults to "normal".
+            block_media (bool, optional): If True, images aren't loaded and requests matching blocked_url_patterns are blocked through CDP. Defaults to False.
+            blocked_url_patterns (list of strings, optional): Url patterns blocked if block_media is True. Defaults to BLOCKED_URL_PATTERNS.
+            disable_extensions (bool, optional): Defaults to False.
+            disable_gpu (bool, optional): Defaults to False.
+            cache_size_mb (int, optional): Maximum size of the disk cache. Defaults to None (browser default).
+            window_size (string, optional): Window size like "1280,2000". Defaults to None (browser default).
+            background_throttling (bool, optional): If False, timers and rendering of background tabs aren't throttled, so every tab
+                of a src.tabs.TabPool loads comments at full speed. Defaults to True (browser default).
+        """
+        if page_load_strategy not in ["normal", "eager", "none"]:
+            raise ValueError(f"Unknown page load strategy '{page_load_strategy}'. Choose one of ['normal', 'eager', 'none'].")
+        self.headless = headless
+        self.page_load_strategy = page_load_strategy
+        self.block_media = block_media
+        self.blocked_url_patterns = blocked_url_patterns
+        self.disable_extensions = disable_extensions
+        self.disable_gpu = disable_gpu
+        self.cache_size_mb = cache_size_mb
+        self.window_size = window_size
+        self.background_throttling = background_throttling
+
+    @classmethod
+    def from_config(cls, name):
+        """Creates the profile with the given name from DRIVER_PROFILES in config.py. Unknown names raise a ValueError.
+        """
+        profiles = getattr(config, "DRIVER_PROFILES", {"full": {}})
+        if name not in profiles:
+            raise ValueError(f"Unknown driver profile '{name}'. Choose one of {list(profiles)}.")
+        return cls(**profiles[name])
+
+    def options(self, options = None):
+        """Returns the selenium options of the profile.
+
+        Args:
+            options (selenium ChromiumOptions, optional): Options to add the profile to, e.g. ChromeOptions. Defaults to None (new EdgeOptions).
+        """
+        options = options if options is not None else webdriver.EdgeOptions()
+        options.page_load_strategy = self.page_load_strategy
+        if self.headless:
+            options.add_argument("--headless=new")
+        if self.disable_extensions:
+            options.add_argument("--disable-extensions")
+        if self.disable_gpu:
+            options.add_argument("--disable-gpu")
+        if self.cache_size_mb is not None:
+            options.add_argument(f"--disk-cache-size={self.cache_size_mb * 2**20}")
+        if self.window_size is not None:
+            options.add_argument(f"--window-size={self.window_size}")
+        if not self.background_throttling:
+            options.add_argument("--disable-background-timer-throttling")
+            options.add_argument("--disable-renderer-backgrounding")
+            options.add_argument("--disable-backgrounding-occluded-windows")
+        if self.block_media:
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        return options
+
+    def apply(self, driver):
+        """Applies the settings that need a running driver: blocks the media and font urls through the Chrome DevTools Protocol.
+        """
+        if self.block_media and len(self.blocked_url_patterns) > 0:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(self.blocked_url_patterns)})
+        return driver
+
+def make_driver(driver_path, profile = None):
+    """Starts an Edge driver with the given profile.
+
+    Args:
+        driver_path (string): Path of the msedgedriver binary.
+        profile (DriverProfile, optional): Browser options. Defaults to None (the browser defaults).
+
+    Returns:
+        selenium.webdriver.ChromiumEdge: The started driver.
+    """
+    profile = profile if profile is not None else DriverProfile()
+    return profile.apply(webdriver.ChromiumEdge(service=Service(driver_path), options=profile.options()))
+
+def _executable(path):
+    return path is not None and os.path.isfile(path) and os.access(path, os.X_OK)
+
+def resolve_driver_path(driver_path = None, cache_path = DRIVER_CACHE_PATH, refresh = False, offline = False):
+    """Returns the path of the msedgedriver binary, without a network request whenever a local driver is known. Tries in order:
+    driver_path or the EDGE_DRIVER_PATH environment variable, the driver resolved by an earlier run (stored in cache_path),
+    msedgedriver on the PATH, and only then EdgeChromiumDriverManager, which looks up the driver version online and downloads it.
+    webdriver_manager is only imported in that last case. Its result is stored in cache_path for the next runs.
+
+    Args:
+        driver_path (string, optional): Explicit path of the driver. Defaults to None (the EDGE_DRIVER_PATH environment variable, if set).
+        cache_path (string, optional): Json file of the cached driver path. Defaults to DRIVER_CACHE_PATH.
+        refresh (bool, optional): If True, skips the cache and the PATH and asks EdgeChromiumDriverManager, e.g. after a browser
+            update made the cached driver incompatible. Defaults to False.
+        offline (bool, optional): If True, never uses the network. Defaults to False.
+
+    Raises:
+        FileNotFoundError: If driver_path doesn't exist, or if offline is True and no local driver is found.
+
+    Returns:
+        string: Path of the driver.
+    """
+    driver_path = driver_path or os.getenv("EDGE_DRIVER_PATH")
+    if driver_path:
+        if not _executable(driver_path):
+            raise FileNotFoundError(f"Driver '{driver_path}' doesn't exist or isn't executable.")
+        return driver_path
+    if not refresh:
+        try:
+            with open(cache_path) as fp:
+                cached = json.load(fp).get("path")
+        except (OSError, ValueError):
+            cached = None
+        if _executable(cached):
+            return cached
+        on_path = shutil.which("msedgedriver")
+        if on_path is not None:
+            return on_path
+    if offline:
+        raise FileNotFoundError(f"No cached msedgedriver in {cache_path} and none on the PATH. Set -driver-path or EDGE_DRIVER_PATH, or run once with network access.")
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+    driver_path = EdgeChromiumDriverManager().install()
+    if cache_path:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump({"path": driver_path, "resolved": datetime.now().isoformat(timespec="seconds")}, fp)
+        os.replace(tmp_path, cache_path)
+    return driver_path
@@ -1,54 +1,934 @@
 import os
+import re
+import gzip
+import json
+import uuid
+import sqlite3
+import time
+from datetime import datetime
 import pandas as pd
+from src.records import ENTRY_COLUMNS, ENTRY_KEY_NAMESPACE, entry_key, entry_values
+from src.normalize import normalize_frame, parse_counts
+from src.index import EntryIndex
+
+# optional dependency of ParquetInstagramDatabase
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+def plain_value(value):
+    """Converts values that sqlite3 and json can't store natively: datetimes to iso strings, numpy scalars to python values and missing values to None.
+    """
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if pd.isna(value):
+        return None
+    if hasattr(value, "item"):
+        # numpy scalars
+        return value.item()
+    return str(value)
 
 class InstagramDatabase():
     """Class to implement database for InstagramCrawler.
+
+    New entries are collected in an in-memory buffer of plain tuples. They are only turned into columns when the buffer is flushed
+    and save_db_state() appends the new rows to the csv file instead of rewriting the whole file. With normalize=True, every
+    flushed block is normalized on its own (see src.normalize), so the csv file and df hold counts and dates instead of the page text.
+
+    Adding an entry with a unique identifier that is already in the database replaces it: the csv file keeps the earlier row, df,
+    get_entry(), known_keys() and the query methods only the last one.
+
+    The query methods (entries_of_post(), entries_of_commenter(), replies(), thread() and post_stats()) use an src.index.EntryIndex
+    that is built from df on the first query and kept up to date by add_entry(), so they don't scan df.
     """
 
-    def __init__(self, path, file_name, columns = ["post_url", "is_post", "commenter", "text", "replies_to", "replies_count", "likes", "date", "crawl_time"]):
+    def __init__(self, path, file_name, columns = ENTRY_COLUMNS, buffer_size = 10000, normalize = False):
         self.columns = columns
+        self.normalize = normalize
         if (path == None) or (path == ""):
             raise ValueError("Path to database is not defined.")
         if (file_name == None) or (file_name == ""):
             raise ValueError("File name is not defined.")
         self.file_name = file_name
         self.path = os.path.join(path, self.file_name + ".csv")
+        self.buffer_size = buffer_size
+
+        # rows added since the last flush: list of (uuid, tuple of values in the order of self.columns)
+        self._buffer = []
+        # column blocks that are flushed from the buffer but not yet written to disk
+        self._pending = []
+        # column blocks of the whole database, concatenated lazily when self.df is accessed
+        self._frames = []
+        # the existing file is only read when self.df is accessed
+        self._history_loaded = True
+        # False as long as the history read from the file wasn't checked for entries that were saved several times
+        self._deduplicated = True
+        # unique identifiers per post url, built on the first known_keys() call
+        self._keys_by_post = None
+        # hash indexes of the query methods, built on the first query
+        self._index = None
 
         #create path and file if it doesnt exist
         if os.path.exists(self.path):
-            self.df = pd.read_csv(self.path, low_memory=False)
+            self._file_columns = list(pd.read_csv(self.path, index_col=0, nrows=0).columns)
+            self._history_loaded = False
         else:
-            self.df = pd.DataFrame(columns=columns)
-
             if not os.path.exists(path):
                 os.makedirs(path, exist_ok=True)
-            self.save_db_state()
+            self._file_columns = list(columns)
+            pd.DataFrame(columns=columns).to_csv(self.path)
+
+    @property
+    def df(self):
+        """pandas.DataFrame with all entries of the database, including the ones that are not saved to disk yet.
+        The csv file is read on first access.
+        """
+        self._flush_buffer()
+        if not self._history_loaded:
+            # the file already holds every saved row, only the pending ones have to be added
+            history = pd.read_csv(self.path, index_col=0, low_memory=False)
+            if self.normalize:
+                history = normalize_frame(history, categorical=False)
+            self._frames = [history] + self._pending
+            self._history_loaded = True
+            self._deduplicated = False
+        frames = [frame for frame in self._frames if len(frame) > 0]
+        if len(frames) == 0:
+            return pd.DataFrame(columns=self._file_columns)
+        if len(frames) > 1 or not self._deduplicated:
+            frame = pd.concat(frames) if len(frames) > 1 else frames[0]
+            if not frame.index.is_unique:
+                # an entry that was added again, e.g. by crawling a post again, replaces the earlier row
+                frame = frame[~frame.index.duplicated(keep="last")]
+            frames = [frame]
+            self._deduplicated = True
+        self._frames = frames
+        return frames[0]
+
+    @property
+    def index(self):
+        """src.index.EntryIndex of all entries. Built from df on first access, then kept up to date by add_entry().
+        """
+        if self._index is None:
+            index = EntryIndex(self.columns)
+            index.add_frame(self.df)
+            self._index = index
+        return self._index
+
+    def _query(self, keys):
+        frame = self.index.frame(keys)
+        if self.normalize:
+            # the index holds the raw values of entries added since it was built
+            frame = normalize_frame(frame, categorical=False)
+        return frame
 
     def get_entry(self, idx):
-        """_summary_
+        """Retrieves an entry by its position in the database or by its unique identifier.
 
         Args:
-            id (string or int): Index of the entry to retrieve
+            idx (int or string): Position of the entry or unique identifier used in add_entry().
 
         Returns:
-            _type_: _description_
+            pandas.Series object: The entry, named after its unique identifier.
         """
+        if isinstance(idx, str):
+            if idx not in self.index:
+                raise KeyError(idx)
+            return self._query([idx]).iloc[0]
         return self.df.iloc[idx]
 
+    def entries_of_post(self, post_url):
+        """Returns the post entry, comments and replies of a post in the order they were added.
+
+        Args:
+            post_url (string): Url of the post.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        return self._query(self.index.keys("post_url", post_url))
+
+    def entries_of_commenter(self, commenter):
+        """Returns all posts, comments and replies of an account across posts in the order they were added.
+
+        Args:
+            commenter (string): Account name.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        return self._query(self.index.keys("commenter", commenter))
+
+    def replies(self, id):
+        """Returns the replies to a comment in the order they were added.
+
+        Args:
+            id (string): Unique identifier of the comment.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        return self._query(self.index.keys("replies_to", str(id)))
+
+    def thread(self, id):
+        """Returns a comment and all replies below it, every reply after the entry it replies to. Raises a KeyError if there is no entry with the id.
+
+        Args:
+            id (string): Unique identifier of the comment.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        return self._query(self.index.thread(id))
+
+    def post_stats(self, post_url = None):
+        """Returns the number of comments and replies and the sum of their likes per post, plus the likes of the post itself.
+        The aggregates are kept up to date by add_entry().
+
+        Args:
+            post_url (string, optional): Url of the post. Defaults to None, all posts.
+
+        Returns:
+            dict or pandas.DataFrame: comments, replies, likes and post_likes of the post, or of all posts indexed by post_url.
+        """
+        if post_url is None:
+            return self.index.stats_frame()
+        stats = self.index.post_stats.get(post_url)
+        if stats is None:
+            raise KeyError(post_url)
+        return stats.to_dict()
+
     def add_entry(self, post_uuid, post_entry):
-        """Adds a new entry to the database.
+        """Adds a new entry to the database. The entry is buffered and written to disk on the next save_db_state() call
+        or as soon as the buffer holds buffer_size entries.
 
         Args:
             post_uuid (string): Unique identifier for the entry.
-            post_entry (pandas.Series object): Entry to add to the database.
+            post_entry (src.records.Entry, pandas.Series object or dict): Entry to add to the database.
         """
-        self.df.loc[post_uuid] = post_entry
-    
+        values = entry_values(post_entry, self.columns)
+        self._buffer.append((str(post_uuid), values))
+        if self._index is not None:
+            self._index.add(post_uuid, values)
+        if self._keys_by_post is not None:
+            self._keys_by_post.setdefault(post_entry.get("post_url"), set()).add(str(post_uuid))
+        if len(self._buffer) >= self.buffer_size:
+            self.save_db_state()
+
+    def known_keys(self, post_url):
+        """Returns the unique identifiers of all entries of a post. The index of all posts is built from self.df on the first call
+        and kept up to date by add_entry().
+
+        Args:
+            post_url (string): Url of the post.
+
+        Returns:
+            set of strings: Unique identifiers of the post's entries.
+        """
+        if self._keys_by_post is None:
+            df = self.df
+            self._keys_by_post = {url: set(keys) for url, keys in df.index.astype(str).groupby(df["post_url"]).items()} if len(df) > 0 else {}
+        return set(self._keys_by_post.get(post_url, set()))
+
     def delete_entry(self, id):
         raise NotImplementedError()
 
     def update_entry(self, id, content):
         raise NotImplementedError()
 
+    def _flush_buffer(self):
+        """Turns the buffered rows into one block of columns.
+        """
+        if len(self._buffer) == 0:
+            return
+        uuids, rows = zip(*self._buffer)
+        self._buffer = []
+        frame = pd.DataFrame.from_records(list(rows), columns=self.columns, index=list(uuids))
+        if self.normalize:
+            # strings instead of categoricals, their categories would differ between the blocks
+            frame = normalize_frame(frame, categorical=False)
+        self._pending.append(frame)
+        self._frames.append(frame)
+
     def save_db_state(self):
-        self.df.to_csv(self.path)
\ No newline at end of file
+        """Appends all entries that were added since the last call to the csv file.
+        """
+        self._flush_buffer()
+        for frame in self._pending:
+            # keep the column layout of an already existing file
+            frame.reindex(columns=self._file_columns).to_csv(self.path, mode="a", header=False)
+        self._pending = []
+
+class SQLiteInstagramDatabase():
+    """Class to implement an SQLite database for InstagramCrawler with the same interface as InstagramDatabase.
+
+    Nothing is loaded at construction, so startup time and memory don't depend on the size of the data already crawled.
+    The database runs in WAL mode and every save_db_state() writes the buffered entries with a single executemany()
+    inside one transaction. Multiple crawler processes can write to the same file at the same time.
+
+    The query methods of InstagramDatabase (entries_of_post(), entries_of_commenter(), replies(), thread() and post_stats()) run
+    on the indexes on INDEXED_COLUMNS. post_stats() aggregates when it is called, using the index on post_url for a single post.
+    """
+
+    INDEXED_COLUMNS = ["post_url", "replies_to", "commenter"]
+
+    def __init__(self, path, file_name, columns = ENTRY_COLUMNS, buffer_size = 10000, timeout = 30):
+        self.columns = columns
+        if (path == None) or (path == ""):
+            raise ValueError("Path to database is not defined.")
+        if (file_name == None) or (file_name == ""):
+            raise ValueError("File name is not defined.")
+        self.file_name = file_name
+        self.path = os.path.join(path, self.file_name + ".sqlite")
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+
+        # transactions are started explicitly, see _transaction()
+        self.connection = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS entries (uuid TEXT PRIMARY KEY, {', '.join(columns)})")
+        for column in self.INDEXED_COLUMNS:
+            if column in columns:
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_entries_{column} ON entries ({column})")
+
+        self._select = f"SELECT uuid, {', '.join(columns)} FROM entries"
+        self._insert = f"INSERT OR REPLACE INTO entries (uuid, {', '.join(columns)}) VALUES ({', '.join(['?'] * (len(columns) + 1))})"
+
+    @staticmethod
+    def _to_sql_value(value):
+        """Converts values that sqlite3 can't store natively.
+        """
+        return plain_value(value)
+
+    def _transaction(self, statement, parameters):
+        """Runs a statement in its own write transaction. BEGIN IMMEDIATE takes the write lock right away, so concurrent
+        writers wait for each other (up to the connection timeout) instead of failing halfway through the transaction.
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if isinstance(parameters, list):
+                cursor.executemany(statement, parameters)
+            else:
+                cursor.execute(statement, parameters)
+            rowcount = cursor.rowcount
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return rowcount
+
+    def _to_series(self, row):
+        return pd.Series(row[1:], index=self.columns, name=row[0])
+
+    @property
+    def df(self):
+        """pandas.DataFrame with all entries of the database. Loads the whole table, use get_entry() for single entries.
+        """
+        self.save_db_state()
+        return pd.read_sql_query("SELECT * FROM entries ORDER BY rowid", self.connection, index_col="uuid")
+
+    def get_entry(self, idx):
+        """Retrieves an entry by its position in the database or by its unique identifier.
+
+        Args:
+            idx (int or string): Position of the entry or unique identifier used in add_entry().
+
+        Returns:
+            pandas.Series object: The entry, named after its unique identifier.
+        """
+        self.save_db_state()
+        if isinstance(idx, int):
+            if idx < 0:
+                idx += self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            row = self.connection.execute(self._select + " ORDER BY rowid LIMIT 1 OFFSET ?", (idx,)).fetchone() if idx >= 0 else None
+            if row is None:
+                raise IndexError(f"Entry position {idx} is out of bounds.")
+        else:
+            row = self.connection.execute(self._select + " WHERE uuid = ?", (str(idx),)).fetchone()
+            if row is None:
+                raise KeyError(idx)
+        return self._to_series(row)
+
+    def add_entry(self, post_uuid, post_entry):
+        """Adds a new entry to the database. The entry is buffered and written on the next save_db_state() call
+        or as soon as the buffer holds buffer_size entries.
+
+        Args:
+            post_uuid (string): Unique identifier for the entry.
+            post_entry (src.records.Entry, pandas.Series object or dict): Entry to add to the database.
+        """
+        self._buffer.append((str(post_uuid),) + tuple(map(plain_value, entry_values(post_entry, self.columns))))
+        if len(self._buffer) >= self.buffer_size:
+            self.save_db_state()
+
+    def _query(self, where, parameters):
+        self.save_db_state()
+        return pd.read_sql_query(f"SELECT * FROM entries WHERE {where} ORDER BY rowid", self.connection, params=parameters, index_col="uuid")
+
+    def entries_of_post(self, post_url):
+        """Returns the post entry, comments and replies of a post in the order they were added.
+
+        Args:
+            post_url (string): Url of the post.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        return self._query("post_url = ?", (post_url,))
+
+    def entries_of_commenter(self, commenter):
+        """Returns all posts, comments and replies of an account across posts in the order they were added.
+
+        Args:
+            commenter (string): Account name.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        return self._query("commenter = ?", (commenter,))
+
+    def replies(self, id):
+        """Returns the replies to a comment in the order they were added.
+
+        Args:
+            id (string): Unique identifier of the comment.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        return self._query("replies_to = ?", (str(id),))
+
+    def thread(self, id):
+        """Returns a comment and all replies below it, every reply after the entry it replies to. Raises a KeyError if there is no entry with the id.
+
+        Args:
+            id (string): Unique identifier of the comment.
+
+        Returns:
+            pandas.DataFrame: Entries indexed by their unique identifier.
+        """
+        self.save_db_state()
+        # the path of rowids orders the thread depth first
+        frame = pd.read_sql_query(
+            "WITH RECURSIVE thread(uuid, path) AS ("
+            " SELECT uuid, printf('%012d', rowid) FROM entries WHERE uuid = ?"
+            " UNION ALL SELECT entries.uuid, thread.path || '/' || printf('%012d', entries.rowid) FROM entries JOIN thread ON entries.replies_to = thread.uuid)"
+            " SELECT entries.* FROM thread JOIN entries ON entries.uuid = thread.uuid ORDER BY thread.path",
+            self.connection, params=(str(id),), index_col="uuid")
+        if len(frame) == 0:
+            raise KeyError(id)
+        return frame
+
+    def post_stats(self, post_url = None):
+        """Returns the number of comments and replies and the sum of their likes per post, plus the likes of the post itself.
+
+        Args:
+            post_url (string, optional): Url of the post. Defaults to None, all posts.
+
+        Returns:
+            dict or pandas.DataFrame: comments, replies, likes and post_likes of the post, or of all posts indexed by post_url.
+        """
+        self.save_db_state()
+        query = "SELECT post_url, is_post, replies_to, likes FROM entries"
+        frame = pd.read_sql_query(query + (" WHERE post_url = ?" if post_url is not None else ""), self.connection, params=(post_url,) if post_url is not None else None)
+        if post_url is not None and len(frame) == 0:
+            raise KeyError(post_url)
+        likes = parse_counts(frame["likes"])
+        is_post = frame["is_post"].astype(str).str.lower().isin(["1", "true"])
+        is_reply = frame["replies_to"].notna() & ~is_post
+        stats = pd.DataFrame({
+            "comments": (~is_post & ~is_reply).groupby(frame["post_url"], sort=False).sum(),
+            "replies": is_reply.groupby(frame["post_url"], sort=False).sum(),
+            "likes": likes.where(~is_post, 0).fillna(0).groupby(frame["post_url"], sort=False).sum().astype(int),
+            "post_likes": likes.where(is_post).groupby(frame["post_url"], sort=False).max().astype("Int64"),
+        })
+        stats.index.name = "post_url"
+        if post_url is not None:
+            return {column: (None if pd.isna(value) else int(value)) for column, value in stats.iloc[0].items()}
+        return stats
+
+    def known_keys(self, post_url):
+        """Returns the unique identifiers of all entries of a post, using the index on post_url.
+
+        Args:
+            post_url (string): Url of the post.
+
+        Returns:
+            set of strings: Unique identifiers of the post's entries.
+        """
+        self.save_db_state()
+        return {row[0] for row in self.connection.execute("SELECT uuid FROM entries WHERE post_url = ?", (post_url,))}
+
+    def delete_entry(self, id):
+        """Deletes an entry from the database.
+
+        Args:
+            id (string): Unique identifier of the entry.
+        """
+        self.save_db_state()
+        if self._transaction("DELETE FROM entries WHERE uuid = ?", (str(id),)) == 0:
+            raise KeyError(id)
+
+    def update_entry(self, id, content):
+        """Updates the given columns of an entry.
+
+        Args:
+            id (string): Unique identifier of the entry.
+            content (pandas.Series object or dict): New values by column name. Columns that are not part of the database raise a ValueError.
+        """
+        content = dict(content)
+        unknown_columns = [column for column in content if column not in self.columns]
+        if len(unknown_columns) > 0:
+            raise ValueError(f"Unknown columns: {unknown_columns}")
+        if len(content) == 0:
+            return
+        self.save_db_state()
+        assignments = ", ".join(f"{column} = ?" for column in content)
+        parameters = tuple(self._to_sql_value(value) for value in content.values()) + (str(id),)
+        if self._transaction(f"UPDATE entries SET {assignments} WHERE uuid = ?", parameters) == 0:
+            raise KeyError(id)
+
+    def save_db_state(self):
+        """Writes all buffered entries in one transaction.
+        """
+        if len(self._buffer) == 0:
+            return
+        rows, self._buffer = self._buffer, []
+        self._transaction(self._insert, rows)
+
+    def close(self):
+        """Writes buffered entries and closes the connection.
+        """
+        self.save_db_state()
+        self.connection.close()
+
+def typed_frame(frame):
+    """Converts the raw values scraped by InstagramCrawler to proper dtypes: likes and replies_count as nullable integers
+    ("1,234 likes" -> 1234, "12.3K likes" -> 12300), date and crawl_time as datetime64, is_post as boolean and post_url/commenter
+    as categoricals. See src.normalize.normalize_frame().
+
+    Args:
+        frame (pandas.DataFrame): Entries with the columns of InstagramDatabase.
+
+    Returns:
+        pandas.DataFrame: Typed copy of the entries.
+    """
+    return normalize_frame(frame)
+
+class ParquetInstagramDatabase():
+    """Class to implement a typed, columnar database for InstagramCrawler with the same interface as InstagramDatabase.
+
+    Entries are stored as compressed parquet files partitioned by account and crawl date:
+    [path]/parquet/account=[file name]/crawl_date=[YYYY-MM-DD]/part-[time in ns]-[random].parquet
+    Every save_db_state() writes one new file per crawl date, nothing is read at construction. The files are read in the order of
+    their names, so the time prefix keeps the entries in the order they were added. Use scan() to read
+    only some columns and rows of the data, the column selection and filters are pushed down to the parquet reader.
+    Adding an entry with a unique identifier that is already saved, e.g. by crawling a post again, writes it again: df, get_entry()
+    and known_keys() only see its last row, like InstagramDatabase and load_ndjson(), scan() returns the rows as they are stored.
+    Needs the pyarrow package.
+    """
+
+    CATEGORICAL_COLUMNS = ["post_url", "commenter"]
+
+    def __init__(self, path, file_name, columns = ENTRY_COLUMNS, buffer_size = 10000, compression = "zstd"):
+        if pa is None:
+            raise ImportError("ParquetInstagramDatabase needs the pyarrow package: pip install pyarrow")
+        self.columns = columns
+        if (path == None) or (path == ""):
+            raise ValueError("Path to database is not defined.")
+        if (file_name == None) or (file_name == ""):
+            raise ValueError("File name is not defined.")
+        self.file_name = file_name
+        self.path = os.path.join(path, "parquet", "account=" + self.file_name)
+        self.buffer_size = buffer_size
+        self.compression = compression
+        self._buffer = []
+        # time prefix of the last written file, the next one is always greater even if the clock is coarse or goes back
+        self._last_part = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def dataset(self):
+        """Returns a lazy pyarrow.dataset.Dataset over all saved files of the account. Nothing is read until the dataset is scanned.
+        """
+        partitioning = ds.partitioning(pa.schema([("crawl_date", pa.string())]), flavor="hive")
+        return ds.dataset(self.path, format="parquet", partitioning=partitioning)
+
+    def scan(self, columns = None, filters = None):
+        """Reads the saved entries of the account, only touching the requested columns and row groups.
+
+        Args:
+            columns (list of strings, optional): Columns to read, "uuid" and "crawl_date" are available as well. Defaults to all columns.
+            filters (pyarrow.dataset.Expression or list of tuples, optional): Row filter, either an expression or in the
+                pandas/pyarrow format [("likes", ">", 100), ("crawl_date", ">=", "2022-12-01")]. Defaults to None.
+
+        Returns:
+            pandas.DataFrame: The matching entries with categorical post_url and commenter columns.
+        """
+        self.save_db_state()
+        if filters is not None and not isinstance(filters, ds.Expression):
+            filters = pq.filters_to_expression(filters)
+        frame = self.dataset().to_table(columns=columns, filter=filters).to_pandas()
+        for column in self.CATEGORICAL_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].astype("category")
+        return frame
+
+    @property
+    def df(self):
+        """pandas.DataFrame with all entries of the database indexed by their unique identifier. Loads all files, use scan() to read less.
+        """
+        return self.scan().drop_duplicates("uuid", keep="last").set_index("uuid")
+
+    def get_entry(self, idx):
+        """Retrieves an entry by its position in the database or by its unique identifier.
+
+        Args:
+            idx (int or string): Position of the entry or unique identifier used in add_entry().
+
+        Returns:
+            pandas.Series object: The entry, named after its unique identifier.
+        """
+        self.save_db_state()
+        if isinstance(idx, int):
+            # positions in df, which only has the last row of every uuid, mapped to the rows of the files
+            uuids = self.scan(columns=["uuid"])["uuid"]
+            rows = uuids.index[~uuids.duplicated(keep="last")]
+            position = idx + len(rows) if idx < 0 else idx
+            if not 0 <= position < len(rows):
+                raise IndexError(f"Entry position {idx} is out of bounds.")
+            frame = self.dataset().take([rows[position]]).to_pandas()
+        else:
+            frame = self.scan(filters=ds.field("uuid") == str(idx))
+            if len(frame) == 0:
+                raise KeyError(idx)
+        return frame.set_index("uuid").iloc[-1]
+
+    def add_entry(self, post_uuid, post_entry):
+        """Adds a new entry to the database. The entry is buffered and written on the next save_db_state() call
+        or as soon as the buffer holds buffer_size entries.
+
+        Args:
+            post_uuid (string): Unique identifier for the entry.
+            post_entry (src.records.Entry, pandas.Series object or dict): Entry to add to the database.
+        """
+        self._buffer.append((str(post_uuid),) + entry_values(post_entry, self.columns))
+        if len(self._buffer) >= self.buffer_size:
+            self.save_db_state()
+
+    def known_keys(self, post_url):
+        """Returns the unique identifiers of all entries of a post. Only reads the uuid and post_url columns.
+
+        Args:
+            post_url (string): Url of the post.
+
+        Returns:
+            set of strings: Unique identifiers of the post's entries.
+        """
+        if not os.listdir(self.path) and len(self._buffer) == 0:
+            return set()
+        return set(self.scan(columns=["uuid"], filters=ds.field("post_url") == post_url)["uuid"])
+
+    def delete_entry(self, id):
+        raise NotImplementedError()
+
+    def update_entry(self, id, content):
+        raise NotImplementedError()
+
+    def save_db_state(self):
+        """Writes all buffered entries to one new parquet file per crawl date.
+        """
+        if len(self._buffer) == 0:
+            return
+        rows, self._buffer = self._buffer, []
+        frame = typed_frame(pd.DataFrame.from_records(rows, columns=["uuid"] + self.columns))
+        # categories differ between files, they are restored by scan()
+        for column in self.CATEGORICAL_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].astype("string")
+        crawl_dates = frame["crawl_time"].dt.strftime("%Y-%m-%d").fillna("unknown") if "crawl_time" in frame else pd.Series("unknown", index=frame.index)
+        self._last_part = max(time.time_ns(), self._last_part + 1)
+        for crawl_date, partition in frame.groupby(crawl_dates):
+            directory = os.path.join(self.path, "crawl_date=" + crawl_date)
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(partition, preserve_index=False)
+            pq.write_table(table, os.path.join(directory, f"part-{self._last_part:020d}-{uuid.uuid4().hex[:8]}.parquet"), compression=self.compression)
+
+class NDJSONInstagramDatabase():
+    """Class to implement a streaming database for InstagramCrawler with the same interface as InstagramDatabase.
+
+    Every entry is written as one json line as soon as it is added, nothing is kept in memory, so memory doesn't grow with the
+    size of a post or of the run. The lines are flushed (and fsynced) every flush_every entries and on save_db_state(), so a crash
+    in the middle of a post only loses the last unflushed entries. Files are append-only and rotated by size:
+    [path]/ndjson/[file name]/part-[number].ndjson(.gz). Every run starts a new part, a line cut off by a crash is skipped when reading.
+    Use load_ndjson() or df to build a DataFrame from the files and copy_ndjson() to copy them into another backend.
+    """
+
+    # entries are written as they are added, src.workers.SynchronizedDatabase hands them over right away instead of per post
+    streaming = True
+
+    def __init__(self, path, file_name, columns = ENTRY_COLUMNS, compression = None, max_file_mb = 256, flush_every = 1000, fsync = True):
+        """
+        Args:
+            path (string): Directory of the database files.
+            file_name (string): Name of the database, usually the crawled account name.
+            columns (list of strings, optional): Columns of an entry. Defaults to the columns of InstagramDatabase.
+            compression (string, optional): None or "gzip". Defaults to None.
+            max_file_mb (float, optional): Size in MB (compressed) after which a new part file is started. Defaults to 256.
+            flush_every (int, optional): Number of entries after which the file is flushed. Defaults to 1000.
+            fsync (bool, optional): If True, every flush also fsyncs the file, so the entries survive a crash of the machine. Defaults to True.
+        """
+        if compression not in [None, "gzip"]:
+            raise ValueError(f"Unknown compression '{compression}'. Choose None or 'gzip'.")
+        self.columns = columns
+        if (path == None) or (path == ""):
+            raise ValueError("Path to database is not defined.")
+        if (file_name == None) or (file_name == ""):
+            raise ValueError("File name is not defined.")
+        self.file_name = file_name
+        self.path = os.path.join(path, "ndjson", self.file_name)
+        self.compression = compression
+        self.max_bytes = max_file_mb * 2**20
+        self.flush_every = flush_every
+        self.fsync = fsync
+        self._raw = None
+        self._fp = None
+        self._unflushed = 0
+        # unique identifiers per post url, built on the first known_keys() call
+        self._keys_by_post = None
+        os.makedirs(self.path, exist_ok=True)
+
+    def part_paths(self):
+        """Returns the paths of all part files in the order they were written.
+        """
+        return ndjson_part_paths(self.path)
+
+    def _open_part(self):
+        numbers = [int(re.search(r"part-(\d+)", os.path.basename(part)).group(1)) for part in self.part_paths()]
+        suffix = ".ndjson.gz" if self.compression == "gzip" else ".ndjson"
+        part_path = os.path.join(self.path, f"part-{max(numbers, default=0) + 1:05d}{suffix}")
+        self._raw = open(part_path, "ab")
+        self._fp = gzip.GzipFile(fileobj=self._raw, mode="ab") if self.compression == "gzip" else self._raw
+
+    def _close_part(self):
+        if self._fp is None:
+            return
+        self.flush()
+        if self._fp is not self._raw:
+            self._fp.close()
+        self._raw.close()
+        self._raw = None
+        self._fp = None
+
+    def flush(self):
+        """Hands the written lines to the operating system and, if fsync is set, waits until they are on disk.
+        """
+        if self._fp is None:
+            return
+        self._fp.flush()
+        self._raw.flush()
+        if self.fsync:
+            os.fsync(self._raw.fileno())
+        self._unflushed = 0
+
+    def add_entry(self, post_uuid, post_entry):
+        """Writes a new entry to the current part file.
+
+        Args:
+            post_uuid (string): Unique identifier for the entry.
+            post_entry (src.records.Entry, pandas.Series object or dict): Entry to add to the database.
+        """
+        if self._fp is None:
+            self._open_part()
+        record = {"uuid": str(post_uuid)}
+        record.update(zip(self.columns, map(plain_value, entry_values(post_entry, self.columns))))
+        self._fp.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._unflushed += 1
+        if self._keys_by_post is not None:
+            self._keys_by_post.setdefault(record.get("post_url"), set()).add(record["uuid"])
+        if self._unflushed >= self.flush_every:
+            self.flush()
+            # the size of a compressed part is only known after a flush
+            if self._raw.tell() >= self.max_bytes:
+                self._close_part()
+
+    def known_keys(self, post_url):
+        """Returns the unique identifiers of all entries of a post. The index of all posts is built by reading the uuid and
+        post_url of every line on the first call and kept up to date by add_entry().
+
+        Args:
+            post_url (string): Url of the post.
+
+        Returns:
+            set of strings: Unique identifiers of the post's entries.
+        """
+        if self._keys_by_post is None:
+            self.flush()
+            self._keys_by_post = {}
+            for record in read_ndjson(self.path):
+                self._keys_by_post.setdefault(record.get("post_url"), set()).add(record["uuid"])
+        return set(self._keys_by_post.get(post_url, set()))
+
+    @property
+    def df(self):
+        """pandas.DataFrame with all entries of the database indexed by their unique identifier. Reads all part files.
+        """
+        self.flush()
+        return load_ndjson(self.path, self.columns)
+
+    def get_entry(self, idx):
+        """Retrieves an entry by its position in the database or by its unique identifier. Reads all part files.
+
+        Args:
+            idx (int or string): Position of the entry or unique identifier used in add_entry().
+
+        Returns:
+            pandas.Series object: The entry, named after its unique identifier.
+        """
+        df = self.df
+        if isinstance(idx, int):
+            return df.iloc[idx]
+        return df.loc[str(idx)]
+
+    def delete_entry(self, id):
+        raise NotImplementedError()
+
+    def update_entry(self, id, content):
+        raise NotImplementedError()
+
+    def save_db_state(self):
+        """Flushes the written entries. Rotates to a new part file if the current one reached max_file_mb.
+        """
+        self.flush()
+        if self._raw is not None and self._raw.tell() >= self.max_bytes:
+            self._close_part()
+
+    def close(self):
+        """Flushes and closes the current part file.
+        """
+        self._close_part()
+
+def ndjson_part_paths(path):
+    """Returns the part files of an NDJSONInstagramDatabase directory in the order they were written.
+    """
+    if not os.path.exists(path):
+        return []
+    parts = [name for name in os.listdir(path) if re.fullmatch(r"part-\d+\.ndjson(\.gz)?", name)]
+    return [os.path.join(path, name) for name in sorted(parts, key=lambda name: int(re.search(r"\d+", name).group()))]
+
+def read_ndjson(path):
+    """Yields the entries of an NDJSONInstagramDatabase directory (or of a single part file) as dicts, one line at a time.
+    A line that can't be parsed, e.g. cut off by a crash, is skipped with a warning.
+
+    Args:
+        path (string): Directory of the part files, [path]/ndjson/[file name], or path of one part file.
+
+    Yields:
+        dict: The entry with its unique identifier under "uuid".
+    """
+    parts = [path] if os.path.isfile(path) else ndjson_part_paths(path)
+    for part in parts:
+        opener = gzip.open if part.endswith(".gz") else open
+        try:
+            with opener(part, "rt", encoding="utf-8") as fp:
+                for number, line in enumerate(fp, 1):
+                    if line.strip() == "":
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Skipping unreadable line {number} of {part}")
+        except EOFError:
+            # a compressed part that is still being written or was cut off by a crash has no end-of-stream marker
+            pass
+
+def load_ndjson(path, columns = None, typed = False, chunk_size = 100000):
+    """Builds a DataFrame from the entries of an NDJSONInstagramDatabase directory. Entries that were written several times,
+    e.g. by crawling a post again after a crash, are kept once with their last values.
+
+    Args:
+        path (string): Directory of the part files, [path]/ndjson/[file name], or path of one part file.
+        columns (list of strings, optional): Columns to keep. Defaults to None (all columns).
+        typed (bool, optional): If True, converts the values with typed_frame(). Defaults to False.
+        chunk_size (int, optional): Number of lines turned into columns at once. Defaults to 100000.
+
+    Returns:
+        pandas.DataFrame: The entries indexed by their unique identifier.
+    """
+    frames = []
+    chunk = []
+    for record in read_ndjson(path):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            frames.append(pd.DataFrame.from_records(chunk))
+            chunk = []
+    if len(chunk) > 0 or len(frames) == 0:
+        frames.append(pd.DataFrame.from_records(chunk, columns=None if len(chunk) > 0 else ["uuid"] + list(columns or [])))
+    frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    frame = frame.drop_duplicates("uuid", keep="last").set_index("uuid")
+    frame.index.name = None
+    if columns is not None:
+        frame = frame.reindex(columns=columns)
+    return typed_frame(frame) if typed else frame
+
+def copy_ndjson(path, DB, batch_size = 10000):
+    """Copies the entries of an NDJSONInstagramDatabase directory into another database, e.g. to build the sqlite or parquet
+    backend from a streaming crawl. Reads and writes batch_size entries at a time.
+
+    Args:
+        path (string): Directory of the part files, [path]/ndjson/[file name], or path of one part file.
+        DB (database object): Database the entries are added to.
+        batch_size (int, optional): Entries between two save_db_state() calls of DB. Defaults to 10000.
+
+    Returns:
+        int: Number of copied entries.
+    """
+    copied = 0
+    for record in read_ndjson(path):
+        post_uuid = record.pop("uuid")
+        DB.add_entry(post_uuid, record)
+        copied += 1
+        if copied % batch_size == 0:
+            DB.save_db_state()
+    DB.save_db_state()
+    return copied
+
+class GzipNDJSONInstagramDatabase(NDJSONInstagramDatabase):
+    """NDJSONInstagramDatabase with gzip compressed part files.
+    """
+
+    def __init__(self, path, file_name, **kwargs):
+        kwargs.setdefault("compression", "gzip")
+        super().__init__(path, file_name, **kwargs)
+
+BACKENDS = {
+    "csv": InstagramDatabase,
+    "sqlite": SQLiteInstagramDatabase,
+    "parquet": ParquetInstagramDatabase,
+    "ndjson": NDJSONInstagramDatabase,
+    "ndjson-gzip": GzipNDJSONInstagramDatabase,
+}
+
+def open_database(path, file_name, backend = "csv", **kwargs):
+    """Creates the database object for the given storage backend.
+
+    Args:
+        path (string): Directory of the database files.
+        file_name (string): Name of the database, usually the crawled account name.
+        backend (str, optional): One of the keys of BACKENDS. Defaults to "csv".
+
+    Returns:
+        database object: Object implementing add_entry, get_entry and save_db_state.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown database backend '{backend}'. Choose one of {list(BACKENDS)}.")
+    return BACKENDS[backend](path, file_name, **kwargs)
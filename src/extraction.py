@@ -0,0 +1,119 @@
+"""JavaScript used by InstagramCrawler to extract all comments of a post or the new post links of an account page with a single
+execute_script call instead of several WebDriver round trips per element. The scripts get the selectors from config.py as
+(By, query) pairs and evaluate them with the same semantics as WebElement.find_element/find_elements.
+"""
+
+# names of the config.py selectors the extraction script needs
+EXTRACTION_SELECTORS = [
+    "POST_COMMENT", "POST_LIKES", "POST_DATE",
+    "ALL_COMMENTS_CONTAINER", "COMMENT_CONTAINER", "COMMENT_TEXT", "COMMENT_OWNER", "COMMENT_LIKES", "COMMENT_DATE",
+    "REPLIES_TO_COMMENT_CONTAINER", "REPLY_TEXT", "REPLY_OWNER", "REPLY_LIKES", "REPLY_DATE",
+]
+
+# arguments[0]: {name: [By strategy, query]} for all EXTRACTION_SELECTORS
+# arguments[1]: index of the first comment container to extract
+# arguments[2]: maximum number of comment containers to extract, null for all
+# arguments[3]: if true, the extracted comment containers are emptied afterwards to free the memory of their nodes. The empty
+#               containers stay in the DOM, so positions and counts of the containers don't change and the page can go on rendering.
+# returns {"post": {...}, "comments": [...], "total": number of comment containers on the page}
+EXTRACT_COMMENTS_SCRIPT = r"""
+const selectors = arguments[0];
+const start = arguments[1] || 0;
+const limit = arguments[2];
+const prune = arguments[3] === true;
+
+function findAll(context, name) {
+    const [by, query] = selectors[name];
+    switch (by) {
+        case "xpath": {
+            const result = document.evaluate(query, context, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+            return nodes;
+        }
+        case "css selector": return Array.from(context.querySelectorAll(query));
+        case "tag name": return Array.from(context.getElementsByTagName(query));
+        case "class name": return Array.from(context.getElementsByClassName(query));
+        case "id": return Array.from(context.querySelectorAll("#" + CSS.escape(query)));
+        case "name": return Array.from(context.querySelectorAll("[name=\"" + CSS.escape(query) + "\"]"));
+        default: throw new Error("Unsupported selector strategy in bulk extraction: " + by);
+    }
+}
+function find(context, name) {
+    const nodes = findAll(context, name);
+    return nodes.length > 0 ? nodes[0] : null;
+}
+function text(element) {
+    if (element === null) return null;
+    return (element.innerText !== undefined ? element.innerText : element.textContent).trim();
+}
+function datetime(element) {
+    return element === null ? null : element.getAttribute("datetime");
+}
+
+const containers = findAll(document, "ALL_COMMENTS_CONTAINER");
+const end = (limit === null || limit === undefined) ? containers.length : Math.min(containers.length, start + limit);
+const comments = [];
+for (let i = start; i < end; i++) {
+    const container = containers[i];
+    const comment = find(container, "COMMENT_CONTAINER");
+    if (comment === null) {
+        comments.push(null);
+        continue;
+    }
+    const replies = findAll(container, "REPLIES_TO_COMMENT_CONTAINER").map(reply => ({
+        text: text(find(reply, "REPLY_TEXT")),
+        owner: text(find(reply, "REPLY_OWNER")),
+        likes: text(find(reply, "REPLY_LIKES")),
+        date: datetime(find(reply, "REPLY_DATE")),
+    }));
+    comments.push({
+        text: text(find(comment, "COMMENT_TEXT")),
+        owner: text(find(comment, "COMMENT_OWNER")),
+        likes: text(find(comment, "COMMENT_LIKES")),
+        date: datetime(find(comment, "COMMENT_DATE")),
+        replies: replies,
+    });
+}
+if (prune) {
+    for (let i = start; i < end; i++) containers[i].replaceChildren();
+}
+
+let post = null;
+if (start === 0) {
+    post = {
+        comment: text(find(document, "POST_COMMENT")),
+        likes: text(find(document, "POST_LIKES")),
+        date: datetime(find(document, "POST_DATE")),
+    };
+}
+return {post: post, comments: comments, total: containers.length};
+"""
+
+# arguments[0]: [By strategy, query] of CURRENTLY_VISIBLE_POSTS
+# returns the canonical urls (origin + path, without query string) of all post links that this script hasn't returned before on the current page
+NEW_POST_URLS_SCRIPT = r"""
+const [by, query] = arguments[0];
+const seen = window.__crawlerSeenPostUrls || (window.__crawlerSeenPostUrls = new Set());
+let links;
+if (by === "xpath") {
+    const result = document.evaluate(query, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    links = [];
+    for (let i = 0; i < result.snapshotLength; i++) links.push(result.snapshotItem(i));
+} else if (by === "css selector") {
+    links = document.querySelectorAll(query);
+} else {
+    throw new Error("Unsupported selector strategy for post discovery: " + by);
+}
+const found = [];
+for (const link of links) {
+    if (!link.href) continue;
+    const url = new URL(link.href);
+    const canonical = url.origin + (url.pathname.endsWith("/") ? url.pathname : url.pathname + "/");
+    if (!seen.has(canonical)) {
+        seen.add(canonical);
+        found.push(canonical);
+    }
+}
+return found;
+"""
@@ -0,0 +1,207 @@
+"""In-memory hash indexes over the entries of a database. Questions like "all comments of post X", "all replies to comment Y" or
+"everything user Z wrote" would otherwise scan the whole DataFrame, and threads only exist through the replies_to column. EntryIndex
+maps the values of post_url, commenter and replies_to to the unique identifiers of their entries and keeps per post aggregates.
+Both are updated entry by entry, so a query costs time in the size of its result and the aggregates are never recomputed.
+"""
+
+from itertools import compress
+
+import pandas as pd
+from src.normalize import parse_booleans, parse_count, parse_counts
+from src.records import ENTRY_COLUMNS
+
+def _missing(value):
+    # NaN and NaT are the only values that differ from themselves
+    return value is None or value is pd.NA or value != value
+
+def _is_true(value):
+    if isinstance(value, str):
+        return value.lower() in ("true", "1")
+    return not _missing(value) and bool(value)
+
+class PostStats():
+    """Aggregates of the entries of one post.
+
+    Attributes:
+        comments (int): Number of comments.
+        replies (int): Number of replies to comments.
+        likes (int): Sum of the likes of the comments and replies.
+        post_likes (int or None): Likes of the post itself, None until the post entry is added or if it has none.
+    """
+
+    __slots__ = ["comments", "replies", "likes", "post_likes"]
+
+    def __init__(self):
+        self.comments = 0
+        self.replies = 0
+        self.likes = 0
+        self.post_likes = None
+
+    def to_dict(self):
+        return {"comments": self.comments, "replies": self.replies, "likes": self.likes, "post_likes": self.post_likes}
+
+class EntryIndex():
+    """Entries by unique identifier, hash indexes on INDEXED_COLUMNS and the PostStats of every post. Every index maps a value to
+    a dict of unique identifiers, used as an ordered set, so entries come back in the order they were added and removing one is cheap.
+    """
+
+    INDEXED_COLUMNS = ["post_url", "commenter", "replies_to"]
+
+    def __init__(self, columns = ENTRY_COLUMNS):
+        """
+        Args:
+            columns (list of strings, optional): Order of the values of the added entries. Defaults to ENTRY_COLUMNS.
+        """
+        self.columns = list(columns)
+        self._position = {column: i for i, column in enumerate(self.columns)}
+        # values of every entry by unique identifier, in the order they were added
+        self.rows = {}
+        self.by_column = {column: {} for column in self.INDEXED_COLUMNS if column in self._position}
+        self.post_stats = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key):
+        return str(key) in self.rows
+
+    def _value(self, values, column):
+        position = self._position.get(column)
+        return None if position is None else values[position]
+
+    def add(self, key, values):
+        """Adds an entry or replaces the entry with the same unique identifier.
+
+        Args:
+            key (string): Unique identifier of the entry.
+            values (tuple): Values of the entry in the order of columns.
+        """
+        key = str(key)
+        if key in self.rows:
+            self.remove(key)
+        self.rows[key] = values
+        for column, keys_by_value in self.by_column.items():
+            value = values[self._position[column]]
+            if not _missing(value):
+                keys_by_value.setdefault(value, {})[key] = None
+        self._count(values, 1)
+
+    def add_frame(self, frame):
+        """Adds all rows of a DataFrame indexed by unique identifier, e.g. the df of a database. The aggregates of the rows are
+        computed on whole columns.
+        """
+        if len(frame) == 0:
+            return
+        frame = frame.reindex(columns=self.columns)
+        keys = frame.index.astype(str).tolist()
+        # tolist() per column is much faster than itertuples() on arrow backed strings
+        rows = zip(*[frame[column].tolist() for column in self.columns])
+        if not frame.index.is_unique or any(key in self.rows for key in keys):
+            # replaced entries have to leave the indexes and aggregates one by one
+            for key, values in zip(keys, rows):
+                self.add(key, values)
+            return
+        self.rows.update(zip(keys, rows))
+        for column, keys_by_value in self.by_column.items():
+            present = frame[column].notna().to_numpy()
+            for value, key in zip(frame[column][present].tolist(), compress(keys, present)):
+                keys_by_value.setdefault(value, {})[key] = None
+
+        is_post = parse_booleans(frame["is_post"]).fillna(False).to_numpy(dtype=bool)
+        is_reply = frame["replies_to"].notna().to_numpy() & ~is_post
+        likes = parse_counts(frame["likes"]).to_numpy(dtype="float64", na_value=float("nan"))
+        grouped = pd.DataFrame({
+            "comments": ~is_post & ~is_reply,
+            "replies": is_reply,
+            "likes": pd.Series(likes).where(~is_post, 0).fillna(0).to_numpy(),
+            "post_likes": pd.Series(likes).where(is_post).to_numpy(),
+        }).groupby(frame["post_url"].to_numpy(), sort=False).agg({"comments": "sum", "replies": "sum", "likes": "sum", "post_likes": "last"})
+        for post_url, comments, replies, likes, post_likes in grouped.itertuples(name=None):
+            stats = self.post_stats.get(post_url)
+            if stats is None:
+                stats = self.post_stats[post_url] = PostStats()
+            stats.comments += int(comments)
+            stats.replies += int(replies)
+            stats.likes += int(likes)
+            if post_likes == post_likes:
+                stats.post_likes = int(post_likes)
+
+    def remove(self, key):
+        """Removes an entry from the index.
+
+        Args:
+            key (string): Unique identifier of the entry.
+        """
+        values = self.rows.pop(str(key))
+        for column, keys_by_value in self.by_column.items():
+            value = values[self._position[column]]
+            keys = keys_by_value.get(value) if not _missing(value) else None
+            if keys is not None:
+                keys.pop(str(key), None)
+                if len(keys) == 0:
+                    del keys_by_value[value]
+        self._count(values, -1)
+
+    def _count(self, values, sign):
+        """Adds (sign 1) or removes (sign -1) an entry from the aggregates of its post.
+        """
+        post_url = self._value(values, "post_url")
+        stats = self.post_stats.get(post_url)
+        if stats is None:
+            stats = self.post_stats[post_url] = PostStats()
+        likes = parse_count(self._value(values, "likes"))
+        if _is_true(self._value(values, "is_post")):
+            stats.post_likes = likes if sign > 0 else None
+            return
+        if _missing(self._value(values, "replies_to")):
+            stats.comments += sign
+        else:
+            stats.replies += sign
+        stats.likes += sign * (likes or 0)
+
+    def keys(self, column, value):
+        """Returns the unique identifiers of the entries whose column holds value, in the order they were added.
+
+        Args:
+            column (string): One of INDEXED_COLUMNS.
+            value: Value to look up.
+
+        Returns:
+            list of strings: Unique identifiers.
+        """
+        return list(self.by_column[column].get(value, ()))
+
+    def thread(self, key):
+        """Returns the unique identifiers of an entry and of all replies below it, depth first: every reply follows the entry it
+        replies to, replies to the same entry are in the order they were added.
+
+        Args:
+            key (string): Unique identifier of the comment.
+
+        Returns:
+            list of strings: Unique identifiers, starting with key.
+        """
+        key = str(key)
+        if key not in self.rows:
+            raise KeyError(key)
+        replies = self.by_column["replies_to"]
+        thread = []
+        stack = [key]
+        while len(stack) > 0:
+            key = stack.pop()
+            thread.append(key)
+            stack.extend(reversed(list(replies.get(key, ()))))
+        return thread
+
+    def frame(self, keys):
+        """Returns the entries with the given unique identifiers as a DataFrame indexed by unique identifier.
+        """
+        return pd.DataFrame.from_records([self.rows[key] for key in keys], columns=self.columns, index=pd.Index(keys, dtype=object))
+
+    def stats_frame(self):
+        """Returns the PostStats of all posts as a DataFrame indexed by post_url.
+        """
+        frame = pd.DataFrame.from_records([stats.to_dict() for stats in self.post_stats.values()], columns=["comments", "replies", "likes", "post_likes"], index=list(self.post_stats))
+        frame["post_likes"] = frame["post_likes"].astype("Int64")
+        frame.index.name = "post_url"
+        return frame
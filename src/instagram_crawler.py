@@ -6,17 +6,24 @@ from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import NoSuchElementException
 
 import os
-import uuid
-import pandas as pd
-from time import sleep
-import time
+import re
+from sys import intern
+from urllib.parse import urlsplit
+from time import sleep, perf_counter
 from datetime import datetime
 import config
+from src.extraction import EXTRACTION_SELECTORS, EXTRACT_COMMENTS_SCRIPT, NEW_POST_URLS_SCRIPT
+from src.waits import WaitBudget, wait_for_growth
+from src.selector_registry import registry
+from src.records import Entry, entry_key, intern_name
+from src.profiling import CrawlProfiler
+from src.lookup import SelectorLookup
 from dotenv import load_dotenv
 load_dotenv("../")
 
 def get_selector(ENV_VAR_NAME, variables_to_inject = []):
-    """Returns a selenium.webdriver.common.by.By selector and a query string for that selector
+    """Returns a selenium.webdriver.common.by.By selector and a query string for that selector. The selectors of config.py are parsed and validated
+    once at import by the selector registry, see src/selector_registry.py.
 
     Args:
         ENV_VAR_NAME (string): name of the environment variable in format "selector,query"
@@ -25,28 +32,85 @@ def get_selector(ENV_VAR_NAME, variables_to_inject = []):
     Returns:
         tuple: returns a parsed selenium.webdriver.common.by.By selector and query string
     """
+    return registry.get(ENV_VAR_NAME, variables_to_inject)
 
-    selector, query = getattr(config, ENV_VAR_NAME).split(",", maxsplit = 1)
-    if len(variables_to_inject) > 0:
-        query = query.format(*variables_to_inject)
-    selector = getattr(By, selector)
-    return selector, query
+# path of a post, reel or video, optionally below the account name, e.g. /[account]/reel/[post id]/
+POST_PATH_REGEX = re.compile(r"/(?:p|reels?|tv)/([^/]+)")
+
+def canonical_post_url(url):
+    """Returns the post url without query string and fragment and with a trailing slash, e.g. 'https://www.instagram.com/p/[post id]/'.
+    Reels and videos are served under /p/ as well, so their urls are mapped to it and every post has a single canonical url.
+
+    Args:
+        url (string): Post url as found on the page.
+
+    Returns:
+        string: Canonical post url.
+    """
+    parts = urlsplit(url)
+    match = POST_PATH_REGEX.search(parts.path)
+    if match is not None:
+        path = f"/p/{match.group(1)}/"
+    else:
+        path = parts.path if parts.path.endswith("/") else parts.path + "/"
+    return f"{parts.scheme}://{parts.netloc}{path}"
+
+def scroll_height(driver):
+    """Returns the scroll height of the current page.
+    """
+    return driver.execute_script("return document.body.scrollHeight")
 
 class InstagramCrawler():
     """Class to crawl an account's posts and a post's comments.
     """
 
-    def __init__(self, driver, DB):
+    EXTRACTION_MODES = ["elements", "bulk", "snapshot", "windowed"]
+
+    def __init__(self, driver, DB, extraction = "elements", extraction_batch_size = None, session_store = None, incremental = False, profiler = None, snapshot_store = None, snapshot_parser = None, extraction_window = 200):
         """Instantiates a new instance of InstagramCrawler. Sets the driver and DB. InstagramCrawler has two additional
         attributes: A dictionary of posts that is filled during execution of the get_all_posts() method.
 
         Args:
             driver (selenium.webdriver): Selenium webdriver object used to interact with the instagram webpage.
             DB (database object): Database object used to store data.
+            extraction (str, optional): How comments are extracted from a loaded post. "elements" looks up every element with a
+                separate WebDriver command, "bulk" extracts everything with one execute_script call, "snapshot" only stores the
+                page source in snapshot_store and leaves the extraction to snapshot_parser. "windowed" alternates between loading
+                extraction_window comments with their replies, extracting them like "bulk", saving them and removing their nodes from
+                the page, so the memory of the browser tab doesn't grow with the number of comments. Defaults to "elements".
+            extraction_batch_size (int, optional): Maximum number of comments extracted per execute_script call in "bulk" mode. Defaults to None (all at once).
+            session_store (src.sessions.SessionStore, optional): If set, the logged in session is stored after login and restored by refresh_crawler(). Defaults to None.
+            incremental (bool, optional): If True, crawl_post() only adds entries that are not in the database yet and stops loading
+                more comments once a loaded page only holds known comments. Defaults to False.
+            profiler (src.profiling.CrawlProfiler, optional): Records the duration of every phase of the crawl. Defaults to None (a profiler without event file).
+            snapshot_store (src.snapshots.SnapshotStore, optional): Store of the page sources in "snapshot" mode. Defaults to None.
+            snapshot_parser (src.snapshots.SnapshotParser, optional): Parses the snapshots in "snapshot" mode and adds their entries
+                to DB. Defaults to None (the snapshots are only stored and can be parsed later).
+            extraction_window (int, optional): Number of newly loaded comments after which "windowed" mode extracts and removes them. Defaults to 200.
         """
+        if extraction not in self.EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode '{extraction}'. Choose one of {self.EXTRACTION_MODES}.")
+        if extraction == "snapshot" and snapshot_store is None:
+            raise ValueError("Extraction mode 'snapshot' needs a snapshot store.")
         self.driver = driver
         self.posts = {}
         self.DB = DB
+        self.extraction = extraction
+        self.extraction_batch_size = extraction_batch_size
+        self.session_store = session_store
+        self.snapshot_store = snapshot_store
+        self.snapshot_parser = snapshot_parser
+        self.extraction_window = extraction_window
+        self.incremental = incremental
+        # stable keys of the entries of the post that is being crawled, see src.database.entry_key()
+        self.known_keys = set()
+        self.current_post_url = None
+        self.new_entries = 0
+        # crawl time of the entries of the current extraction batch, see batch_time()
+        self.crawl_time = None
+        self.profiler = profiler if profiler is not None else CrawlProfiler()
+        self.lookup = SelectorLookup(self.profiler)
+        self.wait_budgets = {name: WaitBudget.from_config(name) for name in ["load_more_comments", "load_more_replies", "scroll_posts"]}
 
     def go_to_link(self, url): 
         """Sets the webdriver to the specified URL.
@@ -54,7 +118,8 @@ class InstagramCrawler():
         Args:
             url (string): Url to go to.
         """
-        self.driver.get(url)
+        with self.profiler.phase("navigation"):
+            self.driver.get(url)
 
     def go_to_base_url(self): 
         """Sets the webdriver url to the base url specified in the config file.
@@ -62,11 +127,19 @@ class InstagramCrawler():
         self.driver.get(config.BASE_URL)
 
     def refresh_crawler(self, logged_in = False):
-        """Sets the crawler to the base url, logs in if needed, bypasses notifitcation popup
+        """Sets the crawler to the base url, logs in if needed, bypasses notifitcation popup. If the crawler has a session store, a stored
+        session is restored first and the login form is only used if that session expired.
 
         Args:
             logged_in (bool, optional): If True, ignores potential login form if driver has already logged in. Defaults to False.
         """
+        with self.profiler.phase("login"):
+            self._refresh_crawler(logged_in)
+
+    def _refresh_crawler(self, logged_in):
+        if not logged_in and self.restore_session():
+            return
+
         self.go_to_base_url()
         if not logged_in:
             self.bypass_cookie_popup()
@@ -75,6 +148,8 @@ class InstagramCrawler():
         #check if logged in successfully
         try: 
             WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((get_selector("PROFILE_SELECTOR"))))
+            if not logged_in and self.session_store is not None:
+                self.session_store.save(self.driver)
         except TimeoutException as e:
             print("Error while trying to login: ", e)
 
@@ -83,6 +158,40 @@ class InstagramCrawler():
             WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable((get_selector("NOTIFICATION_POPUP")))).click()
         except: pass
 
+    def restore_session(self, seconds = 5):
+        """Restores the stored session of the session store into the driver and checks if it is still logged in.
+        An expired session is deleted from the store.
+
+        Args:
+            seconds (int, optional): Seconds to wait for the profile link that shows the driver is logged in. Defaults to 5.
+
+        Returns:
+            bool: True if the driver is logged in with the restored session.
+        """
+        if self.session_store is None:
+            return False
+        try:
+            if not self.session_store.restore(self.driver, config.BASE_URL):
+                return False
+            WebDriverWait(self.driver, seconds).until(EC.presence_of_element_located(get_selector("PROFILE_SELECTOR")))
+        except TimeoutException:
+            print("Stored session expired, logging in again.")
+            self.session_store.clear()
+            return False
+        except Exception as e:
+            print("Exception while restoring the stored session: ", e)
+            return False
+
+        # the notification popup can show up after a restored session as well, but don't wait for it
+        self.driver.implicitly_wait(0)
+        for popup in self.driver.find_elements(*get_selector("NOTIFICATION_POPUP")):
+            try:
+                popup.click()
+            except Exception:
+                pass
+        self.driver.implicitly_wait(3)
+        return True
+
     def bypass_cookie_popup(self):
         """Waits for a potential cookie popup to appear and tries to bypass it using the selector specified in the COOKIE_POPUP variable in config.py.
         """
@@ -132,63 +241,172 @@ class InstagramCrawler():
         except Exception as e:
             print("Exception while searching for an account through the search bar: ", e)
 
-    def get_all_posts(self, account_name): 
+    def get_all_posts(self, account_name, post_urls_path = None, known_post_urls = None, stop_after_known = 6): 
         """SCrolls through account page given by the account_name parameter and returns all post urls of that account as soon as the end of the page is reached.
+        After every scroll, a single script call returns only the post links that weren't seen before. Posts are deduplicated by their canonical url.
 
         Args:
             account_name (string): The account to be crawled through.
+            post_urls_path (string, optional): If set, every newly found post url is written to this file right away, one url per line,
+                so a crash during scrolling doesn't lose the urls found so far. The file is overwritten. Defaults to None.
+            known_post_urls (set of strings, optional): Canonical urls of posts that were found before. If set, scrolling stops as soon as
+                stop_after_known known posts in a row are found instead of at the end of the page. Defaults to None.
+            stop_after_known (int, optional): Number of known posts in a row that ends scrolling. A few are needed because pinned posts
+                are shown before newer ones. Defaults to 6.
 
         Returns:
-            dict: Returns a dictionary with key;value pairs of the selenium object ids of the post links and the corresponding post url.
+            dict: Returns a dictionary with key;value pairs of the canonical post urls and the corresponding post url.
         """
 
         self.refresh_crawler()
         self.go_to_link(config.BASE_URL + account_name)
         # wait till account page is loaded
         self.wait_for_page_to_load(*get_selector("WAIT_FOR_ACCOUNT_TO_LOAD", [account_name]))
-        sleep(1)
+        budget = self.wait_budgets["scroll_posts"]
+        try:
+            WebDriverWait(self.driver, budget.appear, poll_frequency=budget.poll_frequency).until(EC.presence_of_element_located(get_selector("CURRENTLY_VISIBLE_POSTS")))
+        except TimeoutException:
+            print(f"No posts visible on account page of {account_name}")
 
-        # https://stackoverflow.com/questions/44721009/how-to-check-if-further-scroll-down-is-not-possible-using-selenium
-        reached_page_end = False
+        post_urls_file = open(post_urls_path, "w") if post_urls_path is not None else None
+        try:
+            # https://stackoverflow.com/questions/44721009/how-to-check-if-further-scroll-down-is-not-possible-using-selenium
+            reached_page_end = False
+
+            last_height = scroll_height(self.driver)
+            known_in_a_row = 0
+            new_posts = self.add_new_posts(post_urls_file)
+
+            while not reached_page_end:
+                if known_post_urls is not None:
+                    for post_url in new_posts:
+                        known_in_a_row = known_in_a_row + 1 if post_url in known_post_urls else 0
+                    if known_in_a_row >= stop_after_known:
+                        print(f"Found {known_in_a_row} known posts in a row on account page of {account_name}, stopped scrolling.")
+                        break
+                budget.politeness_delay()
+                self.driver.find_element(By.XPATH, '//body').send_keys(Keys.END)
+                # returns as soon as the page grew instead of sleeping
+                if wait_for_growth(self.driver, budget, scroll_height, last_height) != "grown":
+                    reached_page_end = True
+                else:
+                    last_height = scroll_height(self.driver)
+
+                new_posts = self.add_new_posts(post_urls_file)
+        finally:
+            if post_urls_file is not None:
+                post_urls_file.close()
 
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        
-        while not reached_page_end:
-            self.driver.find_element(By.XPATH, '//body').send_keys(Keys.END)   
-            time.sleep(3)
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if last_height == new_height:
-                reached_page_end = True
-            else:
-                last_height = new_height
-            
-            #get currently visible posts
-            for post in self.driver.find_elements(*get_selector("CURRENTLY_VISIBLE_POSTS")):
-                self.posts[post.__dict__["_id"]] = post.get_attribute("href")
-        
         return self.posts
 
+    def add_new_posts(self, post_urls_file = None):
+        """Adds the post links rendered since the last call to self.posts and writes them to post_urls_file.
+
+        Args:
+            post_urls_file (file object, optional): Open file to append the new post urls to. Defaults to None.
+
+        Returns:
+            list of strings: The new canonical post urls.
+        """
+        new_posts = []
+        for post_url in self.driver.execute_script(NEW_POST_URLS_SCRIPT, list(get_selector("CURRENTLY_VISIBLE_POSTS"))):
+            post_url = canonical_post_url(post_url)
+            if post_url not in self.posts:
+                self.posts[post_url] = post_url
+                new_posts.append(post_url)
+
+        if post_urls_file is not None and len(new_posts) > 0:
+            post_urls_file.write("".join(post_url + "\n" for post_url in new_posts))
+            post_urls_file.flush()
+        return new_posts
+
+    def click_until_loaded(self, budget, selector, query, count_selector, stop = None):
+        """Clicks the button given by selector and query until it isn't rendered anymore. After every click, waits until new elements
+        matching count_selector appear, the clicked button is gone or the page goes idle, instead of sleeping a fixed time.
+
+        Args:
+            budget (WaitBudget): Wait budget of the operation.
+            selector (selenium.webdriver.common.by.By object): Selector to find the button.
+            query (string): Query for the selector.
+            count_selector (tuple): Selector and query of the elements that are loaded by clicking the button.
+            stop (function, optional): Called with the positions (start, end) of the elements loaded since the last call, before every click.
+                Returns True to stop clicking. Defaults to None.
+
+        Returns:
+            int: Number of clicks.
+        """
+        clicks = 0
+        stalls = 0
+        checked = 0
+        self.driver.implicitly_wait(0)
+        try:
+            while stalls < budget.max_stalls:
+                if stop is not None:
+                    loaded = len(self.driver.find_elements(*count_selector))
+                    if loaded > checked:
+                        if stop(checked, loaded):
+                            break
+                        checked = loaded
+                try:
+                    button = WebDriverWait(self.driver, budget.appear, poll_frequency=budget.poll_frequency).until(EC.element_to_be_clickable((selector, query)))
+                except TimeoutException:
+                    break
+                budget.politeness_delay()
+                count_elements = lambda driver: len(driver.find_elements(*count_selector))
+                count = count_elements(self.driver)
+                try:
+                    button.click()
+                except Exception as e:
+                    # e.g. the button was re-rendered or covered by another element, try again
+                    print("Exception thrown while clicking: ", e)
+                    stalls += 1
+                    continue
+                clicks += 1
+                result = wait_for_growth(self.driver, budget, count_elements, count, finished=lambda driver: button not in driver.find_elements(selector, query))
+                if result == "finished":
+                    # buttons also disappear while the new content is loading, wait for it unless the page stays idle
+                    result = wait_for_growth(self.driver, budget, count_elements, count)
+                    if result == "idle":
+                        result = "finished"
+                # clicks without any effect, e.g. when Instagram stops sending new data
+                stalls = stalls + 1 if result in ["idle", "timeout"] else 0
+            if stalls >= budget.max_stalls:
+                print(f"Gave up after {stalls} click(s) in a row without new content.")
+        finally:
+            self.driver.implicitly_wait(3)
+        return clicks
+
     def load_all_comments(self, selector:object, query:str):
-        """Loads all the comments of a post until no "View more comments" button is clickable.
+        """Loads all the comments of a post until no "View more comments" button is clickable. In incremental mode, also stops
+        as soon as a loaded page only holds comments that are already in the database.
 
         Args:
             selector (selenium.webdriver.common.by.By object): Selector to find the "View more comments" button.
             query (string): Query for the selector.
         """
-        i = 0
-        while True:
-            try:
-                sleep(1)
-                self.driver.implicitly_wait(0)
-                WebDriverWait(self.driver, 2).until(EC.element_to_be_clickable((selector, query))).click()
-                self.driver.implicitly_wait(3)
-                i += 1
-                sleep(3)
-            except TimeoutException as e: 
-                print(f"Done Loading Comments {i} times")
-                return
-            except Exception as e:
-                print("Exception thrown whie loading more comments: ", e)
+        stop = self.comments_are_known if self.incremental and len(self.known_keys) > 0 else None
+        try:
+            with self.profiler.phase("load_comments"):
+                i = self.click_until_loaded(self.wait_budgets["load_more_comments"], selector, query, get_selector("ALL_COMMENTS_CONTAINER"), stop)
+            self.profiler.count("comment_clicks", i)
+            print(f"Done Loading Comments {i} times")
+        except Exception as e:
+            print("Exception thrown whie loading more comments: ", e)
+
+    def comments_are_known(self, start, end):
+        """Checks if the comment containers at the positions start to end of the loaded post are all in the database already.
+
+        Args:
+            start (int): Position of the first comment container to check.
+            end (int): Position after the last comment container to check.
+
+        Returns:
+            bool: True if every comment in the range has a known key.
+        """
+        selectors = {name: list(get_selector(name)) for name in EXTRACTION_SELECTORS}
+        comments = self.driver.execute_script(EXTRACT_COMMENTS_SCRIPT, selectors, start, end - start)["comments"]
+        comments = [comment for comment in comments if comment is not None]
+        return len(comments) > 0 and all(entry_key(self.current_post_url, comment["owner"], comment["date"], comment["text"]) in self.known_keys for comment in comments)
 
     def load_all_comment_replies(self, selector:object, query:str):
         """Iteratively loads all replies in a set of comments. A post can have multiple "View more replies" buttons. This function clicks on all of them in a loop until no more "View more replies" buttons are clickable.
@@ -197,23 +415,13 @@ class InstagramCrawler():
             selector (selenium.webdriver.common.by.By object): Selector to find the "View more replies" buttons.
             query (string): Query for the selector.
         """
-        i = 0
-        while True:
-            try: 
-                self.driver.implicitly_wait(0)
-                WebDriverWait(self.driver, 2).until(EC.element_to_be_clickable((selector, query))).click()
-                self.driver.implicitly_wait(3)
-                sleep(1)
-                i+=1
-            except TimeoutException as e: 
-                print(f"Done Loading Replies {i} times")
-                return
-            except NoSuchElementException as e:
-                print(f"Done Loading Replies {i} times")
-                return
-            except Exception as e:
-                print("Exception thrown whie loading more replies: ", e)
-                return
+        try:
+            with self.profiler.phase("load_replies"):
+                i = self.click_until_loaded(self.wait_budgets["load_more_replies"], selector, query, get_selector("REPLIES_TO_COMMENT_CONTAINER"))
+            self.profiler.count("reply_clicks", i)
+            print(f"Done Loading Replies {i} times")
+        except Exception as e:
+            print("Exception thrown whie loading more replies: ", e)
         
     def wait_for_page_to_load(self, selector:object, query:str, seconds = 10):
         """Waits for page to load given the selector and query string. Default is a wait time of 10 seconds.
@@ -259,40 +467,59 @@ class InstagramCrawler():
             print(e)
             return None
 
-    def add_post_comment_to_DB(self, post_url, replies_count, account_name):
+    def batch_time(self):
+        """Returns the crawl time of the entries of the current extraction batch, or the current time outside of a batch.
+        """
+        return self.crawl_time if self.crawl_time is not None else datetime.now()
+
+    def add_new_entry(self, key, entry):
+        """Adds an entry to the database unless an entry with the same stable key was already added or crawled before.
+
+        Args:
+            key (string): Stable unique identifier of the entry, see src.database.entry_key().
+            entry (src.records.Entry): Entry to add.
+
+        Returns:
+            bool: True if the entry was added.
+        """
+        if key in self.known_keys:
+            return False
+        self.known_keys.add(key)
+        start = perf_counter()
+        self.DB.add_entry(key, entry)
+        self.profiler.add("add_entry", perf_counter() - start)
+        self.new_entries += 1
+        return True
+
+    def add_post_comment_to_DB(self, post_url, replies_count, account_name, post_info = None):
         #TODO: put into 2 functions: get_post_info and add_new_entry_to_DB, maybe put all of this into "DB.add_entry"
-        """Crawls post information then builds a post entry for the database. Add it to the database using a generated unique identifier.
+        """Crawls post information then builds a post entry for the database. Add it to the database with a stable unique identifier, unless it is already known.
 
         Args:
             post_url (string): The post url to be added to the database.
             replies_count (int): The number of replies to the post.
             account_name (string): The account name for the post entry.
+            post_info (tuple, optional): Already extracted (post comment, post likes, post date). If None, the information is crawled from the page. Defaults to None.
 
         Returns:
-            string: Returns the unique identifier used to add the post to the database.
+            string: Returns the stable unique identifier of the post entry.
         """
 
-        post_comment = self.find_element_with_possible_exception(self.driver, *get_selector("POST_COMMENT"))
-        post_likes = self.find_element_with_possible_exception(self.driver, *get_selector("POST_LIKES"))
-        post_date = self.find_element_with_possible_exception(self.driver, *get_selector("POST_DATE"))
-
-        if post_comment != None: post_comment = post_comment.text
-        if post_likes != None: post_likes = post_likes.text
-        if post_date != None: post_date = post_date.get_attribute("datetime")
-
-        post_entry = pd.Series({
-            "post_url": post_url,
-            "is_post": True,
-            "commenter": account_name,
-            "text": post_comment,
-            "replies_to": None,
-            "replies_count": replies_count,
-            "likes": post_likes,
-            "date": post_date,
-            "crawl_time": datetime.now()
-        })
-        post_uuid = uuid.uuid4()
-        self.DB.add_entry(post_uuid, post_entry)
+        if post_info is None:
+            post_comment = self.lookup.find(self.driver, "POST_COMMENT")
+            post_likes = self.lookup.find(self.driver, "POST_LIKES")
+            post_date = self.lookup.find(self.driver, "POST_DATE")
+
+            if post_comment != None: post_comment = post_comment.text
+            if post_likes != None: post_likes = post_likes.text
+            if post_date != None: post_date = post_date.get_attribute("datetime")
+        else:
+            post_comment, post_likes, post_date = post_info
+
+        post_entry = Entry(post_url, True, account_name, post_comment, None, replies_count, post_likes, post_date, self.batch_time())
+        # a post is identified by its url, its caption can be edited
+        post_uuid = entry_key(post_url, account_name)
+        self.add_new_entry(post_uuid, post_entry)
 
         #Notify user if any of the post info is missing
         if any([post_comment == None, post_likes == None, post_date == None]):
@@ -300,14 +527,48 @@ class InstagramCrawler():
 
         return post_uuid
 
-    def add_normal_comment_to_DB(self):
-        pass
+    def add_normal_comment_to_DB(self, post_url, comment_owner, comment_text, replies_count, comment_likes, comment_date):
+        """Builds a comment entry for the database and adds it with a stable unique identifier, unless it is already known.
 
-    def add_reply_to_comment_to_DB(self):
-        pass
+        Args:
+            post_url (string): Url of the post the comment belongs to.
+            comment_owner (string): Account name of the commenter.
+            comment_text (string): Text of the comment.
+            replies_count (int): Number of replies to the comment.
+            comment_likes (string): Likes of the comment as shown on the page, can be None.
+            comment_date (string): Datetime attribute of the comment.
+
+        Returns:
+            string: Returns the stable unique identifier of the comment entry.
+        """
+        comment_entry = Entry(post_url, False, intern_name(comment_owner), comment_text, None, replies_count, comment_likes, comment_date, self.batch_time())
+        comment_uuid = entry_key(post_url, comment_owner, comment_date, comment_text)
+        self.add_new_entry(comment_uuid, comment_entry)
+        return comment_uuid
+
+    def add_reply_to_comment_to_DB(self, post_url, comment_uuid, reply_owner, reply_text, reply_likes, reply_date):
+        """Builds a reply entry for the database and adds it with a stable unique identifier, unless it is already known.
+
+        Args:
+            post_url (string): Url of the post the reply belongs to.
+            comment_uuid (string): Unique identifier of the comment that is replied to.
+            reply_owner (string): Account name of the replier.
+            reply_text (string): Text of the reply.
+            reply_likes (string): Likes of the reply as shown on the page, can be None.
+            reply_date (string): Datetime attribute of the reply.
+
+        Returns:
+            string: Returns the stable unique identifier of the reply entry.
+        """
+        #TODO: we dont know how many replies a single reply got
+        reply_entry = Entry(post_url, False, intern_name(reply_owner), reply_text, comment_uuid, None, reply_likes, reply_date, self.batch_time())
+        reply_uuid = entry_key(post_url, reply_owner, reply_date, reply_text)
+        self.add_new_entry(reply_uuid, reply_entry)
+        return reply_uuid
 
     def crawl_post(self, post_url, account_name):
         """Crawls the post specified by the post_url parameter. Crawls through post specific data, all the comments and all their potential replies. Saves all the data in the database attribute of the InstagramCrawler class.
+        The durations of the phases of the post are recorded in self.profiler.
 
         Args:
             post_url (string): Url of the post to be crawled.
@@ -316,95 +577,284 @@ class InstagramCrawler():
         Returns:
             string: Returns the post url used.
         """
+        for step in self.crawl_post_steps(post_url, account_name):
+            pass
+        return post_url
+
+    def crawl_post_steps(self, post_url, account_name):
+        """Crawls the post like crawl_post(), one step at a time. Yields the name of every finished step: "navigation", "comments",
+        "hidden_comments", "replies", "extraction" and "save_db_state". Extraction starts with the step after "replies".
+        In "windowed" mode, "comments", "replies", "extraction" and "save_db_state" repeat for every window of comments.
+        Used by src.tabs.TabPool to switch to another tab between the steps. Every step has to run in the same thread.
+
+        Args:
+            post_url (string): Url of the post to be crawled.
+            account_name (string): Account name of the post to be crawled.
+
+        Yields:
+            string: Name of the finished step.
+        """
+        self.profiler.start_post(post_url)
+        try:
+            yield from self._crawl_post(post_url, account_name)
+        except BaseException:
+            self.profiler.end_post("failed")
+            raise
+        self.profiler.end_post("done")
+        print("Done crawling post: ", post_url)
+
+    def _crawl_post(self, post_url, account_name):
+        # every entry of the post refers to the same string
+        post_url = intern(post_url)
+        self.current_post_url = post_url
+        self.known_keys = self.DB.known_keys(post_url) if self.incremental else set()
+        self.new_entries = 0
 
         self.go_to_link(post_url)
         self.wait_for_page_to_load(*get_selector("WAIT_FOR_POST_TO_LOAD"))
+        yield "navigation"
+        if self.extraction == "windowed":
+            yield from self._crawl_windows(post_url, account_name)
+            return
         self.load_all_comments(*get_selector("LOAD_MORE_COMMENTS_BUTTON"))
+        yield "comments"
 
         # some comments can be hidden when all comments are loaded
         self.view_hidden_comments()
+        yield "hidden_comments"
         self.load_all_comment_replies(*get_selector("VIEW_MORE_REPLIES_BUTTON"))
-        
+        yield "replies"
+
+        if self.extraction == "snapshot":
+            # the entries are added and saved by the snapshot parser
+            with self.profiler.phase("snapshot"):
+                self.save_snapshot(post_url, account_name)
+            yield "extraction"
+            yield "save_db_state"
+            return
+
+        # includes the add_entry phases of the extracted entries
+        with self.profiler.phase("extraction"):
+            try:
+                if self.extraction == "bulk":
+                    self.extract_comments_with_script(post_url, account_name)
+                else:
+                    self.extract_comments_with_elements(post_url, account_name)
+            finally:
+                self.crawl_time = None
+        self.profiler.count("entries", self.new_entries)
+        yield "extraction"
+
+        with self.profiler.phase("save_db_state"):
+            self.DB.save_db_state()
+        if self.incremental:
+            print(f"Added {self.new_entries} new entries to post: ", post_url)
+        yield "save_db_state"
+
+    def _crawl_windows(self, post_url, account_name):
+        """Steps of a post in "windowed" mode. Every window clicks "Load more comments" until extraction_window new comments
+        are rendered, loads their replies, extracts them with EXTRACT_COMMENTS_SCRIPT, empties their containers in the page
+        and saves them. The post entry is added with the last window, once the number of comments is known.
+        """
+        selectors = {name: list(get_selector(name)) for name in EXTRACTION_SELECTORS}
+        count_selector = get_selector("ALL_COMMENTS_CONTAINER")
+        known_page = self.comments_are_known if self.incremental and len(self.known_keys) > 0 else None
+        # comment containers that are extracted and emptied
+        extracted = 0
+        post = None
+        skipped = 0
+        windows = 0
+        last_window = False
+        while not last_window:
+            window = {"full": False, "known": False}
+
+            def window_full(start, end):
+                start = max(start, extracted)
+                if start >= end:
+                    return False
+                if known_page is not None and known_page(start, end):
+                    window["known"] = True
+                    return True
+                window["full"] = end - extracted >= self.extraction_window
+                return window["full"]
+
+            try:
+                with self.profiler.phase("load_comments"):
+                    clicks = self.click_until_loaded(self.wait_budgets["load_more_comments"], *get_selector("LOAD_MORE_COMMENTS_BUTTON"), count_selector, window_full)
+                self.profiler.count("comment_clicks", clicks)
+            except Exception as e:
+                print("Exception thrown whie loading more comments: ", e)
+            yield "comments"
+
+            last_window = not window["full"]
+            if last_window and not window["known"]:
+                # some comments can be hidden when all comments are loaded
+                self.view_hidden_comments()
+                yield "hidden_comments"
+            self.load_all_comment_replies(*get_selector("VIEW_MORE_REPLIES_BUTTON"))
+            yield "replies"
+
+            with self.profiler.phase("extraction"):
+                try:
+                    result = self.driver.execute_script(EXTRACT_COMMENTS_SCRIPT, selectors, extracted, None, True)
+                    # the entries of one window are one batch
+                    self.crawl_time = datetime.now()
+                    if extracted == 0:
+                        post = result["post"]
+                    skipped += self.add_extracted_comments(post_url, result["comments"])
+                    extracted += len(result["comments"])
+                    if last_window:
+                        self.add_post_comment_to_DB(post_url, result["total"], account_name, (post["comment"], post["likes"], post["date"]))
+                finally:
+                    self.crawl_time = None
+            windows += 1
+            yield "extraction"
+
+            # the entries of the window are saved before the next one is loaded
+            with self.profiler.phase("save_db_state"):
+                self.DB.save_db_state()
+            yield "save_db_state"
+
+        self.profiler.count("entries", self.new_entries)
+        self.profiler.count("windows", windows)
+        print(f"Extracted {extracted} comments in {windows} window(s)")
+        if skipped > 0:
+            print(f"Skipped {skipped} comment(s) without a comment container in post {post_url}")
+        if self.incremental:
+            print(f"Added {self.new_entries} new entries to post: ", post_url)
+
+    @property
+    def marks_posts_done(self):
+        """True if the snapshot parser marks the crawled posts done in its journal once their entries are saved. Callers that
+        keep a journal must not mark them done when crawl_post() returns.
+        """
+        return self.extraction == "snapshot" and self.snapshot_parser is not None and self.snapshot_parser.journal is not None
+
+    def save_snapshot(self, post_url, account_name):
+        """Stores the page source of the loaded post in the snapshot store and hands it to the snapshot parser, which extracts
+        the entries in another process while the crawler goes on with the next post.
+
+        Args:
+            post_url (string): Url of the loaded post.
+            account_name (string): Account name of the post.
+
+        Returns:
+            string: Path of the snapshot file.
+        """
+        html = self.driver.page_source
+        path = self.snapshot_store.save(post_url, account_name, html)
+        self.profiler.count("snapshot_chars", len(html))
+        if self.snapshot_parser is not None:
+            # the entries of earlier snapshots are added here, in the crawler's thread
+            self.snapshot_parser.add_finished()
+            self.snapshot_parser.submit(path, self.DB, post_url)
+        return path
+
+    def extract_comments_with_elements(self, post_url, account_name):
+        """Extracts the post information, all comments and all replies of the loaded post page element by element and adds them to the database.
+        Every lookup is a separate WebDriver command. The implicit wait is turned off, every selector is looked up with its own
+        budget from SELECTOR_BUDGETS in config.py, so missing optional elements like likes don't cost any waiting.
+
+        Args:
+            post_url (string): Url of the loaded post.
+            account_name (string): Account name of the post.
+        """
+        self.driver.implicitly_wait(0)
+        # all entries of the post are one batch
+        self.crawl_time = datetime.now()
+        try:
+            self._extract_comments_with_elements(post_url, account_name)
+        finally:
+            self.driver.implicitly_wait(3)
+
+    def _extract_comments_with_elements(self, post_url, account_name):
         # get all comments through a container
-        all_comments_container = self.driver.find_elements(*get_selector("ALL_COMMENTS_CONTAINER"))
+        all_comments_container = self.lookup.find_all(self.driver, "ALL_COMMENTS_CONTAINER")
 
         post_uuid = self.add_post_comment_to_DB(post_url, len(all_comments_container), account_name)
 
         # get comment detail per comment
         for r in all_comments_container:
 
-            comment_container = r.find_element(*get_selector("COMMENT_CONTAINER"))
-            comment_text = comment_container.find_element(*get_selector("COMMENT_TEXT")).text
-            comment_owner = comment_container.find_element(*get_selector("COMMENT_OWNER")).text
-            comment_likes = 0
-            
+            comment_container = self.lookup.find(r, "COMMENT_CONTAINER")
+            comment_text = self.lookup.find(comment_container, "COMMENT_TEXT").text
+            comment_owner = self.lookup.find(comment_container, "COMMENT_OWNER").text
+
             #comment likes can be None
-            self.driver.implicitly_wait(0)
-            comment_likes = self.find_element_with_possible_exception(comment_container, *get_selector("COMMENT_LIKES"))
+            comment_likes = self.lookup.find(comment_container, "COMMENT_LIKES")
             if comment_likes is not None:
                 comment_likes = comment_likes.text
-            self.driver.implicitly_wait(3)
-            
-            comment_date = comment_container.find_element(*get_selector("COMMENT_DATE")).get_attribute("datetime")
+
+            comment_date = self.lookup.find(comment_container, "COMMENT_DATE").get_attribute("datetime")
 
             # get replies to comment (can be None)
-            replies_to_comment_container = []
-            try:
-                self.driver.implicitly_wait(0)
-                replies_to_comment_container = r.find_elements(*get_selector("REPLIES_TO_COMMENT_CONTAINER"))
-                self.driver.implicitly_wait(3)
-            except TimeoutException: return
-            except Exception as e: 
-                print(e)
+            replies_to_comment_container = self.lookup.find_all(r, "REPLIES_TO_COMMENT_CONTAINER")
 
             # add comment to DB
-            comment_entry = pd.Series({
-                "post_url": post_url,
-                "is_post": False,
-                "commenter": comment_owner,
-                "text": comment_text,
-                "replies_to": None,
-                "replies_count": len(replies_to_comment_container),
-                "likes": comment_likes,
-                "date": comment_date,
-                "crawl_time": datetime.now()
-            })
-            comment_uuid = uuid.uuid4()
-            self.DB.add_entry(comment_uuid, comment_entry)
+            comment_uuid = self.add_normal_comment_to_DB(post_url, comment_owner, comment_text, len(replies_to_comment_container), comment_likes, comment_date)
 
             #add replies to comment to DB
             for reply in replies_to_comment_container:
-                reply_text = reply.find_element(*get_selector("REPLY_TEXT")).text
-                reply_owner = reply.find_element(*get_selector("REPLY_OWNER")).text
-                reply_date = reply.find_element(*get_selector("REPLY_DATE")).get_attribute("datetime")
-                reply_likes = 0
-                self.driver.implicitly_wait(0)
-                reply_likes = self.find_element_with_possible_exception(reply, *get_selector("REPLY_LIKES"))
+                reply_text = self.lookup.find(reply, "REPLY_TEXT").text
+                reply_owner = self.lookup.find(reply, "REPLY_OWNER").text
+                reply_date = self.lookup.find(reply, "REPLY_DATE").get_attribute("datetime")
+                reply_likes = self.lookup.find(reply, "REPLY_LIKES")
                 if reply_likes is not None:
                     reply_likes = reply_likes.text
-                self.driver.implicitly_wait(3)
-
-                #TODO: we dont know how many replies a single reply got
-                #print("reply: ", reply_text, reply_owner, reply_likes)
-                reply_entry = pd.Series({
-                    "post_url": post_url,
-                    "is_post": False,
-                    "commenter": reply_owner,
-                    "text": reply_text,
-                    "replies_to": comment_uuid,
-                    "replies_count": None,
-                    "likes": reply_likes,
-                    "date": reply_date,
-                    "crawl_time": datetime.now()
-                })
-                self.DB.add_entry(uuid.uuid4(), reply_entry)
-
-        self.DB.save_db_state()
-        print("Done crawling post: ", post_url)
-        return post_url
+
+                self.add_reply_to_comment_to_DB(post_url, comment_uuid, reply_owner, reply_text, reply_likes, reply_date)
+
+    def extract_comments_with_script(self, post_url, account_name):
+        """Extracts the post information, all comments and all replies of the loaded post page with the EXTRACT_COMMENTS_SCRIPT
+        and adds them to the database. Needs one execute_script call per extraction_batch_size comments (a single call if it is None)
+        instead of several WebDriver commands per comment and reply.
+
+        Args:
+            post_url (string): Url of the loaded post.
+            account_name (string): Account name of the post.
+        """
+        selectors = {name: list(get_selector(name)) for name in EXTRACTION_SELECTORS}
+        start = 0
+        skipped = 0
+        while True:
+            result = self.driver.execute_script(EXTRACT_COMMENTS_SCRIPT, selectors, start, self.extraction_batch_size)
+            # the entries of one script call are one batch
+            self.crawl_time = datetime.now()
+            if start == 0:
+                post = result["post"]
+                self.add_post_comment_to_DB(post_url, result["total"], account_name, (post["comment"], post["likes"], post["date"]))
+
+            skipped += self.add_extracted_comments(post_url, result["comments"])
+            start += len(result["comments"])
+            if len(result["comments"]) == 0 or start >= result["total"]:
+                break
+
+        if skipped > 0:
+            print(f"Skipped {skipped} comment(s) without a comment container in post {post_url}")
+
+    def add_extracted_comments(self, post_url, comments):
+        """Adds the comments and replies returned by EXTRACT_COMMENTS_SCRIPT to the database.
+
+        Args:
+            post_url (string): Url of the loaded post.
+            comments (list): The "comments" of the script result.
+
+        Returns:
+            int: Number of comments that were skipped because their comment container selector didn't match.
+        """
+        skipped = 0
+        for comment in comments:
+            # comment container selector didn't match
+            if comment is None:
+                skipped += 1
+                continue
+            comment_uuid = self.add_normal_comment_to_DB(post_url, comment["owner"], comment["text"], len(comment["replies"]), comment["likes"], comment["date"])
+            for reply in comment["replies"]:
+                self.add_reply_to_comment_to_DB(post_url, comment_uuid, reply["owner"], reply["text"], reply["likes"], reply["date"])
+        return skipped
 
     def close_driver(self):
         """Closes driver.
         """
         self.driver.quit()
-        self.driver.close()
\ No newline at end of file
+        self.driver.close()
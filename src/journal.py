@@ -0,0 +1,227 @@
+import heapq
+import json
+import os
+import threading
+import time
+
+class CrawlJournal():
+    """Durable per-account record of the crawl state of every post url: pending, in progress, done or failed with the last error
+    and the number of attempts. Every state change is appended as one json line and flushed to disk before the call returns,
+    so the journal survives crashes. A line that was cut off by a crash is ignored when the journal is loaded again.
+    """
+
+    PENDING = "pending"
+    IN_PROGRESS = "in progress"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path):
+        """Loads the journal at path or creates it.
+
+        Args:
+            path (string): Path to the journal file, e.g. ./data/[account name]-journal.jsonl
+        """
+        if (path == None) or (path == ""):
+            raise ValueError("Path to crawl journal is not defined.")
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        lines = 0
+        if os.path.exists(path):
+            with open(path, "r") as fp:
+                for line in fp:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry.pop("post_url")] = entry
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # rewrite the log with one line per post if it mostly holds outdated states
+        if lines > 2 * len(self.entries) + 100:
+            self.compact()
+        self.fp = open(path, "a")
+
+    def _write(self, post_urls):
+        """Appends the current entries of the given post urls to the journal file. Call with self.lock held.
+        """
+        self.fp.write("".join(json.dumps(dict(post_url=post_url, **self.entries[post_url])) + "\n" for post_url in post_urls))
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+
+    def _update(self, post_url, **changes):
+        with self.lock:
+            entry = self.entries.setdefault(post_url, {"state": self.PENDING, "attempts": 0, "error": None})
+            entry.update(changes, updated=time.time())
+            self._write([post_url])
+            return dict(entry)
+
+    def compact(self):
+        """Atomically replaces the journal file with one line per post url.
+        """
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as fp:
+            fp.write("".join(json.dumps(dict(post_url=post_url, **entry)) + "\n" for post_url, entry in self.entries.items()))
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temporary_path, self.path)
+
+    def add(self, post_urls):
+        """Adds post urls that are not in the journal yet as pending.
+        """
+        with self.lock:
+            new_post_urls = [post_url for post_url in dict.fromkeys(post_urls) if post_url not in self.entries]
+            for post_url in new_post_urls:
+                self.entries[post_url] = {"state": self.PENDING, "attempts": 0, "error": None, "updated": time.time()}
+            if len(new_post_urls) > 0:
+                self._write(new_post_urls)
+
+    def post_urls(self):
+        """Returns all post urls in the journal in the order they were added.
+        """
+        with self.lock:
+            return list(self.entries)
+
+    def get(self, post_url):
+        """Returns a copy of the entry of a post url or None.
+        """
+        with self.lock:
+            entry = self.entries.get(post_url)
+            return None if entry is None else dict(entry)
+
+    def is_done(self, post_url):
+        entry = self.get(post_url)
+        return entry is not None and entry["state"] == self.DONE
+
+    def attempts(self, post_url):
+        entry = self.get(post_url)
+        return 0 if entry is None else entry["attempts"]
+
+    def start(self, post_url):
+        """Marks a post as in progress and counts the attempt.
+        """
+        return self._update(post_url, state=self.IN_PROGRESS, attempts=self.attempts(post_url) + 1)
+
+    def done(self, post_url):
+        return self._update(post_url, state=self.DONE, error=None)
+
+    def fail(self, post_url, error):
+        return self._update(post_url, state=self.FAILED, error=str(error))
+
+    def release(self, post_url):
+        """Marks an interrupted post as pending again without counting the attempt.
+        """
+        return self._update(post_url, state=self.PENDING, attempts=max(0, self.attempts(post_url) - 1))
+
+    def summary(self, post_urls = None):
+        """Counts the posts per state.
+
+        Args:
+            post_urls (list of strings, optional): Only count these post urls. Defaults to all posts in the journal.
+
+        Returns:
+            dict: Number of posts per state.
+        """
+        with self.lock:
+            post_urls = self.entries.keys() if post_urls is None else post_urls
+            counts = {}
+            for post_url in post_urls:
+                state = self.entries[post_url]["state"] if post_url in self.entries else self.PENDING
+                counts[state] = counts.get(state, 0) + 1
+            return counts
+
+    def close(self):
+        with self.lock:
+            self.fp.close()
+
+class RetrySchedule():
+    """Hands out post urls to crawl in their original order and schedules failed posts again with exponential backoff until
+    they reach max_attempts. Posts that are done in the journal, or that already failed max_attempts times, are skipped.
+    Safe to use from several worker threads.
+    """
+
+    def __init__(self, post_urls, max_attempts = 1, backoff = 60, journal = None, stop = None):
+        """
+        Args:
+            post_urls (list of strings): Urls of the posts to crawl.
+            max_attempts (int, optional): Maximum number of attempts per post, including those of earlier runs in the journal. Defaults to 1.
+            backoff (int, optional): Seconds to wait before the first retry, doubled for every further retry. Defaults to 60.
+            journal (CrawlJournal, optional): Journal with the attempts and states of earlier runs. Defaults to None.
+            stop (threading.Event, optional): Once set, next() doesn't hand out any more posts and ends its backoff waits.
+                Defaults to None (a new Event).
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.stop = stop if stop is not None else threading.Event()
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.skipped = []
+        self.heap = []
+        for order, post_url in enumerate(dict.fromkeys(post_urls)):
+            entry = journal.get(post_url) if journal is not None else None
+            attempts = 0 if entry is None else entry["attempts"]
+            if entry is not None and (entry["state"] == CrawlJournal.DONE or attempts >= max_attempts):
+                self.skipped.append(post_url)
+                continue
+            self.attempts[post_url] = attempts
+            self.heap.append((0, order, post_url))
+        heapq.heapify(self.heap)
+        self.order = len(self.heap) + len(self.skipped)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.heap)
+
+    def next(self):
+        """Returns the next post url to crawl, waiting for its backoff if needed, or None if no post is left or stop is set.
+        A post whose backoff wait is ended by stop or by an exception, e.g. a KeyboardInterrupt, is put back without counting the attempt.
+        """
+        with self.lock:
+            if len(self.heap) == 0 or self.stop.is_set():
+                return None
+            scheduled = heapq.heappop(self.heap)
+        ready, _, post_url = scheduled
+        delay = ready - time.monotonic()
+        try:
+            if delay > 0:
+                print(f"Waiting {delay:.0f}s before retrying {post_url}")
+                self.stop.wait(timeout=delay)
+        except BaseException:
+            self._put_back(scheduled)
+            raise
+        if self.stop.is_set():
+            self._put_back(scheduled)
+            return None
+        with self.lock:
+            self.attempts[post_url] += 1
+        return post_url
+
+    def _put_back(self, scheduled):
+        with self.lock:
+            heapq.heappush(self.heap, scheduled)
+
+    def retry(self, post_url):
+        """Schedules a failed post again if it has attempts left.
+
+        Returns:
+            float: Seconds until the retry or None if the post reached max_attempts.
+        """
+        with self.lock:
+            attempts = self.attempts.get(post_url, 0)
+            if attempts >= self.max_attempts:
+                return None
+            delay = self.backoff * 2 ** (attempts - 1) if attempts > 0 else 0
+            self.order += 1
+            heapq.heappush(self.heap, (time.monotonic() + delay, self.order, post_url))
+            return delay
+
+    def release(self, post_url):
+        """Puts back an interrupted post without counting the attempt.
+        """
+        with self.lock:
+            self.attempts[post_url] = max(0, self.attempts.get(post_url, 1) - 1)
+            self.order += 1
+            heapq.heappush(self.heap, (0, self.order, post_url))
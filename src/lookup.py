@@ -0,0 +1,93 @@
+from selenium.common.exceptions import NoSuchElementException
+
+import time
+from time import sleep
+import config
+from src.selector_registry import registry
+
+class LookupBudget():
+    """Lookup budget of one selector. A required selector is waited for up to timeout seconds and fails the lookup if it never
+    matches. An optional selector is looked up once and waits only timeout seconds (by default not at all) before it counts as missing.
+    """
+
+    def __init__(self, required = True, timeout = 3):
+        """
+        Args:
+            required (bool, optional): If True, a missing element raises NoSuchElementException. Defaults to True.
+            timeout (int, optional): Maximum seconds to wait for the element. Defaults to 3, the implicit wait of the crawler.
+        """
+        self.required = required
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, name):
+        """Creates the budget of the selector with the given name from SELECTOR_BUDGETS in config.py. Missing entries use the defaults.
+        """
+        return cls(**getattr(config, "SELECTOR_BUDGETS", {}).get(name, {}))
+
+class SelectorLookup():
+    """Finds elements by the name of their selector in config.py with the selector's LookupBudget instead of the driver's implicit wait.
+    The driver's implicit wait has to be 0 while the lookup is used, otherwise every miss still costs the implicit wait.
+    Seconds spent waiting are added to the profiler as phase "wait.[selector name]", misses are counted as "missing.[selector name]".
+    """
+
+    def __init__(self, profiler = None, poll_frequency = 0.1):
+        """
+        Args:
+            profiler (src.profiling.CrawlProfiler, optional): Profiler the waits and misses are reported to. Defaults to None.
+            poll_frequency (float, optional): Seconds between two lookups while waiting. Defaults to 0.1.
+        """
+        self.profiler = profiler
+        self.poll_frequency = poll_frequency
+        self.budgets = {}
+
+    def budget(self, name):
+        if name not in self.budgets:
+            self.budgets[name] = LookupBudget.from_config(name)
+        return self.budgets[name]
+
+    def find_all(self, context, name, variables_to_inject = []):
+        """Returns all elements matching the selector below context. Waits up to the selector's timeout if nothing matches at first.
+
+        Args:
+            context (selenium.webdriver or WebElement): Driver or element to search in.
+            name (string): Name of the selector in config.py.
+            variables_to_inject (list, optional): Variables for the {} placeholders of the query. Defaults to [].
+
+        Returns:
+            list of WebElements: The matching elements, empty if none matched within the timeout.
+        """
+        selector, query = registry.get(name, variables_to_inject)
+        elements = context.find_elements(selector, query)
+        timeout = self.budget(name).timeout
+        if len(elements) == 0 and timeout > 0:
+            start = time.monotonic()
+            while len(elements) == 0 and time.monotonic() - start < timeout:
+                sleep(self.poll_frequency)
+                elements = context.find_elements(selector, query)
+            if self.profiler is not None:
+                self.profiler.add("wait." + name, time.monotonic() - start)
+        if len(elements) == 0 and self.profiler is not None:
+            self.profiler.count("missing." + name)
+        return elements
+
+    def find(self, context, name, variables_to_inject = []):
+        """Returns the first element matching the selector below context.
+
+        Args:
+            context (selenium.webdriver or WebElement): Driver or element to search in.
+            name (string): Name of the selector in config.py.
+            variables_to_inject (list, optional): Variables for the {} placeholders of the query. Defaults to [].
+
+        Raises:
+            NoSuchElementException: If a required selector doesn't match within its timeout.
+
+        Returns:
+            WebElement: The element or None if an optional selector doesn't match.
+        """
+        elements = self.find_all(context, name, variables_to_inject)
+        if len(elements) > 0:
+            return elements[0]
+        if self.budget(name).required:
+            raise NoSuchElementException(f"Required selector {name} didn't match within {self.budget(name).timeout}s.")
+        return None
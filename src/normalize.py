@@ -0,0 +1,177 @@
+"""Vectorized normalization of the raw values InstagramCrawler scrapes. The likes column holds the text shown on the page
+("1,234 likes", "12.3K likes", "1.234 Gefällt mir", "Like" or None), dates are ISO strings and replies_count mixes numbers and
+missing values. normalize_frame() turns whole columns into explicit dtypes with regex extraction and numeric operations instead
+of a Python function per row. Like counts and urls repeat a lot, so their text is only parsed once per distinct value.
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# dtype of every column of a normalized frame
+NORMALIZED_DTYPES = {
+    "post_url": "category",
+    "is_post": "boolean",
+    "commenter": "category",
+    "text": "string",
+    "replies_to": "string",
+    "replies_count": "Int64",
+    "likes": "Int64",
+    "date": "datetime64[ns, UTC]",
+    "crawl_time": "datetime64[ns]",
+}
+
+# characters besides "." and "," that separate the thousands of a number
+GROUP_SEPARATORS = "'\u00a0\u202f "
+
+# a number with thousands or decimal separators, optionally followed by an abbreviation like "K", "Mio." or "mil"
+COUNT_PATTERN = r"(?P<number>\d(?:[\d.," + GROUP_SEPARATORS + r"]*\d)?)\s*(?P<suffix>millionen|million|billion|tsd|mio|mrd|mil|tys|k|m|b)?\b"
+
+# factor of the abbreviations of COUNT_PATTERN, lower case
+COUNT_SUFFIXES = {"k": 1e3, "tsd": 1e3, "mil": 1e3, "tys": 1e3, "m": 1e6, "mio": 1e6, "million": 1e6, "millionen": 1e6, "b": 1e9, "mrd": 1e9, "billion": 1e9}
+
+def _distinct(values):
+    """Returns the integer codes of values and its distinct values as a string Series, missing values have the code -1.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    return codes, pd.Series(uniques, dtype="string")
+
+def _take(parsed, codes, missing):
+    """Spreads the values parsed per distinct value (numpy array) back to all rows, rows with the code -1 get missing.
+    """
+    # the code -1 takes the last element
+    return np.append(parsed, missing)[codes]
+
+def parse_counts(values):
+    """Parses like and reply counts as shown on the page into integers. Without an abbreviation, every separator is a thousands
+    separator, so "1,234" and "1.234" are both 1234. With an abbreviation, the separator is a decimal point: "12.3K" and
+    "12,3 Tsd." are both 12300. Text without a number, like "Like", is missing. Numbers are passed through.
+
+    Args:
+        values (pandas.Series): Raw counts.
+
+    Returns:
+        pandas.Series: Counts with dtype Int64 and the index of values.
+    """
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        return values.round().astype("Int64")
+    codes, uniques = _distinct(values)
+    parts = uniques.str.lower().str.extract(COUNT_PATTERN)
+    number = parts["number"].str.replace("[" + GROUP_SEPARATORS + "]", "", regex=True)
+    factor = parts["suffix"].map(COUNT_SUFFIXES).astype("Float64")
+    # with an abbreviation the number has decimals, otherwise only thousands separators
+    decimal = pd.to_numeric(number.str.replace(",", ".", regex=False).where(factor.notna()), errors="coerce")
+    whole = pd.to_numeric(number.str.replace(r"[.,]", "", regex=True).where(factor.isna()), errors="coerce")
+    counts = (decimal * factor).fillna(whole).round()
+    return pd.Series(_take(counts.to_numpy(dtype="float64", na_value=np.nan), codes, np.nan), index=values.index).astype("Int64")
+
+COUNT_REGEX = re.compile(COUNT_PATTERN)
+
+@lru_cache(maxsize=65536)
+def _parse_count_text(text):
+    # the same like texts ("Like", "1 like", ...) come up again and again
+    match = COUNT_REGEX.search(text.lower())
+    if match is None:
+        return None
+    number = re.sub("[" + GROUP_SEPARATORS + "]", "", match["number"])
+    try:
+        if match["suffix"] is None:
+            return int(re.sub(r"[.,]", "", number))
+        return round(float(number.replace(",", ".")) * COUNT_SUFFIXES[match["suffix"]])
+    except ValueError:
+        return None
+
+def parse_count(value):
+    """Parses a single like or reply count like parse_counts(), for code that handles one entry at a time.
+
+    Args:
+        value (string, number or None): Raw count.
+
+    Returns:
+        int or None: The count, None if value holds no number.
+    """
+    if isinstance(value, str):
+        return _parse_count_text(value)
+    if value is None or isinstance(value, bool) or pd.isna(value):
+        return None
+    return round(value)
+
+def parse_booleans(values):
+    """Parses True/False values that may have been stored as text, e.g. by the csv backend.
+
+    Args:
+        values (pandas.Series): Raw booleans.
+
+    Returns:
+        pandas.Series: Values with dtype boolean.
+    """
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return values.astype("boolean")
+    return values.astype("string").str.lower().map({"true": True, "false": False, "1": True, "0": False, "1.0": True, "0.0": False}).astype("boolean")
+
+def parse_dates(values, utc = True):
+    """Parses ISO dates. Unparseable values are missing. Every distinct text is parsed once, dates in UTC with a "Z" suffix like
+    the ones of the page are parsed without the slower timezone handling.
+
+    Args:
+        values (pandas.Series): Raw dates, e.g. "2022-12-01T01:40:25.000Z", or datetimes.
+        utc (bool, optional): If True, the result is timezone aware in UTC, otherwise naive. Defaults to True.
+
+    Returns:
+        pandas.Series: Dates with dtype datetime64[ns, UTC] or datetime64[ns].
+    """
+    if not pd.api.types.is_datetime64_any_dtype(values.dtype):
+        codes, uniques = _distinct(values)
+        zulu = uniques.str.endswith("Z").fillna(False).to_numpy(dtype=bool)
+        # naive datetimes, in UTC for the texts with a timezone
+        parsed = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[ns]")
+        parsed[zulu] = pd.to_datetime(uniques[zulu].str.slice(stop=-1), errors="coerce", format="ISO8601").to_numpy(dtype="datetime64[ns]")
+        if not zulu.all():
+            others = pd.to_datetime(uniques[~zulu], utc=True, errors="coerce", format="ISO8601", cache=False) if utc else pd.to_datetime(uniques[~zulu], errors="coerce", format="ISO8601", cache=False)
+            if others.dt.tz is not None:
+                others = others.dt.tz_convert(None)
+            parsed[~zulu] = others.to_numpy(dtype="datetime64[ns]")
+        values = pd.Series(_take(parsed, codes, np.datetime64("NaT")), index=values.index)
+        return values.dt.tz_localize("UTC") if utc else values
+    if utc and values.dt.tz is None:
+        values = values.dt.tz_localize("UTC")
+    elif not utc and values.dt.tz is not None:
+        values = values.dt.tz_convert(None)
+    return values.astype("datetime64[ns, UTC]" if utc else "datetime64[ns]")
+
+def normalize_frame(frame, categorical = True):
+    """Returns a copy of frame with the dtypes of NORMALIZED_DTYPES: likes and replies_count as Int64, date as datetime64 in UTC,
+    crawl_time as naive datetime64, is_post as boolean and text columns as strings. Columns that are normalized already stay the same,
+    so normalizing twice is cheap. Columns that are not in NORMALIZED_DTYPES are kept as they are.
+
+    Args:
+        frame (pandas.DataFrame): Entries with the columns of InstagramDatabase.
+        categorical (bool, optional): If True, post_url and commenter are categoricals, otherwise strings. Frames with categoricals
+            only keep that dtype when concatenated if their categories match, so use strings for blocks that are concatenated later.
+            Defaults to True.
+
+    Returns:
+        pandas.DataFrame: Normalized copy of frame.
+    """
+    normalized = frame.copy()
+    for column in ["likes", "replies_count"]:
+        if column in normalized:
+            normalized[column] = parse_counts(normalized[column])
+    if "is_post" in normalized:
+        normalized["is_post"] = parse_booleans(normalized["is_post"])
+    if "date" in normalized:
+        normalized["date"] = parse_dates(normalized["date"])
+    if "crawl_time" in normalized:
+        normalized["crawl_time"] = parse_dates(normalized["crawl_time"], utc=False)
+    for column in ["text", "replies_to"]:
+        if column in normalized:
+            normalized[column] = normalized[column].astype("string")
+    for column in ["post_url", "commenter"]:
+        if column in normalized:
+            if categorical:
+                normalized[column] = normalized[column].astype("string").astype("category")
+            else:
+                normalized[column] = normalized[column].astype("string")
+    return normalized
@@ -0,0 +1,196 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+class StartupTimer():
+    """Measures the startup of a crawl run, from the start of the process until the crawler is ready, split into named steps.
+    Steps can be measured in other threads, e.g. starting the browser while the database is opened.
+    """
+
+    def __init__(self, started = None):
+        """
+        Args:
+            started (float, optional): time.perf_counter() at the start of the process. Defaults to None (now).
+        """
+        self.started = started if started is not None else time.perf_counter()
+        self.steps = {}
+        self.total = None
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.steps[name] = self.steps.get(name, 0.0) + seconds
+
+    @contextmanager
+    def step(self, name):
+        """Context manager that adds the time spent in it to the step name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def finish(self, profiler = None):
+        """Ends the startup, adds it and its steps as "startup" and "startup.[step]" phases to profiler and prints them.
+
+        Args:
+            profiler (CrawlProfiler, optional): Profiler of the run. Defaults to None.
+
+        Returns:
+            float: Seconds since started.
+        """
+        self.total = time.perf_counter() - self.started
+        if profiler is not None:
+            profiler.add("startup", self.total)
+            for name, seconds in self.steps.items():
+                profiler.add(f"startup.{name}", seconds)
+        print(f"Started in {self.total:.2f}s ({', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.steps.items())})")
+        return self.total
+
+class CrawlProfiler():
+    """Records how long the phases of a crawl take (navigation, login, loading comments and replies, extraction, database writes)
+    and how often they run. Every phase of a post is added up and written as one json line per post when the post ends. Over the
+    whole run, totals and a bounded sample of durations per phase are kept for the summary, so memory stays constant for long crawls.
+    Phases are timed with time.perf_counter(), which costs well under a microsecond per call. Safe to use from several worker threads.
+    """
+
+    # number of durations per phase kept for the percentiles of the summary
+    SAMPLE_SIZE = 10000
+
+    def __init__(self, path = None):
+        """
+        Args:
+            path (string, optional): Path of the jsonl file the per post events are appended to. Defaults to None (no events are written).
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.totals = {}
+        self.counts = {}
+        self.samples = {}
+        self.counters = {}
+        self.events = 0
+        self.started = time.perf_counter()
+        self.fp = None
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.fp = open(path, "a")
+
+    def _post(self):
+        """Returns the phases and counts of the post the current thread is crawling, or None outside of a post.
+        """
+        return getattr(self.local, "post", None)
+
+    def add(self, name, seconds):
+        """Adds one run of a phase.
+
+        Args:
+            name (string): Name of the phase.
+            seconds (float): Duration of the run.
+        """
+        post = self._post()
+        if post is not None:
+            phase = post["phases"].setdefault(name, [0.0, 0])
+            phase[0] += seconds
+            phase[1] += 1
+        with self.lock:
+            count = self.counts.get(name, 0) + 1
+            self.counts[name] = count
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            # reservoir sampling keeps a uniform sample of all durations
+            sample = self.samples.setdefault(name, [])
+            if len(sample) < self.SAMPLE_SIZE:
+                sample.append(seconds)
+            else:
+                position = random.randrange(count)
+                if position < self.SAMPLE_SIZE:
+                    sample[position] = seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Times the enclosed block as one run of the phase name, also if it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def count(self, name, n = 1):
+        """Adds n to a counter of the current post and of the whole run, e.g. the number of comments extracted.
+        """
+        post = self._post()
+        if post is not None:
+            post["counts"][name] = post["counts"].get(name, 0) + n
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def start_post(self, post_url):
+        self.local.post = {"post_url": post_url, "started": time.perf_counter(), "phases": {}, "counts": {}}
+
+    def end_post(self, status = "done"):
+        """Ends the current post and writes its event.
+
+        Args:
+            status (str, optional): Outcome of the post, e.g. "done" or "failed". Defaults to "done".
+
+        Returns:
+            dict: The event of the post.
+        """
+        post = self._post()
+        if post is None:
+            return None
+        self.local.post = None
+        seconds = time.perf_counter() - post["started"]
+        self.add("post", seconds)
+        event = {
+            "event": "post",
+            "time": time.time(),
+            "post_url": post["post_url"],
+            "status": status,
+            "seconds": round(seconds, 6),
+            "phases": {name: {"seconds": round(total, 6), "count": count} for name, (total, count) in post["phases"].items()},
+            "counts": post["counts"],
+        }
+        with self.lock:
+            self.events += 1
+            if self.fp is not None:
+                self.fp.write(json.dumps(event) + "\n")
+                self.fp.flush()
+        return event
+
+    def summary(self):
+        """Returns a row per phase with count, total seconds, p50 and p95 in milliseconds, and the counters of the run.
+        """
+        with self.lock:
+            rows = []
+            for name, total in self.totals.items():
+                sample = sorted(self.samples[name])
+                percentile = lambda p: sample[min(len(sample) - 1, int(p * len(sample)))] * 1000
+                rows.append({"phase": name, "count": self.counts[name], "total_s": total, "p50_ms": percentile(0.5), "p95_ms": percentile(0.95)})
+            counters = dict(self.counters)
+        return rows, counters
+
+    def print_summary(self):
+        """Prints the summary table and the comments per second of the run.
+        """
+        rows, counters = self.summary()
+        if len(rows) == 0:
+            return
+        elapsed = time.perf_counter() - self.started
+        print(f"{'phase':<22}{'count':>10}{'total s':>12}{'p50 ms':>12}{'p95 ms':>12}")
+        for row in sorted(rows, key=lambda row: -row["total_s"]):
+            print(f"{row['phase']:<22}{row['count']:>10}{row['total_s']:>12.2f}{row['p50_ms']:>12.1f}{row['p95_ms']:>12.1f}")
+        for name, value in counters.items():
+            print(f"{name}: {value} ({value / elapsed:.2f}/s)")
+        print(f"Wall time: {elapsed:.1f}s")
+
+    def close(self):
+        with self.lock:
+            if self.fp is not None:
+                self.fp.close()
+                self.fp = None
@@ -0,0 +1,90 @@
+"""Record type of the entries InstagramCrawler extracts. An Entry is a fixed set of slots in the order of ENTRY_COLUMNS, so building
+one costs about as much as a tuple, while a pandas.Series costs tens of microseconds. The database backends turn the buffered entries
+into columns in bulk.
+"""
+
+import uuid
+from sys import intern
+
+# columns of an entry, also the default columns of the database backends
+ENTRY_COLUMNS = ["post_url", "is_post", "commenter", "text", "replies_to", "replies_count", "likes", "date", "crawl_time"]
+
+class Entry():
+    """One post, comment or reply. Supports the read access of a pandas.Series or dict that the database backends use:
+    entry.get(column), entry[column] and entry.keys().
+    """
+
+    __slots__ = ENTRY_COLUMNS
+
+    def __init__(self, post_url, is_post, commenter, text, replies_to, replies_count, likes, date, crawl_time):
+        self.post_url = post_url
+        self.is_post = is_post
+        self.commenter = commenter
+        self.text = text
+        self.replies_to = replies_to
+        self.replies_count = replies_count
+        self.likes = likes
+        self.date = date
+        self.crawl_time = crawl_time
+
+    def get(self, column, default = None):
+        if column in ENTRY_COLUMNS:
+            return getattr(self, column)
+        return default
+
+    def __getitem__(self, column):
+        if column not in ENTRY_COLUMNS:
+            raise KeyError(column)
+        return getattr(self, column)
+
+    def __setitem__(self, column, value):
+        if column not in ENTRY_COLUMNS:
+            raise KeyError(column)
+        setattr(self, column, value)
+
+    def keys(self):
+        return list(ENTRY_COLUMNS)
+
+    def as_tuple(self):
+        """Returns the values in the order of ENTRY_COLUMNS.
+        """
+        return (self.post_url, self.is_post, self.commenter, self.text, self.replies_to, self.replies_count, self.likes, self.date, self.crawl_time)
+
+    def to_dict(self):
+        return dict(zip(ENTRY_COLUMNS, self.as_tuple()))
+
+    def __eq__(self, other):
+        return isinstance(other, Entry) and other.as_tuple() == self.as_tuple()
+
+    def __repr__(self):
+        return f"Entry({', '.join(f'{column}={value!r}' for column, value in zip(ENTRY_COLUMNS, self.as_tuple()))})"
+
+# namespace of the stable entry keys, see entry_key()
+ENTRY_KEY_NAMESPACE = uuid.UUID("6f1b2c1e-5d0a-4d8e-9a57-3c2f1f0c9b41")
+
+def entry_key(post_url, commenter, date = None, text = None):
+    """Returns the stable unique identifier of an entry. Crawling the same comment again gives the same key, so entries
+    that are already in the database can be recognized on later crawls. Likes and reply counts change over time and are not part of the key.
+
+    Args:
+        post_url (string): Url of the post the entry belongs to.
+        commenter (string): Account name of the commenter, or of the post owner for post entries.
+        date (string, optional): Datetime attribute of the comment. Defaults to None.
+        text (string, optional): Text of the comment. Defaults to None.
+
+    Returns:
+        string: uuid5 of the given fields.
+    """
+    return str(uuid.uuid5(ENTRY_KEY_NAMESPACE, "\x1f".join("" if value is None else str(value) for value in [post_url, commenter, date, text])))
+
+def intern_name(name):
+    """Interns an account name, the same commenter in many entries then shares one string.
+    """
+    return intern(name) if isinstance(name, str) else name
+
+def entry_values(entry, columns):
+    """Returns the values of an Entry, pandas.Series or dict in the order of columns.
+    """
+    if isinstance(entry, Entry) and (columns is ENTRY_COLUMNS or columns == ENTRY_COLUMNS):
+        return entry.as_tuple()
+    return tuple(entry.get(column) for column in columns)
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import threading
+import time
+
+from selenium.webdriver.common.by import By
+import config
+from src.extraction import EXTRACTION_SELECTORS
+
+# config.py entries in the format "BY_STRATEGY,query" are selectors
+SELECTOR_PATTERN = re.compile(r"^([A-Z_]+),(.*)$", re.DOTALL)
+# names of the selenium By strategies, e.g. CSS_SELECTOR
+BY_STRATEGIES = {name for name in vars(By) if name.isupper()}
+# selectors the crawler looks up by name, they have to be in config.py
+CRAWLER_SELECTORS = [
+    "PROFILE_SELECTOR", "NOTIFICATION_POPUP", "COOKIE_POPUP", "SEARCH_ICON", "SEARCH_INPUT", "SEARCH_RESULTS",
+    "WAIT_FOR_ACCOUNT_TO_LOAD", "CURRENTLY_VISIBLE_POSTS", "WAIT_FOR_POST_TO_LOAD", "LOAD_MORE_COMMENTS_BUTTON",
+    "HIDDEN_COMMENTS", "VIEW_MORE_REPLIES_BUTTON",
+] + EXTRACTION_SELECTORS
+
+def parse_selector(name, value):
+    """Parses and validates one selector entry.
+
+    Args:
+        name (string): Name of the entry, used in error messages.
+        value (string): Entry in the format "BY_STRATEGY,query", e.g. "CSS_SELECTOR,article a".
+
+    Raises:
+        ValueError: If the entry isn't in the expected format, the By strategy doesn't exist or the query is empty.
+
+    Returns:
+        tuple: selenium.webdriver.common.by.By selector, query string and the number of {} placeholders in the query.
+    """
+    match = SELECTOR_PATTERN.match(value) if isinstance(value, str) else None
+    if match is None:
+        raise ValueError(f"Selector {name} has to be in the format 'BY_STRATEGY,query', got: {value!r}")
+    strategy, query = match.groups()
+    if not hasattr(By, strategy):
+        raise ValueError(f"Selector {name} uses unknown By strategy '{strategy}'. Use one of {sorted(BY_STRATEGIES)}.")
+    if query.strip() == "":
+        raise ValueError(f"Selector {name} has an empty query.")
+    return getattr(By, strategy), query, query.count("{}")
+
+def is_selector(value):
+    """Returns True if a config value is in the selector format: an upper case strategy name and a comma before the query, e.g.
+    "CSS_SELECTOR,article a". Values like urls, "Elon Musk" or "WDB" are never parsed, whatever their case. A strategy that isn't
+    a By attribute still counts as a selector, so parse_selector() reports the typo instead of the selector going missing.
+    """
+    return isinstance(value, str) and SELECTOR_PATTERN.match(value) is not None
+
+def config_selectors(module):
+    """Returns all selector entries of a config module: upper case attributes whose value is_selector().
+    """
+    return {name: value for name, value in vars(module).items() if name.isupper() and is_selector(value)}
+
+class SelectorRegistry():
+    """Parses and validates all selectors of config.py once and hands out ready (By, query) tuples. Parameterized selectors
+    like WAIT_FOR_ACCOUNT_TO_LOAD are formatted once per set of variables.
+
+    Selectors can be overridden with a json file of {"NAME": "BY_STRATEGY,query"} entries. A watched override file is reloaded
+    when it changes, without restarting the crawler. Invalid overrides are reported and the previous selectors are kept.
+    """
+
+    def __init__(self, module = config, required = []):
+        """
+        Args:
+            module (module, optional): Config module with the selectors. Defaults to config.
+            required (list of strings, optional): Names of selectors that have to be in module, in addition to the keys of its
+                SELECTOR_BUDGETS. Defaults to [].
+
+        Raises:
+            ValueError: If a selector is invalid, or a required one is missing or isn't in the selector format.
+        """
+        self.lock = threading.Lock()
+        self.defaults = {name: parse_selector(name, value) for name, value in config_selectors(module).items()}
+        for name in list(required) + list(getattr(module, "SELECTOR_BUDGETS", {})):
+            if name in self.defaults:
+                continue
+            if not hasattr(module, name):
+                raise ValueError(f"Selector {name} is used by the crawler but missing in config.py.")
+            # a malformed selector, e.g. with a lower case strategy, isn't recognized by config_selectors(), report its value
+            parse_selector(name, getattr(module, name))
+        self.selectors = dict(self.defaults)
+        self.formatted = {}
+        self.overrides_path = None
+        self.overrides_mtime = None
+        self.check_interval = 5
+        self.next_check = 0
+
+    def get(self, name, variables_to_inject = []):
+        """Returns the selector and query string of the given entry.
+
+        Args:
+            name (string): Name of the selector, e.g. "COMMENT_TEXT".
+            variables_to_inject (list, optional): Variables filled into the {} placeholders of the query. Defaults to [].
+
+        Returns:
+            tuple: selenium.webdriver.common.by.By selector and query string.
+        """
+        if self.overrides_path is not None and time.monotonic() >= self.next_check:
+            self.reload_if_changed()
+        try:
+            selector, query, placeholders = self.selectors[name]
+        except KeyError:
+            raise KeyError(f"Unknown selector {name}. Add it to config.py in the format 'BY_STRATEGY,query'.") from None
+        if placeholders == 0:
+            return selector, query
+        key = (name, tuple(variables_to_inject))
+        if key not in self.formatted:
+            self.formatted[key] = (selector, query.format(*variables_to_inject))
+        return self.formatted[key]
+
+    def override(self, overrides):
+        """Replaces selectors with the given entries. All entries are validated before any of them is used.
+
+        Args:
+            overrides (dict): {"NAME": "BY_STRATEGY,query"} entries.
+        """
+        parsed = {name: parse_selector(name, value) for name, value in overrides.items()}
+        with self.lock:
+            selectors = dict(self.defaults)
+            selectors.update(parsed)
+            self.selectors = selectors
+            self.formatted = {}
+
+    def watch(self, path, check_interval = 5):
+        """Loads selector overrides from a json file and reloads them whenever the file changes.
+
+        Args:
+            path (string): Path to the json file.
+            check_interval (int, optional): Minimum seconds between two checks of the file's modification time. Defaults to 5.
+        """
+        self.overrides_path = path
+        self.check_interval = check_interval
+        self.overrides_mtime = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        """Reloads the watched override file if its modification time changed.
+
+        Returns:
+            bool: True if the overrides were reloaded.
+        """
+        self.next_check = time.monotonic() + self.check_interval
+        try:
+            mtime = os.path.getmtime(self.overrides_path)
+        except OSError:
+            return False
+        if mtime == self.overrides_mtime:
+            return False
+        self.overrides_mtime = mtime
+        try:
+            with open(self.overrides_path, "r") as fp:
+                self.override(json.load(fp))
+        except Exception as e:
+            print(f"Couldn't load selector overrides from {self.overrides_path}, keeping the previous selectors: ", e)
+            return False
+        print(f"Loaded selector overrides from {self.overrides_path}")
+        return True
+
+# parsed at import, so an invalid or missing selector in config.py fails at startup
+registry = SelectorRegistry(required=CRAWLER_SELECTORS)
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+
+DUMP_LOCAL_STORAGE_SCRIPT = "return Object.assign({}, window.localStorage)"
+RESTORE_LOCAL_STORAGE_SCRIPT = """
+const items = arguments[0];
+for (const key in items) {
+    window.localStorage.setItem(key, items[key]);
+}
+"""
+
+# keys of driver.get_cookies() entries that driver.add_cookie() accepts
+COOKIE_KEYS = ["name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite"]
+
+class SessionStore():
+    """Stores the cookies and local storage of a logged in driver on disk, so new drivers can reuse the session instead of going
+    through the cookie popup and login form again. One json file per Instagram account in the given directory.
+    The files contain session cookies, keep the directory private.
+    """
+
+    def __init__(self, directory, username):
+        """
+        Args:
+            directory (string): Directory of the session files.
+            username (string): Instagram account the session belongs to.
+        """
+        if (directory == None) or (directory == ""):
+            raise ValueError("Path to session directory is not defined.")
+        if (username == None) or (username == ""):
+            raise ValueError("Username of the session is not defined.")
+        self.path = os.path.join(directory, username + ".json")
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        """Returns the stored session or None if there is none.
+        """
+        try:
+            with open(self.path, "r") as fp:
+                return json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save(self, driver):
+        """Stores the cookies and local storage of the driver's current page. The file is replaced atomically, so concurrent
+        workers never read a half written session.
+
+        Args:
+            driver (selenium.webdriver): Logged in driver.
+        """
+        session = {
+            "cookies": driver.get_cookies(),
+            "local_storage": driver.execute_script(DUMP_LOCAL_STORAGE_SCRIPT),
+            "saved_at": time.time(),
+        }
+        with self.lock:
+            temporary_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary_path, "w") as fp:
+                json.dump(session, fp)
+            os.replace(temporary_path, self.path)
+
+    def restore(self, driver, url):
+        """Loads the stored cookies and local storage into the driver and reloads the url. Cookies can only be set for the domain
+        of the current page, so the driver has to go to the url first.
+
+        Args:
+            driver (selenium.webdriver): Driver to restore the session into.
+            url (string): Url of the site the session belongs to.
+
+        Returns:
+            bool: False if there is no stored session, True otherwise. Doesn't check if the session is still valid.
+        """
+        session = self.load()
+        if session is None:
+            return False
+        driver.get(url)
+        now = time.time()
+        for cookie in session["cookies"]:
+            if "expiry" in cookie and cookie["expiry"] < now:
+                continue
+            try:
+                driver.add_cookie({key: cookie[key] for key in COOKIE_KEYS if key in cookie})
+            except Exception as e:
+                print(f"Couldn't restore cookie {cookie.get('name')}: ", e)
+        driver.execute_script(RESTORE_LOCAL_STORAGE_SCRIPT, session.get("local_storage") or {})
+        driver.get(url)
+        return True
+
+    def clear(self):
+        """Deletes the stored session, e.g. after it expired.
+        """
+        with self.lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,370 @@
+"""Snapshot-then-parse extraction. Once all comments and replies of a post are loaded, the crawler stores the page source as a
+compressed snapshot and moves on to the next post, while a pool of worker processes parses the snapshots with lxml and adds
+the entries to the database. The browser is only busy for one page_source command per post instead of the whole extraction,
+and old snapshots can be parsed again without crawling, e.g. after a selector in config.py changed.
+"""
+
+import gzip
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from sys import intern
+from urllib.parse import urlsplit
+
+try:
+    import lxml.etree
+    import lxml.html
+    from cssselect import HTMLTranslator
+except ImportError:
+    lxml = None
+
+from src.extraction import EXTRACTION_SELECTORS
+from src.records import Entry, entry_key, intern_name
+from src.selector_registry import registry
+
+LXML_MISSING = "Parsing snapshots needs the lxml and cssselect packages: pip install lxml cssselect"
+
+_xpath_cache = {}
+
+def compiled_xpath(by, query):
+    """Returns the compiled lxml xpath of a selenium selector. Css selectors are translated to an xpath that, like
+    querySelectorAll, only matches descendants of the context node. An xpath starting with / matches the whole document
+    from every context node, like in the browser.
+
+    Args:
+        by (string): selenium.webdriver.common.by.By strategy, e.g. "css selector".
+        query (string): Query for the strategy.
+
+    Returns:
+        lxml.etree.XPath: Compiled xpath.
+    """
+    if lxml is None:
+        raise ImportError(LXML_MISSING)
+    key = (by, query)
+    if key not in _xpath_cache:
+        translator = HTMLTranslator()
+        if by == "xpath":
+            xpath = query
+        elif by == "css selector" or by == "tag name":
+            xpath = translator.css_to_xpath(query, prefix="descendant::")
+        elif by == "class name":
+            xpath = translator.css_to_xpath("." + query, prefix="descendant::")
+        elif by == "id":
+            xpath = translator.css_to_xpath("#" + query, prefix="descendant::")
+        elif by == "name":
+            xpath = translator.css_to_xpath(f"[name='{query}']", prefix="descendant::")
+        else:
+            raise ValueError(f"Unsupported selector strategy: {by}")
+        _xpath_cache[key] = lxml.etree.XPath(xpath)
+    return _xpath_cache[key]
+
+def extraction_selectors():
+    """Returns the current (By, query) pairs of the EXTRACTION_SELECTORS, including selector overrides.
+    """
+    return {name: list(registry.get(name)) for name in EXTRACTION_SELECTORS}
+
+def _text_parts(node):
+    if node.tag == "br":
+        yield "\n"
+    elif isinstance(node.tag, str) and node.text:
+        yield node.text
+    if isinstance(node.tag, str):
+        for child in node:
+            yield from _text_parts(child)
+            if child.tail:
+                yield child.tail
+
+def inner_text(node):
+    """Returns the text of an lxml node like element.innerText.trim() in the browser, which the bulk and elements extraction store:
+    a <br> is a line break, line breaks inside the text are kept and only the ends are stripped.
+
+    Args:
+        node (lxml.html.HtmlElement): The node, or None.
+
+    Returns:
+        string: The text or None if node is None.
+    """
+    return None if node is None else "".join(_text_parts(node)).strip()
+
+def parse_snapshot(html, selectors):
+    """Extracts the post information, all comments and all replies from the page source of a loaded post. Python version of
+    src.extraction.EXTRACT_COMMENTS_SCRIPT with the same result, texts are read with inner_text().
+
+    Args:
+        html (string): Page source of the post.
+        selectors (dict): {name: [By strategy, query]} of all EXTRACTION_SELECTORS, see extraction_selectors().
+
+    Returns:
+        dict: {"post": {"comment", "likes", "date"}, "comments": [{"text", "owner", "likes", "date", "replies"} or None], "total": number of comment containers}
+    """
+    if lxml is None:
+        raise ImportError(LXML_MISSING)
+    root = lxml.html.document_fromstring(html)
+    # absolute xpaths give the same nodes from every context node, evaluate them once
+    absolute_results = {}
+
+    def find_all(context, name):
+        by, query = selectors[name]
+        if by == "xpath" and query.startswith("/"):
+            if query not in absolute_results:
+                absolute_results[query] = [node for node in compiled_xpath(by, query)(root) if isinstance(node, lxml.html.HtmlElement)]
+            return absolute_results[query]
+        return [node for node in compiled_xpath(by, query)(context) if isinstance(node, lxml.html.HtmlElement)]
+
+    def find(context, name):
+        nodes = find_all(context, name)
+        return nodes[0] if len(nodes) > 0 else None
+
+    def datetime_of(node):
+        return None if node is None else node.get("datetime")
+
+    containers = find_all(root, "ALL_COMMENTS_CONTAINER")
+    comments = []
+    for container in containers:
+        comment = find(container, "COMMENT_CONTAINER")
+        if comment is None:
+            comments.append(None)
+            continue
+        replies = [{
+            "text": inner_text(find(reply, "REPLY_TEXT")),
+            "owner": inner_text(find(reply, "REPLY_OWNER")),
+            "likes": inner_text(find(reply, "REPLY_LIKES")),
+            "date": datetime_of(find(reply, "REPLY_DATE")),
+        } for reply in find_all(container, "REPLIES_TO_COMMENT_CONTAINER")]
+        comments.append({
+            "text": inner_text(find(comment, "COMMENT_TEXT")),
+            "owner": inner_text(find(comment, "COMMENT_OWNER")),
+            "likes": inner_text(find(comment, "COMMENT_LIKES")),
+            "date": datetime_of(find(comment, "COMMENT_DATE")),
+            "replies": replies,
+        })
+    post = {"comment": inner_text(find(root, "POST_COMMENT")), "likes": inner_text(find(root, "POST_LIKES")), "date": datetime_of(find(root, "POST_DATE"))}
+    return {"post": post, "comments": comments, "total": len(containers)}
+
+def extracted_entries(post_url, account_name, result, crawl_time):
+    """Builds the entries of an extraction result with the same keys and values as InstagramCrawler.extract_comments_with_script().
+
+    Args:
+        post_url (string): Url of the post.
+        account_name (string): Account name of the post.
+        result (dict): Result of parse_snapshot() or EXTRACT_COMMENTS_SCRIPT.
+        crawl_time (datetime): Crawl time of all entries.
+
+    Returns:
+        list of tuples: (key, src.records.Entry) of the post, its comments and their replies in page order.
+    """
+    post = result["post"]
+    entries = [(entry_key(post_url, account_name), Entry(post_url, True, account_name, post["comment"], None, result["total"], post["likes"], post["date"], crawl_time))]
+    for comment in result["comments"]:
+        # comment container selector didn't match
+        if comment is None:
+            continue
+        comment_uuid = entry_key(post_url, comment["owner"], comment["date"], comment["text"])
+        entries.append((comment_uuid, Entry(post_url, False, intern_name(comment["owner"]), comment["text"], None, len(comment["replies"]), comment["likes"], comment["date"], crawl_time)))
+        for reply in comment["replies"]:
+            entries.append((entry_key(post_url, reply["owner"], reply["date"], reply["text"]), Entry(post_url, False, intern_name(reply["owner"]), reply["text"], comment_uuid, None, reply["likes"], reply["date"], crawl_time)))
+    return entries
+
+def read_snapshot(path):
+    """Reads a snapshot file written by SnapshotStore.save().
+
+    Returns:
+        tuple: (header dict with "post_url", "account_name" and "crawl_time", page source)
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        header = json.loads(fp.readline())
+        return header, fp.read()
+
+def parse_snapshot_file(path, selectors):
+    """Reads and parses one snapshot file. Runs in the worker processes of SnapshotParser.
+
+    Args:
+        path (string): Path of the snapshot file.
+        selectors (dict): {name: [By strategy, query]} of all EXTRACTION_SELECTORS.
+
+    Returns:
+        tuple: (post url, list of (key, src.records.Entry))
+    """
+    header, html = read_snapshot(path)
+    post_url = intern(header["post_url"])
+    result = parse_snapshot(html, selectors)
+    return post_url, extracted_entries(post_url, header["account_name"], result, datetime.fromisoformat(header["crawl_time"]))
+
+class SnapshotStore():
+    """Gzip compressed page sources of crawled posts, one file per post in [directory]/[account name]/[post id].html.gz.
+    The first line of a file is a json header with the post url, the account name and the crawl time, the rest is the page source.
+    A snapshot of the same post replaces the older one.
+    """
+
+    def __init__(self, directory, compresslevel = 6):
+        """
+        Args:
+            directory (string): Directory of the snapshots.
+            compresslevel (int, optional): Gzip compression level, lower is faster. Defaults to 6.
+        """
+        if (directory == None) or (directory == ""):
+            raise ValueError("Path to snapshot directory is not defined.")
+        self.directory = directory
+        self.compresslevel = compresslevel
+
+    def path(self, post_url, account_name):
+        """Returns the path of the snapshot of a post.
+        """
+        post_id = [part for part in urlsplit(post_url).path.split("/") if part != ""][-1]
+        return os.path.join(self.directory, account_name, post_id + ".html.gz")
+
+    def save(self, post_url, account_name, html, crawl_time = None):
+        """Writes the snapshot of a post, atomically so a crash never leaves a partial snapshot.
+
+        Args:
+            post_url (string): Url of the post.
+            account_name (string): Account name of the post.
+            html (string): Page source of the loaded post.
+            crawl_time (datetime, optional): Crawl time of the entries of the post. Defaults to None (now).
+
+        Returns:
+            string: Path of the snapshot file.
+        """
+        path = self.path(post_url, account_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = {"post_url": post_url, "account_name": account_name, "crawl_time": (crawl_time or datetime.now()).isoformat()}
+        temporary_path = path + ".tmp"
+        with gzip.open(temporary_path, "wt", encoding="utf-8", compresslevel=self.compresslevel) as fp:
+            fp.write(json.dumps(header) + "\n")
+            fp.write(html)
+        os.replace(temporary_path, path)
+        return path
+
+    def paths(self, account_name):
+        """Returns the paths of all snapshots of an account.
+        """
+        directory = os.path.join(self.directory, account_name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".html.gz"))
+
+class SnapshotParser():
+    """Parses snapshots in a pool of worker processes. The parsed entries are handed back and added to the database by the
+    thread that uses it: the crawler adds the finished snapshots before it stores the next one (add_finished()), join() adds
+    the rest. The database object is never shared with the workers or written from the callback thread of the pool.
+    If a journal is given, a crawled post is only marked done once its entries are saved.
+    """
+
+    def __init__(self, processes = None, incremental = False, journal = None):
+        """
+        Args:
+            processes (int, optional): Number of worker processes. Defaults to None (one per CPU).
+            incremental (bool, optional): If True, only entries that are not in the database yet are added. Defaults to False.
+            journal (src.journal.CrawlJournal, optional): Journal in which a post is marked done once its entries are saved,
+                or failed if its snapshot can't be parsed. Defaults to None.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=processes)
+        self.incremental = incremental
+        self.journal = journal
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        # snapshots that are submitted and whose entries are not added yet
+        self.pending = 0
+        # (path, DB, post_url, future) of the parsed snapshots whose entries are not added yet
+        self.finished = []
+        self.entries = 0
+        self.errors = {}
+
+    def submit(self, path, DB, post_url = None):
+        """Parses a snapshot in the background. Its entries are added to DB by the next add_finished() or join() call.
+
+        Args:
+            path (string): Path of the snapshot file.
+            DB (database object): Database to add the entries to. A src.workers.SynchronizedDatabase gets them through add_entries(),
+                which bypasses the buffer of the post its crawler is on.
+            post_url (string, optional): Url of the post, marked in the journal. Defaults to None (the post url of the snapshot).
+        """
+        with self.lock:
+            self.pending += 1
+        try:
+            future = self.executor.submit(parse_snapshot_file, path, extraction_selectors())
+        except Exception:
+            with self.lock:
+                self.pending -= 1
+                self.done.notify_all()
+            raise
+        future.add_done_callback(partial(self._finished, path, DB, post_url))
+
+    def _finished(self, path, DB, post_url, future):
+        with self.lock:
+            self.finished.append((path, DB, post_url, future))
+            self.done.notify_all()
+
+    def add_finished(self):
+        """Adds the entries of every snapshot parsed so far to its database, in the calling thread.
+
+        Returns:
+            int: Number of snapshots whose entries were added.
+        """
+        with self.lock:
+            finished, self.finished = self.finished, []
+        for path, DB, post_url, future in finished:
+            self._add_entries(path, DB, post_url, future)
+        return len(finished)
+
+    def _add_entries(self, path, DB, post_url, future):
+        try:
+            snapshot_post_url, entries = future.result()
+            post_url = post_url if post_url is not None else snapshot_post_url
+            known_keys = DB.known_keys(snapshot_post_url) if self.incremental else set()
+            new_entries = []
+            for key, entry in entries:
+                if key not in known_keys:
+                    known_keys.add(key)
+                    new_entries.append((key, entry))
+            if hasattr(DB, "add_entries"):
+                DB.add_entries(new_entries)
+            else:
+                for key, entry in new_entries:
+                    DB.add_entry(key, entry)
+                DB.save_db_state()
+            with self.lock:
+                self.entries += len(new_entries)
+            if self.journal is not None:
+                self.journal.done(post_url)
+        except Exception as e:
+            print(f"Exception while parsing snapshot {path}: ", e)
+            with self.lock:
+                self.errors[path] = e
+            if self.journal is not None and post_url is not None:
+                self.journal.fail(post_url, e)
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.done.notify_all()
+
+    def join(self):
+        """Waits until every submitted snapshot is parsed and adds its entries in the calling thread.
+        """
+        while True:
+            with self.lock:
+                self.done.wait_for(lambda: self.pending == 0 or len(self.finished) > 0)
+                if self.pending == 0:
+                    return
+            self.add_finished()
+
+    def parse(self, paths, DB):
+        """Parses the given snapshots and adds their entries to DB, e.g. to extract old snapshots again after a selector changed.
+
+        Returns:
+            int: Number of entries added.
+        """
+        entries = self.entries
+        for path in paths:
+            self.submit(path, DB)
+        self.join()
+        return self.entries - entries
+
+    def close(self):
+        """Adds the entries of the submitted snapshots and stops the worker processes.
+        """
+        self.join()
+        self.executor.shutdown()
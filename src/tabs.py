@@ -0,0 +1,255 @@
+"""Crawls several posts at once in the tabs of a single browser. A WebDriver session only sends commands to its current window,
+so every tab gets a TabDriver that switches to the tab before each command. The commands of all tabs take turns, but the waits
+for new comments and replies, which make up most of a post, overlap.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.remote.webelement import WebElement
+
+from src.instagram_crawler import InstagramCrawler
+from src.workers import CrawlWorkerPool, SynchronizedDatabase
+
+class BrowserLock():
+    """Lock shared by the TabDrivers of one browser. Also remembers the tab the browser is switched to.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.handle = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+class TabElement():
+    """Wraps a WebElement of a TabDriver. Every command of the element is sent from the element's tab.
+    """
+
+    def __init__(self, element, tab):
+        object.__setattr__(self, "_element", element)
+        object.__setattr__(self, "_tab", tab)
+
+    def __getattr__(self, name):
+        if name in ["find_element", "find_elements"]:
+            return lambda by, value: self._tab._find(self._element, by, value, single=name == "find_element")
+        return self._tab._attribute(self._element, name)
+
+    def __eq__(self, other):
+        return isinstance(other, TabElement) and other._element == self._element
+
+    def __hash__(self):
+        return hash(self._element)
+
+class TabDriver():
+    """Stands in for a selenium webdriver and sends every command to one tab of a browser that is shared with other TabDrivers.
+    A command holds the lock of the browser, switches to the tab if another tab sent the last command and runs.
+    The implicit wait is kept per tab and done by polling without the lock, because the timeouts of a session apply to all
+    its tabs and a waiting lookup would block the other tabs. Page loads with get() hold the lock until the page is loaded.
+    """
+
+    def __init__(self, driver, handle, lock, poll_frequency = 0.1):
+        """
+        Args:
+            driver (selenium.webdriver): Driver of the browser. Its implicit wait has to be 0.
+            handle (string): Window handle of the tab.
+            lock (BrowserLock): Lock shared by all TabDrivers of the driver.
+            poll_frequency (float, optional): Seconds between two lookups during the implicit wait. Defaults to 0.1.
+        """
+        object.__setattr__(self, "_driver", driver)
+        object.__setattr__(self, "_handle", handle)
+        object.__setattr__(self, "_lock", lock)
+        object.__setattr__(self, "_poll_frequency", poll_frequency)
+        object.__setattr__(self, "_implicit_wait", 0)
+
+    def __getattr__(self, name):
+        return self._attribute(self._driver, name)
+
+    def _switch(self):
+        """Switches the browser to the tab. Has to be called with the lock held.
+        """
+        if self._lock.handle != self._handle:
+            self._driver.switch_to.window(self._handle)
+            self._lock.handle = self._handle
+
+    def _wrap(self, value):
+        if isinstance(value, TabElement):
+            return value
+        if isinstance(value, WebElement):
+            return TabElement(value, self)
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._wrap(item) for key, item in value.items()}
+        return value
+
+    def _unwrap(self, value):
+        if isinstance(value, TabElement):
+            return value._element
+        if isinstance(value, (list, tuple)):
+            return [self._unwrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._unwrap(item) for key, item in value.items()}
+        return value
+
+    def _attribute(self, obj, name):
+        """Returns a method of obj that runs in the tab, or the value of a property, which is read in the tab as well.
+        """
+        with self._lock:
+            self._switch()
+            value = getattr(obj, name)
+        if not callable(value):
+            return self._wrap(value)
+
+        def in_tab(*args, **kwargs):
+            with self._lock:
+                self._switch()
+                return self._wrap(value(*self._unwrap(args), **self._unwrap(kwargs)))
+        return in_tab
+
+    def _find(self, context, by, value, single):
+        """find_element/find_elements below context with the implicit wait of the tab.
+        """
+        deadline = time.monotonic() + self._implicit_wait
+        while True:
+            with self._lock:
+                self._switch()
+                elements = context.find_elements(by, value)
+            if len(elements) > 0 or time.monotonic() >= deadline:
+                break
+            sleep(self._poll_frequency)
+        if single:
+            if len(elements) == 0:
+                raise NoSuchElementException(f"Unable to locate element: {by}={value}")
+            return self._wrap(elements[0])
+        return self._wrap(elements)
+
+    def find_element(self, by, value):
+        return self._find(self._driver, by, value, single=True)
+
+    def find_elements(self, by, value):
+        return self._find(self._driver, by, value, single=False)
+
+    def implicitly_wait(self, seconds):
+        object.__setattr__(self, "_implicit_wait", seconds)
+
+    def quit(self):
+        """Closes the tab. The browser is quit by the TabPool.
+        """
+        with self._lock:
+            self._switch()
+            self._driver.close()
+            self._lock.handle = None
+
+class TabPool(CrawlWorkerPool):
+    """Crawls posts in several tabs of one browser instead of one browser per worker, which saves the memory of the other browsers.
+    The tabs are asyncio tasks of an event loop in a background thread. Every tab has an InstagramCrawler on its TabDriver and
+    runs the steps of crawl_post_steps() in its own thread, the event loop hands out the posts and lets one tab at a time extract
+    the comments of its post, so the extraction commands don't have to take turns with those of other extracting tabs.
+    The browser logs in once, in the first tab, the other tabs share its cookies.
+    """
+
+    def __init__(self, make_driver, DB, tabs, login = True, crawler_kwargs = {}, journal = None, make_tab_driver = None, profile = None):
+        """
+        Args:
+            make_driver (function): Called without arguments once, returns the selenium.webdriver of the browser.
+            DB (database object): Database shared by all tabs.
+            tabs (int): Number of tabs crawling in parallel.
+            login (bool, optional): If True, logs in with refresh_crawler() in the first tab before crawling. Defaults to True.
+            crawler_kwargs (dict, optional): Additional keyword arguments for InstagramCrawler. Defaults to {}.
+            journal (src.journal.CrawlJournal, optional): Journal to record the state of every post in. Defaults to None.
+            make_tab_driver (function, optional): Called with every TabDriver, returns the driver of the tab's crawler, e.g. to wrap it
+                in a src.tracing.TracingDriver. Defaults to None (the TabDriver is used).
+            profile (src.browser.DriverProfile, optional): Profile the browser was started with. Its CDP settings, e.g. the blocked
+                media urls, only reach the tab that is current when they are sent, so they are applied again to every opened tab.
+                Defaults to None.
+        """
+        super().__init__(make_driver, DB, tabs, login, crawler_kwargs, journal)
+        self.make_tab_driver = make_tab_driver
+        self.profile = profile
+
+    def _targets(self, schedule, account_name):
+        return [lambda: asyncio.run(self._crawl_tabs(schedule, account_name))]
+
+    def _open_tabs(self, driver, tabs):
+        """Opens the tabs and returns their window handles, the first one is the window the browser started with.
+        The profile of the pool is applied to every new tab.
+        """
+        driver.implicitly_wait(0)
+        handles = [driver.current_window_handle]
+        for _ in range(tabs - 1):
+            driver.switch_to.new_window("tab")
+            handle = driver.current_window_handle
+            driver.switch_to.window(handle)
+            if self.profile is not None:
+                self.profile.apply(driver)
+            handles.append(handle)
+        return handles
+
+    async def _crawl_tabs(self, schedule, account_name):
+        try:
+            driver = self.make_driver()
+        except Exception as e:
+            print("Exception while starting the browser: ", e)
+            return
+        with self.lock:
+            self.drivers.append(driver)
+        loop = asyncio.get_running_loop()
+        browser_lock = BrowserLock()
+        tabs = min(self.workers, len(schedule))
+        executors = [ThreadPoolExecutor(max_workers=1) for _ in range(tabs)]
+        try:
+            handles = await loop.run_in_executor(executors[0], self._open_tabs, driver, tabs)
+            crawlers = []
+            for handle in handles:
+                tab = TabDriver(driver, handle, browser_lock)
+                tab_driver = self.make_tab_driver(tab) if self.make_tab_driver is not None else tab
+                crawlers.append(InstagramCrawler(tab_driver, SynchronizedDatabase(self.DB, self.lock), **self.crawler_kwargs))
+            if self.login:
+                await loop.run_in_executor(executors[0], crawlers[0].refresh_crawler)
+            extraction = asyncio.Lock()
+            await asyncio.gather(*[self._crawl_tab(crawler, executor, extraction, schedule, account_name) for crawler, executor in zip(crawlers, executors)])
+        except Exception as e:
+            print("Exception while crawling in tabs: ", e)
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=False)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    async def _crawl_tab(self, crawler, executor, extraction, schedule, account_name):
+        """Crawls posts in one tab until the schedule is empty or the pool is stopped. Every step of a post runs in the tab's executor.
+        """
+        loop = asyncio.get_running_loop()
+        while not self.stop.is_set():
+            post_url = await loop.run_in_executor(executor, schedule.next)
+            if post_url is None:
+                return
+            if self.stop.is_set():
+                schedule.release(post_url)
+                return
+            self._start_post(post_url)
+            steps = crawler.crawl_post_steps(post_url, account_name)
+            try:
+                step = None
+                while True:
+                    if step == "replies":
+                        async with extraction:
+                            step = await loop.run_in_executor(executor, next, steps, None)
+                    else:
+                        step = await loop.run_in_executor(executor, next, steps, None)
+                    if step is None:
+                        break
+                self._post_done(post_url, crawler)
+            except Exception as e:
+                self._post_failed(schedule, crawler.DB, post_url, e)
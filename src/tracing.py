@@ -0,0 +1,257 @@
+"""Wrappers around a selenium webdriver that count and time every WebDriver command and can record the commands with their
+responses to a file. A recording can be replayed with ReplayDriver without a browser, e.g. to reproduce the crawl of a slow post.
+"""
+
+import hashlib
+import json
+import time
+from collections import deque
+
+from selenium.common import exceptions as selenium_exceptions
+from selenium.webdriver.remote.webelement import WebElement
+
+RECORDING_VERSION = 1
+
+def script_reference(script):
+    """Scripts are recorded by their hash, the same script gets the same reference.
+    """
+    return {"__script__": hashlib.sha1(script.encode()).hexdigest()[:16]}
+
+class TracedElement():
+    """Wraps a WebElement of a TracingDriver. Every method call and property access goes through the driver's tracer.
+    """
+
+    def __init__(self, element, tracer, ref):
+        object.__setattr__(self, "_element", element)
+        object.__setattr__(self, "_tracer", tracer)
+        object.__setattr__(self, "_ref", ref)
+
+    def __getattr__(self, name):
+        return self._tracer._attribute(self._ref, self._element, name)
+
+    def __eq__(self, other):
+        return isinstance(other, TracedElement) and other._ref == self._ref
+
+    def __hash__(self):
+        return hash(self._ref)
+
+class TracingDriver():
+    """Proxy for the driver passed to InstagramCrawler. Every command is timed and added to the profiler as phase "wd.[command]",
+    so the per post events of the profiler show how many round trips each post needed and how long they took.
+    If record_path is set, every command, its arguments and its response or exception are appended to that file as json lines.
+    """
+
+    def __init__(self, driver, profiler = None, record_path = None):
+        """
+        Args:
+            driver (selenium.webdriver): Driver to wrap.
+            profiler (src.profiling.CrawlProfiler, optional): Profiler the command durations are added to. Defaults to None.
+            record_path (string, optional): Path of the recording. The file is overwritten. Defaults to None (nothing is recorded).
+        """
+        object.__setattr__(self, "_driver", driver)
+        object.__setattr__(self, "_profiler", profiler)
+        object.__setattr__(self, "_refs", {})
+        object.__setattr__(self, "_fp", None)
+        if record_path is not None:
+            fp = open(record_path, "w")
+            fp.write(json.dumps({"version": RECORDING_VERSION}) + "\n")
+            object.__setattr__(self, "_fp", fp)
+
+    def __getattr__(self, name):
+        return self._attribute(0, self._driver, name)
+
+    def _wrap(self, value):
+        """Wraps returned WebElements, also inside lists and dicts returned by execute_script.
+        """
+        if isinstance(value, WebElement):
+            ref = self._refs.setdefault(value.id, len(self._refs) + 1)
+            return TracedElement(value, self, ref)
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._wrap(item) for key, item in value.items()}
+        return value
+
+    def _unwrap(self, value):
+        if isinstance(value, TracedElement):
+            return value._element
+        if isinstance(value, (list, tuple)):
+            return [self._unwrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._unwrap(item) for key, item in value.items()}
+        return value
+
+    def _serialize(self, value):
+        if isinstance(value, TracedElement):
+            return {"__element__": value._ref}
+        if isinstance(value, (list, tuple)):
+            return [self._serialize(item) for item in value]
+        if isinstance(value, dict):
+            return {str(key): self._serialize(item) for key, item in value.items()}
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
+    def _record(self, target, command, args, kwargs, result, error, seconds):
+        if command == "execute_script" and len(args) > 0:
+            args = (script_reference(args[0]),) + tuple(args[1:])
+        line = {"t": target, "c": command, "a": self._serialize(args), "k": self._serialize(kwargs), "s": round(seconds, 6)}
+        if error is not None:
+            line["e"] = [type(error).__name__, str(error)]
+        else:
+            line["r"] = self._serialize(result)
+        self._fp.write(json.dumps(line) + "\n")
+
+    def _attribute(self, target, obj, name):
+        """Returns a traced method or the traced value of a property of the driver (target 0) or of an element.
+        """
+        start = time.perf_counter()
+        try:
+            value = getattr(obj, name)
+        except Exception as e:
+            self._finish(target, name, (), {}, None, e, start)
+            raise
+        if not callable(value):
+            # properties like WebElement.text are WebDriver commands as well
+            value = self._wrap(value)
+            self._finish(target, name, (), {}, value, None, start)
+            return value
+
+        def traced(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = self._wrap(value(*self._unwrap(args), **self._unwrap(kwargs)))
+            except Exception as e:
+                self._finish(target, name, args, kwargs, None, e, start)
+                raise
+            self._finish(target, name, args, kwargs, result, None, start)
+            return result
+        return traced
+
+    def _finish(self, target, command, args, kwargs, result, error, start):
+        seconds = time.perf_counter() - start
+        if self._profiler is not None:
+            self._profiler.add("wd." + command, seconds)
+        if self._fp is not None:
+            self._record(target, command, args, kwargs, result, error, seconds)
+
+    def close_recording(self):
+        if self._fp is not None:
+            self._fp.close()
+            object.__setattr__(self, "_fp", None)
+
+    def quit(self):
+        try:
+            return self._attribute(0, self._driver, "quit")()
+        finally:
+            self.close_recording()
+
+class ReplayError(Exception):
+    """Raised when the replayed crawl sends a command that isn't in the recording.
+    """
+
+class ReplayElement():
+    """Element of a ReplayDriver, answers with the recorded responses of the element with the same reference.
+    """
+
+    def __init__(self, replay, ref):
+        object.__setattr__(self, "_replay", replay)
+        object.__setattr__(self, "_ref", ref)
+
+    def __getattr__(self, name):
+        return self._replay._attribute(self._ref, name)
+
+    def __eq__(self, other):
+        return isinstance(other, ReplayElement) and other._ref == self._ref
+
+    def __hash__(self):
+        return hash(self._ref)
+
+class ReplayDriver():
+    """Stands in for a selenium webdriver and answers every command with the response recorded by TracingDriver.
+    Responses are looked up by target, command and arguments, in recorded order, so the same crawl code gets the same responses
+    without a browser. Commands that are sent more often than recorded, e.g. by waits that poll faster without the browser's
+    latency, get the last recorded response again. With realtime=True, every response takes as long as it did when recording.
+    """
+
+    PROPERTIES = ["text", "tag_name", "id", "title", "current_url", "page_source", "session_id", "size", "location", "rect"]
+
+    def __init__(self, path, profiler = None, realtime = False):
+        """
+        Args:
+            path (string): Path of a recording written by TracingDriver.
+            profiler (src.profiling.CrawlProfiler, optional): Profiler the replayed command durations are added to. Defaults to None.
+            realtime (bool, optional): If True, sleeps for the recorded duration of every command. Defaults to False.
+        """
+        object.__setattr__(self, "_profiler", profiler)
+        object.__setattr__(self, "_realtime", realtime)
+        object.__setattr__(self, "_responses", {})
+        object.__setattr__(self, "_last", {})
+        object.__setattr__(self, "_properties", set())
+        with open(path, "r") as fp:
+            header = json.loads(fp.readline())
+            if header.get("version") != RECORDING_VERSION:
+                raise ValueError(f"Unsupported recording version: {header.get('version')}")
+            for line in fp:
+                record = json.loads(line)
+                key = self._key(record["t"], record["c"], record["a"], record["k"])
+                self._responses.setdefault(key, deque()).append(record)
+                if len(record["a"]) == 0 and len(record["k"]) == 0 and record["c"] in self.PROPERTIES:
+                    self._properties.add((record["t"], record["c"]))
+
+    @staticmethod
+    def _key(target, command, args, kwargs):
+        return (target, command, json.dumps(args, sort_keys=True), json.dumps(kwargs, sort_keys=True))
+
+    def __getattr__(self, name):
+        return self._attribute(0, name)
+
+    def _serialize(self, value):
+        if isinstance(value, ReplayElement):
+            return {"__element__": value._ref}
+        if isinstance(value, (list, tuple)):
+            return [self._serialize(item) for item in value]
+        if isinstance(value, dict):
+            return {str(key): self._serialize(item) for key, item in value.items()}
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
+    def _deserialize(self, value):
+        if isinstance(value, dict):
+            if set(value) == {"__element__"}:
+                return ReplayElement(self, value["__element__"])
+            return {key: self._deserialize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._deserialize(item) for item in value]
+        return value
+
+    def _respond(self, target, command, args, kwargs):
+        if command == "execute_script" and len(args) > 0:
+            args = (script_reference(args[0]),) + tuple(args[1:])
+        key = self._key(target, command, self._serialize(args), self._serialize(kwargs))
+        queue = self._responses.get(key)
+        if queue:
+            record = queue.popleft()
+            self._last[key] = record
+        elif key in self._last:
+            record = self._last[key]
+        else:
+            raise ReplayError(f"Command {command} with arguments {key[2]} of {'the driver' if target == 0 else f'element {target}'} is not in the recording.")
+
+        if self._realtime:
+            time.sleep(record["s"])
+        if self._profiler is not None:
+            self._profiler.add("wd." + command, record["s"])
+        if "e" in record:
+            name, message = record["e"]
+            error = getattr(selenium_exceptions, name, None)
+            if not (isinstance(error, type) and issubclass(error, Exception)):
+                raise ReplayError(f"{name}: {message}")
+            raise error(message)
+        return self._deserialize(record["r"])
+
+    def _attribute(self, target, name):
+        if (target, name) in self._properties:
+            return self._respond(target, name, (), {})
+        return lambda *args, **kwargs: self._respond(target, name, args, kwargs)
@@ -0,0 +1,104 @@
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+import random
+import time
+from time import sleep
+import config
+
+# script returning the number of network requests the page has finished so far
+RESOURCE_COUNT_SCRIPT = "return window.performance.getEntriesByType('resource').length"
+
+class WaitBudget():
+    """Timeout budget of one crawler operation (e.g. clicking "Load more comments"). Used by wait_for_growth() instead of fixed sleeps.
+    """
+
+    def __init__(self, timeout = 10, appear = 1, idle = 2, floor = 0, jitter = 0, max_stalls = 3, poll_frequency = 0.1):
+        """
+        Args:
+            timeout (int, optional): Maximum seconds to wait for the page to react to an action. Defaults to 10.
+            appear (int, optional): Seconds to wait for a button that isn't rendered yet. Defaults to 1.
+            idle (int, optional): Seconds without new network requests and without DOM changes after which the page is considered idle. Defaults to 2.
+            floor (int, optional): Fixed politeness delay in seconds before every action. Defaults to 0.
+            jitter (int, optional): Maximum random delay in seconds added to the floor. Defaults to 0.
+            max_stalls (int, optional): Number of actions in a row without any effect after which the operation gives up. Defaults to 3.
+            poll_frequency (float, optional): Seconds between two checks of the page. Defaults to 0.1.
+        """
+        self.timeout = timeout
+        self.appear = appear
+        self.idle = idle
+        self.floor = floor
+        self.jitter = jitter
+        self.max_stalls = max_stalls
+        self.poll_frequency = poll_frequency
+
+    @classmethod
+    def from_config(cls, name):
+        """Creates the budget for the operation with the given name from WAIT_BUDGETS in config.py. Missing entries use the defaults.
+        """
+        return cls(**getattr(config, "WAIT_BUDGETS", {}).get(name, {}))
+
+    def politeness_delay(self):
+        """Sleeps floor plus a random share of jitter seconds. Doesn't sleep with the default budget.
+        """
+        delay = self.floor + random.uniform(0, self.jitter)
+        if delay > 0:
+            sleep(delay)
+
+class NetworkIdle():
+    """Tracks whether the page went quiet: no finished network requests and no change of the measured value for budget.idle seconds.
+    Falls back to only watching the measured value if the driver can't run the resource timing script.
+    """
+
+    def __init__(self, driver, idle):
+        self.driver = driver
+        self.idle = idle
+        self.last_state = None
+        self.since = time.monotonic()
+
+    def resource_count(self):
+        try:
+            return self.driver.execute_script(RESOURCE_COUNT_SCRIPT)
+        except Exception:
+            return None
+
+    def is_idle(self, value):
+        state = (value, self.resource_count())
+        now = time.monotonic()
+        if state != self.last_state:
+            self.last_state = state
+            self.since = now
+            return False
+        return now - self.since >= self.idle
+
+def wait_for_growth(driver, budget, measure, previous, finished = None):
+    """Waits until the page reacted to an action instead of sleeping a fixed time. Returns as soon as one of these happens:
+    the measured value grew ("grown"), the finished condition is met ("finished"), the page went idle without any change ("idle")
+    or the budget's timeout ran out ("timeout").
+
+    Args:
+        driver (selenium.webdriver): Selenium webdriver object. Its implicit wait should be 0.
+        budget (WaitBudget): Timeout budget of the operation.
+        measure (function): Called with the driver, returns a number that grows when the page loaded new content (e.g. number of comments).
+        previous (number): Value of measure before the action.
+        finished (function, optional): Called with the driver, returns True if the operation is complete (e.g. the button disappeared). Defaults to None.
+
+    Returns:
+        string: "grown", "finished", "idle" or "timeout".
+    """
+    network = NetworkIdle(driver, budget.idle)
+
+    def changed(driver):
+        value = measure(driver)
+        if value > previous:
+            return "grown"
+        if finished is not None and finished(driver):
+            return "finished"
+        if network.is_idle(value):
+            return "idle"
+        return False
+
+    try:
+        return WebDriverWait(driver, budget.timeout, poll_frequency=budget.poll_frequency).until(changed)
+    except TimeoutException:
+        return "timeout"
@@ -0,0 +1,115 @@
+import time
+from time import sleep
+
+from src.journal import CrawlJournal, RetrySchedule
+
+class AccountWatcher():
+    """Polls the account pages of monitored accounts and crawls only the posts that were published since the last check.
+    The known post urls of every account are the ones in its crawl journal ./data/[account name]-journal.jsonl, so a restarted
+    watcher continues where it stopped. Scrolling an account page stops at the first run of known posts instead of at the end of the page.
+    Posts that failed are retried in the next checks until they reach max_attempts.
+    """
+
+    def __init__(self, crawler, accounts, make_database, interval = 3600, journal_directory = "./data/", stop_after_known = 6, max_attempts = 3):
+        """
+        Args:
+            crawler (InstagramCrawler): Crawler used for all accounts, its database is replaced per account.
+            accounts (list of strings): Names of the monitored accounts.
+            make_database (function): Called with an account name, returns the database object of that account.
+            interval (int, optional): Seconds between the starts of two checks of the same account. Defaults to 3600.
+            journal_directory (str, optional): Directory of the crawl journals. Defaults to "./data/".
+            stop_after_known (int, optional): Number of known posts in a row that ends scrolling an account page. Defaults to 6.
+            max_attempts (int, optional): Maximum number of attempts per post, counted across checks and restarts. Defaults to 3.
+        """
+        if len(accounts) == 0:
+            raise ValueError("No accounts to watch.")
+        self.crawler = crawler
+        self.accounts = list(dict.fromkeys(accounts))
+        self.make_database = make_database
+        self.interval = interval
+        self.journal_directory = journal_directory
+        self.stop_after_known = stop_after_known
+        self.max_attempts = max_attempts
+        self.databases = {}
+        self.journals = {}
+
+    def journal(self, account_name):
+        if account_name not in self.journals:
+            self.journals[account_name] = CrawlJournal(self.journal_directory + account_name + "-journal.jsonl")
+        return self.journals[account_name]
+
+    def database(self, account_name):
+        if account_name not in self.databases:
+            self.databases[account_name] = self.make_database(account_name)
+        return self.databases[account_name]
+
+    def check(self, account_name):
+        """Finds the new posts of an account and crawls them together with earlier posts that aren't done yet.
+
+        Args:
+            account_name (string): Name of the account.
+
+        Returns:
+            list of strings: Urls of the new posts.
+        """
+        journal = self.journal(account_name)
+        known_post_urls = set(journal.post_urls())
+        self.crawler.posts = {}
+        # an account without known posts is scrolled to the end once
+        posts = self.crawler.get_all_posts(account_name, known_post_urls=known_post_urls if len(known_post_urls) > 0 else None, stop_after_known=self.stop_after_known)
+        new_post_urls = [post_url for post_url in posts if post_url not in known_post_urls]
+        journal.add(new_post_urls)
+        print(f"Found {len(new_post_urls)} new post(s) of {account_name}.")
+
+        # failed posts are retried in the next check instead of waiting for a backoff
+        schedule = RetrySchedule(new_post_urls + journal.post_urls(), self.max_attempts, journal=journal)
+        self.crawler.DB = self.database(account_name)
+        while True:
+            post_url = schedule.next()
+            if post_url is None:
+                break
+            journal.start(post_url)
+            try:
+                self.crawler.crawl_post(post_url, account_name)
+                journal.done(post_url)
+            except Exception as e:
+                print(f"Error trying to crawl post with url {post_url}: ", e)
+                journal.fail(post_url, e)
+            except KeyboardInterrupt:
+                journal.release(post_url)
+                raise
+        return new_post_urls
+
+    def run(self, checks = None):
+        """Checks all accounts every interval seconds until interrupted. An account that fails to load is checked again in the next round.
+
+        Args:
+            checks (int, optional): Number of rounds over all accounts. Defaults to None (forever).
+        """
+        finished = 0
+        while checks is None or finished < checks:
+            started = time.monotonic()
+            for account_name in self.accounts:
+                try:
+                    self.check(account_name)
+                except Exception as e:
+                    print(f"Error trying to check account {account_name}: ", e)
+            finished += 1
+            if checks is not None and finished >= checks:
+                break
+            delay = self.interval - (time.monotonic() - started)
+            if delay > 0:
+                print(f"Next check in {delay:.0f}s")
+                sleep(delay)
+
+    def close(self):
+        # the entries of the last snapshots can still be on their way into the databases
+        snapshot_parser = getattr(self.crawler, "snapshot_parser", None)
+        if snapshot_parser is not None:
+            snapshot_parser.join()
+        for journal in self.journals.values():
+            journal.close()
+        for DB in self.databases.values():
+            DB.save_db_state()
+            if hasattr(DB, "close"):
+                DB.close()
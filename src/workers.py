@@ -0,0 +1,263 @@
+import threading
+from functools import partial
+
+from src.instagram_crawler import InstagramCrawler
+from src.journal import RetrySchedule
+
+class SynchronizedDatabase():
+    """Per-worker view on a database that is shared by several crawler threads. Entries of the post that is being crawled are
+    kept in a local buffer and only handed to the shared database, under a lock, when the crawler calls save_db_state() at the
+    end of the post. A post that fails halfway never ends up in the shared database.
+
+    A streaming database (one with streaming = True, e.g. NDJSONInstagramDatabase) gets every entry right away under the lock,
+    so memory stays flat and a crash only loses its unflushed lines. The entries of a failed attempt stay in its files then;
+    their keys are stable, so a retry writes the same keys again and load_ndjson() keeps the last values.
+    """
+
+    def __init__(self, DB, lock):
+        """
+        Args:
+            DB (database object): Shared database object.
+            lock (threading.Lock): Lock guarding every access to the shared database.
+        """
+        self.DB = DB
+        self.lock = lock
+        self.streaming = getattr(DB, "streaming", False)
+        self._buffer = []
+
+    def get_entry(self, idx):
+        with self.lock:
+            return self.DB.get_entry(idx)
+
+    def add_entry(self, post_uuid, post_entry):
+        """Buffers an entry until the next save_db_state() call, or writes it right away to a streaming database.
+        """
+        if self.streaming:
+            with self.lock:
+                self.DB.add_entry(post_uuid, post_entry)
+            return
+        self._buffer.append((post_uuid, post_entry))
+
+    def known_keys(self, post_url):
+        with self.lock:
+            keys = self.DB.known_keys(post_url)
+        return keys | {str(post_uuid) for post_uuid, post_entry in self._buffer if post_entry.get("post_url") == post_url}
+
+    def delete_entry(self, id):
+        with self.lock:
+            return self.DB.delete_entry(id)
+
+    def update_entry(self, id, content):
+        with self.lock:
+            return self.DB.update_entry(id, content)
+
+    def add_entries(self, entries):
+        """Adds the entries of a finished post to the shared database and saves it right away, without the buffer of the post
+        that is being crawled. Used by src.snapshots.SnapshotParser, whose entries arrive while the crawler is on the next post.
+
+        Args:
+            entries (list of tuples): (post_uuid, post_entry) pairs.
+        """
+        with self.lock:
+            for post_uuid, post_entry in entries:
+                self.DB.add_entry(post_uuid, post_entry)
+            self.DB.save_db_state()
+
+    def discard(self):
+        """Drops the buffered entries, e.g. of a post that couldn't be crawled completely.
+        """
+        self._buffer = []
+
+    def save_db_state(self):
+        """Adds the buffered entries to the shared database and saves it.
+        """
+        entries, self._buffer = self._buffer, []
+        with self.lock:
+            for post_uuid, post_entry in entries:
+                self.DB.add_entry(post_uuid, post_entry)
+            self.DB.save_db_state()
+
+class CrawlWorkerPool():
+    """Crawls posts in parallel with several browser drivers. Every worker thread owns one driver and one InstagramCrawler
+    and takes post urls from a shared RetrySchedule until it is empty. All workers write to the same database through SynchronizedDatabase.
+    If a CrawlJournal is given, every state change of a post is recorded in it.
+    """
+
+    PENDING = "pending"
+    IN_PROGRESS = "in progress"
+    DONE = "done"
+    FAILED = "failed"
+    INTERRUPTED = "interrupted"
+    SKIPPED = "skipped"
+
+    def __init__(self, make_driver, DB, workers, login = True, crawler_kwargs = {}, journal = None):
+        """
+        Args:
+            make_driver (function): Called without arguments in every worker, returns a new selenium.webdriver.
+            DB (database object): Database shared by all workers.
+            workers (int): Number of drivers crawling in parallel.
+            login (bool, optional): If True, every worker logs in with refresh_crawler() before crawling. Defaults to True.
+            crawler_kwargs (dict, optional): Additional keyword arguments for InstagramCrawler. Defaults to {}.
+            journal (src.journal.CrawlJournal, optional): Journal to record the state of every post in. Defaults to None.
+        """
+        if workers < 1:
+            raise ValueError("Number of workers has to be at least 1.")
+        self.make_driver = make_driver
+        self.DB = DB
+        self.workers = workers
+        self.login = login
+        self.crawler_kwargs = crawler_kwargs
+        self.journal = journal
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.drivers = []
+        # number of threads that are still crawling
+        self.running = 0
+        self.states = {}
+        self.errors = {}
+
+    def _set_state(self, post_url, state, error = None):
+        with self.lock:
+            self.states[post_url] = state
+            if error is not None:
+                self.errors[post_url] = error
+
+    def _start_post(self, post_url):
+        self._set_state(post_url, self.IN_PROGRESS)
+        if self.journal is not None:
+            self.journal.start(post_url)
+
+    def _post_done(self, post_url, crawler):
+        self._set_state(post_url, self.DONE)
+        if self.journal is not None and not crawler.marks_posts_done:
+            self.journal.done(post_url)
+
+    def _post_failed(self, schedule, DB, post_url, error):
+        """Drops the entries of a failed post and schedules its retry. A post that failed because the crawl is being stopped is
+        put back without counting the attempt.
+        """
+        DB.discard()
+        if self.stop.is_set():
+            self._set_state(post_url, self.INTERRUPTED)
+            schedule.release(post_url)
+            if self.journal is not None:
+                self.journal.release(post_url)
+            return
+        print(f"Error trying to crawl post with url {post_url}: ", error)
+        self._set_state(post_url, self.FAILED, str(error))
+        if self.journal is not None:
+            self.journal.fail(post_url, error)
+        delay = schedule.retry(post_url)
+        if delay is not None:
+            print(f"Retrying {post_url} in {delay:.0f}s")
+
+    def _work(self, schedule, account_name):
+        try:
+            driver = self.make_driver()
+        except Exception as e:
+            print("Exception while starting a worker driver: ", e)
+            return
+        with self.lock:
+            self.drivers.append(driver)
+        DB = SynchronizedDatabase(self.DB, self.lock)
+        crawler = InstagramCrawler(driver, DB, **self.crawler_kwargs)
+        try:
+            if self.login:
+                crawler.refresh_crawler()
+            while not self.stop.is_set():
+                post_url = schedule.next()
+                if post_url is None:
+                    return
+                if self.stop.is_set():
+                    schedule.release(post_url)
+                    return
+                self._start_post(post_url)
+                try:
+                    crawler.crawl_post(post_url, account_name)
+                    self._post_done(post_url, crawler)
+                except Exception as e:
+                    self._post_failed(schedule, DB, post_url, e)
+        finally:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def _abort_drivers(self):
+        """Quits all drivers, which makes the posts that are being crawled fail right away.
+        """
+        with self.lock:
+            drivers = list(self.drivers)
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def _targets(self, schedule, account_name):
+        """Returns the functions that crawl the scheduled posts, each one runs in its own thread.
+        """
+        return [partial(self._work, schedule, account_name) for _ in range(min(self.workers, len(schedule)))]
+
+    def _run(self, target, finished):
+        try:
+            target()
+        finally:
+            with self.lock:
+                self.running -= 1
+                if self.running == 0:
+                    finished.set()
+
+    def crawl(self, post_urls, account_name, max_attempts = 1, backoff = 60, resume = False):
+        """Crawls all posts and blocks until every post is processed. The first KeyboardInterrupt stops handing out new posts and
+        waits for the posts that are being crawled. A second KeyboardInterrupt aborts them, their entries are not saved.
+
+        Args:
+            post_urls (list of strings): Urls of the posts to be crawled.
+            account_name (string): Account name of the posts.
+            max_attempts (int, optional): Maximum number of attempts per post. Defaults to 1.
+            backoff (int, optional): Seconds before the first retry of a failed post, doubled for every further retry. Defaults to 60.
+            resume (bool, optional): If True, posts that are done in the journal or reached max_attempts in earlier runs are skipped. Defaults to False.
+
+        Returns:
+            dict: State of every post url: "done", "failed", "interrupted", "skipped" or "pending" if it wasn't started.
+        """
+        # a stopped pool also ends the backoff waits of the workers
+        schedule = RetrySchedule(post_urls, max_attempts, backoff, self.journal if resume else None, stop=self.stop)
+        for post_url in post_urls:
+            self.states[post_url] = self.PENDING
+        for post_url in schedule.skipped:
+            self.states[post_url] = self.SKIPPED
+
+        # the threads count themselves out instead of being joined: a KeyboardInterrupt during Thread.join() can mark a thread
+        # that is still running as stopped
+        targets = self._targets(schedule, account_name)
+        finished = threading.Event()
+        self.running = len(targets)
+        if self.running == 0:
+            finished.set()
+        for target in targets:
+            threading.Thread(target=self._run, args=(target, finished), daemon=True).start()
+
+        interrupts = 0
+        while not finished.is_set():
+            try:
+                # short timeout so KeyboardInterrupt reaches the main thread
+                finished.wait(timeout=0.5)
+            except KeyboardInterrupt:
+                interrupts += 1
+                self.stop.set()
+                if interrupts == 1:
+                    print("Keyboard interrupt detected. Waiting for the posts that are being crawled, press Ctrl+C again to abort them.")
+                else:
+                    print("Aborting the posts that are being crawled.")
+                    self._abort_drivers()
+
+        with self.lock:
+            return dict(self.states)
+
+    def unfinished(self):
+        """Returns the post urls that are not done, in the order they were handed to crawl().
+        """
+        with self.lock:
+            return [post_url for post_url, state in self.states.items() if state not in [self.DONE, self.SKIPPED]]
@@ -0,0 +1,120 @@
+import unittest
+import json
+import os
+import stat
+import sys
+import tempfile
+import types
+from unittest import mock
+
+from selenium import webdriver
+
+from src.browser import DriverProfile, BLOCKED_URL_PATTERNS, resolve_driver_path
+
+class FakeDriver():
+    """Records the CDP commands sent to it.
+    """
+
+    def __init__(self):
+        self.cdp_commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp_commands.append((command, params))
+
+class TestDriverProfile(unittest.TestCase):
+
+    def test_full_profile_keeps_browser_defaults(self):
+        profile = DriverProfile.from_config("full")
+        options = profile.options()
+        self.assertEqual(options.arguments, [])
+        self.assertEqual(options.page_load_strategy, "normal")
+        driver = FakeDriver()
+        profile.apply(driver)
+        self.assertEqual(driver.cdp_commands, [])
+
+    def test_light_profile(self):
+        profile = DriverProfile.from_config("light")
+        options = profile.options()
+        self.assertEqual(options.page_load_strategy, "eager")
+        for argument in ["--headless=new", "--disable-extensions", "--disable-gpu", "--blink-settings=imagesEnabled=false"]:
+            self.assertIn(argument, options.arguments)
+        self.assertIn(f"--disk-cache-size={32 * 2**20}", options.arguments)
+        driver = FakeDriver()
+        profile.apply(driver)
+        self.assertEqual(driver.cdp_commands, [("Network.enable", {}), ("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})])
+
+    def test_options_are_added_to_given_options(self):
+        options = DriverProfile(headless=True).options(webdriver.ChromeOptions())
+        self.assertIsInstance(options, webdriver.ChromeOptions)
+        self.assertIn("--headless=new", options.arguments)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            DriverProfile.from_config("tiny")
+        with self.assertRaises(ValueError):
+            DriverProfile(page_load_strategy="fast")
+
+class TestResolveDriverPath(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "cache", "msedgedriver.json")
+        self.bin = os.path.join(self.tmp.name, "bin")
+        os.makedirs(self.bin)
+        self.driver_path = self.executable(os.path.join(self.bin, "msedgedriver"))
+        # neither the environment nor the PATH of the host may leak into the tests
+        self.environ = mock.patch.dict(os.environ, {"PATH": os.path.join(self.tmp.name, "empty")})
+        self.environ.start()
+        os.environ.pop("EDGE_DRIVER_PATH", None)
+
+    def tearDown(self):
+        self.environ.stop()
+        self.tmp.cleanup()
+
+    def executable(self, path):
+        with open(path, "w") as fp:
+            fp.write("")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        return path
+
+    def manager(self, path):
+        """Replaces webdriver_manager.microsoft with a module whose driver manager installs path and counts the installs.
+        """
+        installs = []
+        class EdgeChromiumDriverManager():
+            def install(self):
+                installs.append(path)
+                return path
+        module = types.ModuleType("webdriver_manager.microsoft")
+        module.EdgeChromiumDriverManager = EdgeChromiumDriverManager
+        patcher = mock.patch.dict(sys.modules, {"webdriver_manager": types.ModuleType("webdriver_manager"), "webdriver_manager.microsoft": module})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return installs
+
+    def test_explicit_path_and_environment(self):
+        self.assertEqual(resolve_driver_path(self.driver_path, self.cache_path, offline=True), self.driver_path)
+        os.environ["EDGE_DRIVER_PATH"] = self.driver_path
+        self.assertEqual(resolve_driver_path(cache_path=self.cache_path, offline=True), self.driver_path)
+        with self.assertRaises(FileNotFoundError):
+            resolve_driver_path(os.path.join(self.bin, "missing"), self.cache_path)
+
+    def test_manager_result_is_cached(self):
+        installs = self.manager(self.driver_path)
+        self.assertEqual(resolve_driver_path(cache_path=self.cache_path), self.driver_path)
+        with open(self.cache_path) as fp:
+            self.assertEqual(json.load(fp)["path"], self.driver_path)
+        # the next runs use the cache, also offline, until refresh asks the manager again
+        self.assertEqual(resolve_driver_path(cache_path=self.cache_path, offline=True), self.driver_path)
+        self.assertEqual(len(installs), 1)
+        resolve_driver_path(cache_path=self.cache_path, refresh=True)
+        self.assertEqual(len(installs), 2)
+
+    def test_path_lookup_and_offline(self):
+        with self.assertRaises(FileNotFoundError):
+            resolve_driver_path(cache_path=self.cache_path, offline=True)
+        os.environ["PATH"] = self.bin
+        self.assertEqual(resolve_driver_path(cache_path=self.cache_path, offline=True), self.driver_path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,256 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+from src.database import InstagramDatabase, SQLiteInstagramDatabase, open_database, entry_key, load_ndjson, copy_ndjson
+
+def make_entry(i, post_url="https://www.instagram.com/p/test/"):
+    return pd.Series({
+        "post_url": post_url,
+        "is_post": i == 0,
+        "commenter": f"user{i}",
+        "text": f"comment {i}",
+        "replies_to": None,
+        "replies_count": 0,
+        "likes": f"{i} likes",
+        "date": "2022-12-01T01:40:25.000Z",
+        "crawl_time": datetime.now()
+    })
+
+class TestInstagramDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def count_lines(self, DB):
+        with open(DB.path) as fp:
+            return sum(1 for _ in fp)
+
+    def test_buffered_entries_are_visible_before_save(self):
+        DB = InstagramDatabase(self.path, "account")
+        for i in range(3):
+            DB.add_entry(f"uuid-{i}", make_entry(i))
+        self.assertEqual(len(DB.df), 3)
+        self.assertEqual(DB.get_entry(2)["commenter"], "user2")
+        # nothing but the header is on disk until save_db_state() is called
+        self.assertEqual(self.count_lines(DB), 1)
+
+    def test_save_only_appends_new_rows(self):
+        DB = InstagramDatabase(self.path, "account")
+        for i in range(3):
+            DB.add_entry(f"uuid-{i}", make_entry(i))
+        DB.save_db_state()
+        DB.save_db_state()
+        self.assertEqual(self.count_lines(DB), 4)
+        DB.add_entry("uuid-3", make_entry(3))
+        DB.save_db_state()
+        self.assertEqual(self.count_lines(DB), 5)
+
+    def test_reopen_keeps_uuid_as_index(self):
+        DB = InstagramDatabase(self.path, "account")
+        for i in range(3):
+            DB.add_entry(f"uuid-{i}", make_entry(i))
+        DB.save_db_state()
+
+        reopened = InstagramDatabase(self.path, "account")
+        self.assertEqual(list(reopened.df.columns), DB.columns)
+        self.assertEqual(list(reopened.df.index), ["uuid-0", "uuid-1", "uuid-2"])
+        reopened.add_entry("uuid-3", make_entry(3))
+        reopened.save_db_state()
+        self.assertEqual(len(InstagramDatabase(self.path, "account").df), 4)
+
+    def test_full_buffer_is_written_to_disk(self):
+        DB = InstagramDatabase(self.path, "account", buffer_size=2)
+        for i in range(5):
+            DB.add_entry(f"uuid-{i}", make_entry(i))
+        self.assertEqual(self.count_lines(DB), 5)
+        self.assertEqual(len(DB.df), 5)
+
+    def test_known_keys_per_post(self):
+        DB = InstagramDatabase(self.path, "account")
+        DB.add_entry("uuid-0", make_entry(0))
+        DB.add_entry("uuid-1", make_entry(1, post_url="https://www.instagram.com/p/other/"))
+        DB.save_db_state()
+
+        reopened = InstagramDatabase(self.path, "account")
+        self.assertEqual(reopened.known_keys("https://www.instagram.com/p/test/"), {"uuid-0"})
+        reopened.add_entry("uuid-2", make_entry(2))
+        self.assertEqual(reopened.known_keys("https://www.instagram.com/p/test/"), {"uuid-0", "uuid-2"})
+        self.assertEqual(reopened.known_keys("https://www.instagram.com/p/missing/"), set())
+
+    def test_entry_added_again_replaces_the_earlier_row(self):
+        DB = InstagramDatabase(self.path, "account")
+        for i in range(3):
+            DB.add_entry(f"uuid-{i}", make_entry(i))
+        DB.save_db_state()
+        DB.add_entry("uuid-1", make_entry(1).replace("1 likes", "5 likes"))
+        self.assertEqual(len(DB.df), 3)
+        self.assertEqual(DB.get_entry("uuid-1")["likes"], "5 likes")
+        DB.save_db_state()
+
+        reopened = InstagramDatabase(self.path, "account")
+        self.assertEqual(list(reopened.df.index), ["uuid-0", "uuid-2", "uuid-1"])
+        self.assertEqual(reopened.get_entry("uuid-1")["likes"], "5 likes")
+        self.assertEqual(reopened.known_keys("https://www.instagram.com/p/test/"), {"uuid-0", "uuid-1", "uuid-2"})
+
+class TestEntryKey(unittest.TestCase):
+
+    def test_key_is_stable(self):
+        key = entry_key("https://www.instagram.com/p/test/", "user0", "2022-12-01T01:40:25.000Z", "comment 0")
+        self.assertEqual(key, entry_key("https://www.instagram.com/p/test/", "user0", "2022-12-01T01:40:25.000Z", "comment 0"))
+        self.assertNotEqual(key, entry_key("https://www.instagram.com/p/test/", "user0", "2022-12-01T01:40:25.000Z", "comment 1"))
+        self.assertNotEqual(entry_key("url", "a", None, "b"), entry_key("url", "a", "b", None))
+
+class TestSQLiteInstagramDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.DB = open_database(self.tmp.name, "account", "sqlite")
+        for i in range(3):
+            self.DB.add_entry(f"uuid-{i}", make_entry(i))
+        self.DB.save_db_state()
+
+    def tearDown(self):
+        self.DB.close()
+        self.tmp.cleanup()
+
+    def test_get_entry_by_position_and_uuid(self):
+        self.assertEqual(self.DB.get_entry(1)["commenter"], "user1")
+        self.assertEqual(self.DB.get_entry(-1).name, "uuid-2")
+        self.assertEqual(self.DB.get_entry("uuid-0")["text"], "comment 0")
+        self.assertRaises(IndexError, self.DB.get_entry, 3)
+        self.assertRaises(KeyError, self.DB.get_entry, "missing")
+
+    def test_delete_and_update_entry(self):
+        self.DB.update_entry("uuid-1", {"likes": "10 likes"})
+        self.assertEqual(self.DB.get_entry("uuid-1")["likes"], "10 likes")
+        self.assertRaises(ValueError, self.DB.update_entry, "uuid-1", {"unknown": 1})
+        self.DB.delete_entry("uuid-1")
+        self.assertRaises(KeyError, self.DB.get_entry, "uuid-1")
+        self.assertRaises(KeyError, self.DB.delete_entry, "uuid-1")
+        self.assertEqual(len(self.DB.df), 2)
+
+    def test_second_connection_sees_saved_entries(self):
+        other = SQLiteInstagramDatabase(self.tmp.name, "account")
+        other.add_entry("uuid-3", make_entry(3))
+        other.close()
+        self.assertEqual(list(self.DB.df.index), ["uuid-0", "uuid-1", "uuid-2", "uuid-3"])
+
+    def test_known_keys_per_post(self):
+        self.DB.add_entry("uuid-3", make_entry(3, post_url="https://www.instagram.com/p/other/"))
+        self.assertEqual(self.DB.known_keys("https://www.instagram.com/p/test/"), {"uuid-0", "uuid-1", "uuid-2"})
+        self.assertEqual(self.DB.known_keys("https://www.instagram.com/p/other/"), {"uuid-3"})
+
+class TestParquetInstagramDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.DB = open_database(self.tmp.name, "account", "parquet")
+        for i in range(3):
+            self.DB.add_entry(f"uuid-{i}", make_entry(i, post_url=f"https://www.instagram.com/p/{i % 2}/"))
+        entry = make_entry(3)
+        entry["likes"], entry["crawl_time"] = "1,234 likes", datetime(2022, 12, 1)
+        self.DB.add_entry("uuid-3", entry)
+        self.DB.save_db_state()
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def test_entries_are_typed_and_partitioned(self):
+        df = self.DB.df
+        self.assertEqual(len(df), 4)
+        self.assertEqual(str(df["likes"].dtype), "Int64")
+        self.assertEqual(df.loc["uuid-3", "likes"], 1234)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["date"]))
+        self.assertIsInstance(df["commenter"].dtype, pd.CategoricalDtype)
+        self.assertIn("crawl_date=2022-12-01", os.listdir(self.DB.path))
+
+    def test_scan_with_columns_and_filters(self):
+        frame = self.DB.scan(columns=["uuid", "likes"], filters=[("post_url", "==", "https://www.instagram.com/p/1/")])
+        self.assertEqual(list(frame.columns), ["uuid", "likes"])
+        self.assertEqual(list(frame["uuid"]), ["uuid-1"])
+        self.assertEqual(len(self.DB.scan(filters=[("crawl_date", "=", "2022-12-01")])), 1)
+
+    def test_get_entry(self):
+        self.assertEqual(self.DB.get_entry("uuid-1")["commenter"], "user1")
+        self.assertEqual(len(self.DB.get_entry(0)), len(self.DB.columns) + 1)
+        self.assertRaises(KeyError, self.DB.get_entry, "missing")
+        self.assertRaises(IndexError, self.DB.get_entry, 4)
+
+    def test_entry_added_again_replaces_the_earlier_row(self):
+        entry = make_entry(1, post_url="https://www.instagram.com/p/1/")
+        entry["likes"] = "5 likes"
+        self.DB.add_entry("uuid-1", entry)
+        self.DB.save_db_state()
+        df = self.DB.df
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df.loc["uuid-1", "likes"], 5)
+        self.assertEqual(self.DB.get_entry("uuid-1")["likes"], 5)
+        self.assertEqual([self.DB.get_entry(i).name for i in range(4)], list(df.index))
+        self.assertEqual(self.DB.get_entry(-1).name, df.index[-1])
+        self.assertRaises(IndexError, self.DB.get_entry, 4)
+        self.assertEqual(self.DB.known_keys("https://www.instagram.com/p/1/"), {"uuid-1"})
+
+    def test_saves_keep_their_order(self):
+        DB = open_database(self.tmp.name, "ordered", "parquet")
+        for i in range(6):
+            DB.add_entry(f"k{i}", make_entry(i))
+            DB.save_db_state()
+        self.assertEqual(list(DB.df.index), [f"k{i}" for i in range(6)])
+        self.assertEqual([DB.get_entry(i).name for i in range(6)], [f"k{i}" for i in range(6)])
+
+    def test_known_keys_per_post(self):
+        self.assertEqual(self.DB.known_keys("https://www.instagram.com/p/1/"), {"uuid-1"})
+        self.assertEqual(self.DB.known_keys("https://www.instagram.com/p/missing/"), set())
+
+class TestNDJSONInstagramDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def test_entries_are_on_disk_after_flush(self):
+        DB = open_database(self.tmp.name, "account", "ndjson", flush_every=2)
+        for i in range(3):
+            DB.add_entry(f"uuid-{i}", make_entry(i))
+        # two entries were flushed, the third one only by save_db_state()
+        self.assertEqual(len(load_ndjson(DB.path)), 2)
+        DB.save_db_state()
+        df = load_ndjson(DB.path)
+        self.assertEqual(list(df.index), ["uuid-0", "uuid-1", "uuid-2"])
+        self.assertEqual(df.loc["uuid-1", "commenter"], "user1")
+        self.assertEqual(DB.get_entry("uuid-2")["likes"], "2 likes")
+        DB.close()
+
+    def test_rotation_and_cut_off_line(self):
+        DB = open_database(self.tmp.name, "account", "ndjson-gzip", max_file_mb=0.0001, flush_every=1)
+        for i in range(5):
+            DB.add_entry(f"uuid-{i}", make_entry(i, post_url=f"https://www.instagram.com/p/{i % 2}/"))
+        DB.close()
+        self.assertGreater(len(DB.part_paths()), 1)
+        plain = open_database(self.tmp.name, "account", "ndjson")
+        plain.add_entry("uuid-1", make_entry(6))
+        plain.close()
+        with open(plain.part_paths()[-1], "a") as fp:
+            fp.write('{"uuid": "uuid-7", "post_u')
+        # both compressions are read, a line written twice keeps its last values
+        df = load_ndjson(plain.path)
+        self.assertEqual(len(df), 5)
+        self.assertEqual(df.loc["uuid-1", "commenter"], "user6")
+        self.assertEqual(plain.known_keys("https://www.instagram.com/p/0/"), {"uuid-0", "uuid-2", "uuid-4"})
+
+    def test_copy_to_other_backend(self):
+        DB = open_database(self.tmp.name, "account", "ndjson")
+        for i in range(3):
+            DB.add_entry(f"uuid-{i}", make_entry(i))
+        DB.close()
+        target = SQLiteInstagramDatabase(self.tmp.name, "account")
+        self.assertEqual(copy_ndjson(DB.path, target), 3)
+        self.assertEqual(target.get_entry("uuid-1")["text"], "comment 1")
+        target.close()
+
@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from pandas.testing import assert_frame_equal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from fake_driver import FakeDriver, FakeSite
+from src.database import InstagramDatabase
+from src.instagram_crawler import InstagramCrawler
+from src.waits import WaitBudget
+
+def rows(DB):
+    """Rows of a database without the crawl time, by key.
+    """
+    return DB.df.drop(columns=["crawl_time"]).sort_index()
+
+class TestBulkExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.site = FakeSite(n_comments=12, replies_per_comment=2, page_size=5)
+        self.post_url = self.site.post_urls("account")[0]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def crawl(self, name, **kwargs):
+        driver = FakeDriver(self.site)
+        DB = InstagramDatabase(self.directory.name, name)
+        crawler = InstagramCrawler(driver, DB, **kwargs)
+        crawler.wait_budgets = {name: WaitBudget(timeout=2, appear=0.1, idle=0.2) for name in crawler.wait_budgets}
+        crawler.crawl_post(self.post_url, "account")
+        return DB, driver
+
+    def test_bulk_adds_the_entries_of_the_element_path(self):
+        elements, element_driver = self.crawl("elements", extraction="elements")
+        self.assertEqual(len(elements.df), 1 + 12 * 3)
+        for name, kwargs in [("bulk", {}), ("batched", {"extraction_batch_size": 5})]:
+            with self.subTest(name):
+                bulk, bulk_driver = self.crawl(name, extraction="bulk", **kwargs)
+                assert_frame_equal(rows(bulk), rows(elements))
+                self.assertLess(bulk_driver.commands, element_driver.commands)
+
+    def test_crawling_a_post_again_replaces_its_entries(self):
+        first, _ = self.crawl("again", extraction="bulk")
+        # the database is opened again from the csv file, the post is crawled without incremental mode
+        again, _ = self.crawl("again", extraction="bulk")
+        self.assertTrue(again.df.index.is_unique)
+        assert_frame_equal(rows(again), rows(first))
+        key = first.df.index[1]
+        self.assertEqual(again.get_entry(key)["commenter"], first.get_entry(key)["commenter"])
+        self.assertEqual(again.post_stats(self.post_url)["comments"], 12)
+
+if __name__ == '__main__':
+    unittest.main()
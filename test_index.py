@@ -0,0 +1,72 @@
+import unittest
+import tempfile
+from datetime import datetime
+
+from src.database import open_database
+from src.index import EntryIndex
+from src.records import Entry
+
+POST = "https://www.instagram.com/p/1/"
+OTHER = "https://www.instagram.com/p/2/"
+
+def add_thread(DB):
+    """A post with two comments, two replies to the first comment and a comment of the same user on another post.
+    """
+    DB.add_entry("post", Entry(POST, True, "account", "caption", None, 2, "1,234 likes", None, datetime.now()))
+    DB.add_entry("c1", Entry(POST, False, "user1", "first", None, 2, "12 likes", None, datetime.now()))
+    DB.add_entry("c2", Entry(POST, False, "user2", "second", None, 0, "Like", None, datetime.now()))
+    DB.add_entry("r1", Entry(POST, False, "user2", "reply", "c1", None, "1K likes", None, datetime.now()))
+    DB.add_entry("r2", Entry(POST, False, "user3", "reply", "c1", None, "3 likes", None, datetime.now()))
+    DB.add_entry("o1", Entry(OTHER, False, "user2", "elsewhere", None, 0, "1 like", None, datetime.now()))
+
+class TestQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def test_queries_per_backend(self):
+        for backend in ["csv", "sqlite"]:
+            with self.subTest(backend=backend):
+                DB = open_database(self.tmp.name, backend, backend)
+                add_thread(DB)
+                DB.save_db_state()
+                self.assertEqual(list(DB.entries_of_post(POST).index), ["post", "c1", "c2", "r1", "r2"])
+                self.assertEqual(list(DB.entries_of_commenter("user2").index), ["c2", "r1", "o1"])
+                self.assertEqual(list(DB.replies("c1")["text"]), ["reply", "reply"])
+                self.assertEqual(list(DB.thread("c1").index), ["c1", "r1", "r2"])
+                self.assertEqual(list(DB.thread("c2").index), ["c2"])
+                self.assertRaises(KeyError, DB.thread, "missing")
+                self.assertEqual(DB.post_stats(POST), {"comments": 2, "replies": 2, "likes": 1015, "post_likes": 1234})
+                self.assertEqual(DB.post_stats()["comments"].to_dict(), {POST: 2, OTHER: 1})
+                if hasattr(DB, "close"):
+                    DB.close()
+
+    def test_index_is_kept_up_to_date(self):
+        DB = open_database(self.tmp.name, "account")
+        add_thread(DB)
+        DB.save_db_state()
+        reopened = open_database(self.tmp.name, "account")
+        self.assertEqual(reopened.post_stats(POST)["replies"], 2)
+        reopened.add_entry("r3", Entry(POST, False, "user1", "answer", "r1", None, "2 likes", None, datetime.now()))
+        self.assertEqual(list(reopened.thread("c1").index), ["c1", "r1", "r3", "r2"])
+        self.assertEqual(reopened.post_stats(POST), {"comments": 2, "replies": 3, "likes": 1017, "post_likes": 1234})
+        self.assertEqual(reopened.get_entry("r3")["text"], "answer")
+
+class TestEntryIndex(unittest.TestCase):
+
+    def test_replace_and_remove(self):
+        index = EntryIndex()
+        index.add("c1", Entry(POST, False, "user1", "first", None, 0, "5 likes", None, None).as_tuple())
+        index.add("c1", Entry(POST, False, "user9", "edited", None, 0, "7 likes", None, None).as_tuple())
+        self.assertEqual(index.keys("commenter", "user1"), [])
+        self.assertEqual(index.keys("commenter", "user9"), ["c1"])
+        self.assertEqual(index.post_stats[POST].to_dict(), {"comments": 1, "replies": 0, "likes": 7, "post_likes": None})
+        index.remove("c1")
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.by_column["post_url"], {})
+        self.assertEqual(index.post_stats[POST].comments, 0)
+
+if __name__ == '__main__':
+    unittest.main()
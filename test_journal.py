@@ -0,0 +1,94 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+
+from src.journal import CrawlJournal, RetrySchedule
+
+POSTS = ["https://www.instagram.com/p/a/", "https://www.instagram.com/p/b/", "https://www.instagram.com/p/c/"]
+
+class TestCrawlJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "account-journal.jsonl")
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def test_replay_after_restart(self):
+        journal = CrawlJournal(self.path)
+        journal.add(POSTS)
+        journal.start(POSTS[0])
+        journal.done(POSTS[0])
+        journal.start(POSTS[1])
+        journal.fail(POSTS[1], Exception("timeout"))
+        journal.close()
+
+        journal = CrawlJournal(self.path)
+        self.assertTrue(journal.is_done(POSTS[0]))
+        self.assertEqual(journal.get(POSTS[1])["state"], CrawlJournal.FAILED)
+        self.assertEqual(journal.get(POSTS[1])["error"], "timeout")
+        self.assertEqual(journal.summary(POSTS), {"done": 1, "failed": 1, "pending": 1})
+        journal.close()
+
+    def test_ignores_cut_off_line(self):
+        journal = CrawlJournal(self.path)
+        journal.add(POSTS)
+        journal.start(POSTS[0])
+        journal.done(POSTS[0])
+        journal.close()
+        with open(self.path, "a") as fp:
+            fp.write('{"post_url": "https://www.instagram.com/p/b/", "sta')
+
+        journal = CrawlJournal(self.path)
+        self.assertTrue(journal.is_done(POSTS[0]))
+        self.assertEqual(journal.get(POSTS[1])["state"], CrawlJournal.PENDING)
+        journal.close()
+
+    def test_release_does_not_count_attempt(self):
+        journal = CrawlJournal(self.path)
+        journal.start(POSTS[0])
+        journal.release(POSTS[0])
+        self.assertEqual(journal.attempts(POSTS[0]), 0)
+        self.assertEqual(journal.get(POSTS[0])["state"], CrawlJournal.PENDING)
+        journal.close()
+
+class TestRetrySchedule(unittest.TestCase):
+
+    def test_skips_done_and_exhausted_posts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = CrawlJournal(os.path.join(tmp, "journal.jsonl"))
+            journal.start(POSTS[0])
+            journal.done(POSTS[0])
+            journal.start(POSTS[1])
+            journal.fail(POSTS[1], "error")
+            schedule = RetrySchedule(POSTS, max_attempts=1, journal=journal)
+            self.assertEqual(schedule.skipped, POSTS[:2])
+            self.assertEqual(schedule.next(), POSTS[2])
+            self.assertIsNone(schedule.next())
+            journal.close()
+
+    def test_retry_until_max_attempts(self):
+        schedule = RetrySchedule(POSTS[:1], max_attempts=2, backoff=0)
+        self.assertEqual(schedule.next(), POSTS[0])
+        self.assertEqual(schedule.retry(POSTS[0]), 0)
+        self.assertEqual(schedule.next(), POSTS[0])
+        self.assertIsNone(schedule.retry(POSTS[0]))
+        self.assertIsNone(schedule.next())
+
+    def test_stop_ends_the_backoff_wait(self):
+        schedule = RetrySchedule(POSTS[:1], max_attempts=3, backoff=30)
+        self.assertEqual(schedule.next(), POSTS[0])
+        self.assertEqual(schedule.retry(POSTS[0]), 30)
+        threading.Timer(0.1, schedule.stop.set).start()
+        start = time.monotonic()
+        self.assertIsNone(schedule.next())
+        self.assertLess(time.monotonic() - start, 5)
+        # the post is put back without counting the attempt
+        self.assertEqual(len(schedule), 1)
+        self.assertEqual(schedule.attempts[POSTS[0]], 1)
+        self.assertIsNone(schedule.next())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import time
+
+from selenium.common.exceptions import NoSuchElementException
+
+from src.lookup import LookupBudget, SelectorLookup
+from src.profiling import CrawlProfiler
+
+class FakeContext():
+    """Driver or element whose lookups match after the given number of find_elements calls.
+    """
+
+    def __init__(self, match_after = None):
+        self.match_after = match_after
+        self.calls = 0
+
+    def find_elements(self, selector, query):
+        self.calls += 1
+        if self.match_after is not None and self.calls > self.match_after:
+            return ["element"]
+        return []
+
+class TestSelectorLookup(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = CrawlProfiler()
+        self.lookup = SelectorLookup(self.profiler, poll_frequency=0.01)
+        self.lookup.budgets = {"COMMENT_LIKES": LookupBudget(required=False, timeout=0), "COMMENT_TEXT": LookupBudget(required=True, timeout=0.05)}
+
+    def test_optional_miss_returns_right_away(self):
+        context = FakeContext()
+        start = time.monotonic()
+        self.assertIsNone(self.lookup.find(context, "COMMENT_LIKES"))
+        self.assertLess(time.monotonic() - start, 0.01)
+        self.assertEqual(context.calls, 1)
+        self.assertEqual(self.profiler.summary()[1], {"missing.COMMENT_LIKES": 1})
+
+    def test_required_waits_for_element(self):
+        context = FakeContext(match_after=2)
+        self.assertEqual(self.lookup.find(context, "COMMENT_TEXT"), "element")
+        self.assertEqual(context.calls, 3)
+        self.assertEqual(self.profiler.counts["wait.COMMENT_TEXT"], 1)
+
+    def test_required_miss_raises(self):
+        self.assertRaises(NoSuchElementException, self.lookup.find, FakeContext(), "COMMENT_TEXT")
+        self.assertGreaterEqual(self.profiler.totals["wait.COMMENT_TEXT"], 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
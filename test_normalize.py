@@ -0,0 +1,48 @@
+import unittest
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+from src.database import InstagramDatabase
+from src.normalize import NORMALIZED_DTYPES, normalize_frame, parse_counts, parse_dates
+from src.records import Entry
+
+class TestNormalize(unittest.TestCase):
+
+    def test_counts_with_separators_and_abbreviations(self):
+        raw = pd.Series(["1,234 likes", "1.234 Gefällt mir", "1 234 likes", "12.3K likes", "12,3 Tsd.", "2 Mio. Aufrufe", "1 like", "Like", None, 7])
+        self.assertEqual(parse_counts(raw).tolist(), [1234, 1234, 1234, 12300, 12300, 2000000, 1, pd.NA, pd.NA, 7])
+        self.assertEqual(str(parse_counts(raw).dtype), "Int64")
+        self.assertEqual(parse_counts(pd.Series([3, None])).tolist(), [3, pd.NA])
+
+    def test_dates(self):
+        dates = parse_dates(pd.Series(["2022-12-01T01:40:25.000Z", "2022-12-01 01:40:25+00:00", None, "yesterday"]))
+        self.assertEqual(str(dates.dtype), "datetime64[ns, UTC]")
+        self.assertEqual(dates[0], dates[1])
+        self.assertTrue(dates[2:].isna().all())
+
+    def test_frame_gets_explicit_dtypes_and_is_idempotent(self):
+        frame = pd.DataFrame([
+            Entry("https://www.instagram.com/p/1/", True, "account", "caption", None, 2, "12.3K likes", "2022-12-01T01:40:25.000Z", datetime(2022, 12, 2)).to_dict(),
+            Entry("https://www.instagram.com/p/1/", "False", "user", "comment", "uuid-0", None, "Like", None, "2022-12-02 10:00:00").to_dict(),
+        ])
+        normalized = normalize_frame(frame)
+        self.assertEqual({column: str(dtype) for column, dtype in normalized.dtypes.items()}, NORMALIZED_DTYPES)
+        self.assertEqual(normalized["likes"].tolist(), [12300, pd.NA])
+        self.assertEqual(normalized["is_post"].tolist(), [True, False])
+        pd.testing.assert_frame_equal(normalize_frame(normalized), normalized)
+
+    def test_database_normalizes_new_blocks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            DB = InstagramDatabase(directory, "account", buffer_size=2, normalize=True)
+            for i in range(5):
+                DB.add_entry(f"uuid-{i}", Entry("https://www.instagram.com/p/1/", i == 0, f"user{i}", "text", None, 0, f"{i},000 likes", "2022-12-01T01:40:25.000Z", datetime.now()))
+            DB.save_db_state()
+            self.assertEqual(DB.df["likes"].tolist(), [0, 1000, 2000, 3000, 4000])
+            self.assertEqual(str(DB.df["date"].dtype), "datetime64[ns, UTC]")
+
+            reopened = InstagramDatabase(directory, "account", normalize=True)
+            pd.testing.assert_frame_equal(reopened.df, DB.df, check_index_type=False)
+
+if __name__ == '__main__':
+    unittest.main()
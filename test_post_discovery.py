@@ -0,0 +1,76 @@
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from fake_driver import FakeDriver, FakeSite
+from src.instagram_crawler import InstagramCrawler, canonical_post_url
+from src.waits import WaitBudget
+
+class VariantSite(FakeSite):
+    """Account page whose links point to the same posts in several spellings.
+    """
+
+    def post_urls(self, account_name):
+        return [
+            "https://www.instagram.com/p/first/",
+            "https://www.instagram.com/p/first/?igshid=abc",
+            "https://www.instagram.com/reel/first",
+            "https://www.instagram.com/p/second",
+            f"https://www.instagram.com/{account_name}/p/second/#comments",
+        ]
+
+class TestCanonicalPostUrl(unittest.TestCase):
+
+    def test_spellings_of_a_post(self):
+        for url in [
+            "https://www.instagram.com/p/abc/",
+            "https://www.instagram.com/p/abc",
+            "https://www.instagram.com/p/abc/?utm_source=ig_web_copy_link",
+            "https://www.instagram.com/p/abc/#comments",
+            "https://www.instagram.com/reel/abc/",
+            "https://www.instagram.com/reels/abc",
+            "https://www.instagram.com/tv/abc/?igshid=1",
+            "https://www.instagram.com/account/p/abc/",
+            "https://www.instagram.com/p/abc/liked_by/",
+        ]:
+            with self.subTest(url):
+                self.assertEqual(canonical_post_url(url), "https://www.instagram.com/p/abc/")
+
+    def test_other_urls_get_a_trailing_slash(self):
+        self.assertEqual(canonical_post_url("https://www.instagram.com/account?hl=de"), "https://www.instagram.com/account/")
+
+class TestGetAllPosts(unittest.TestCase):
+
+    def get_all_posts(self, site, **kwargs):
+        driver = FakeDriver(site)
+        crawler = InstagramCrawler(driver, None)
+        crawler.refresh_crawler = lambda logged_in = False: None
+        crawler.wait_budgets = {name: WaitBudget(timeout=2, appear=0.1, idle=0.2) for name in crawler.wait_budgets}
+        with redirect_stdout(io.StringIO()):
+            posts = crawler.get_all_posts("account", **kwargs)
+        return posts, driver
+
+    def test_posts_are_deduplicated_by_canonical_url(self):
+        posts, driver = self.get_all_posts(VariantSite())
+        self.assertEqual(list(posts), ["https://www.instagram.com/p/first/", "https://www.instagram.com/p/second/"])
+
+    def test_scrolls_to_the_end_without_known_posts(self):
+        site = FakeSite(n_posts=60, posts_per_scroll=12)
+        posts, driver = self.get_all_posts(site)
+        self.assertEqual(list(posts), site.post_urls("account"))
+
+    def test_stops_after_a_run_of_known_posts(self):
+        site = FakeSite(n_posts=60, posts_per_scroll=12)
+        post_urls = site.post_urls("account")
+        # a pinned known post first, then 20 new posts, then the posts of the last crawl
+        known = {post_urls[0]} | set(post_urls[21:])
+        posts, driver = self.get_all_posts(site, known_post_urls=known, stop_after_known=6)
+        # the new posts reset the run of the pinned post, the first scroll ends with 3 known posts in a row, the second with 15
+        self.assertEqual(list(posts), post_urls[:36])
+        self.assertEqual(driver.page.shown, 36)
+
+if __name__ == '__main__':
+    unittest.main()
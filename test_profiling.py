@@ -0,0 +1,71 @@
+import unittest
+import json
+import os
+import tempfile
+
+from src.profiling import CrawlProfiler, StartupTimer
+
+class TestCrawlProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "account-profile.jsonl")
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def test_post_events_add_up_phases(self):
+        profiler = CrawlProfiler(self.path)
+        profiler.start_post("https://www.instagram.com/p/a/")
+        profiler.add("add_entry", 0.5)
+        profiler.add("add_entry", 0.25)
+        with profiler.phase("navigation"):
+            pass
+        profiler.count("entries", 2)
+        profiler.end_post()
+        profiler.close()
+
+        with open(self.path) as fp:
+            events = [json.loads(line) for line in fp]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["post_url"], "https://www.instagram.com/p/a/")
+        self.assertEqual(events[0]["phases"]["add_entry"], {"seconds": 0.75, "count": 2})
+        self.assertEqual(events[0]["phases"]["navigation"]["count"], 1)
+        self.assertEqual(events[0]["counts"], {"entries": 2})
+
+    def test_summary_percentiles_and_bounded_sample(self):
+        profiler = CrawlProfiler()
+        profiler.SAMPLE_SIZE = 50
+        for i in range(100):
+            profiler.add("add_entry", (i + 1) / 1000)
+        rows, counters = profiler.summary()
+        self.assertEqual(rows[0]["count"], 100)
+        self.assertAlmostEqual(rows[0]["total_s"], 5.05)
+        self.assertEqual(len(profiler.samples["add_entry"]), 50)
+        self.assertEqual(counters, {})
+
+    def test_failed_phase_is_timed(self):
+        profiler = CrawlProfiler()
+        with self.assertRaises(ValueError):
+            with profiler.phase("login"):
+                raise ValueError()
+        self.assertEqual(profiler.counts["login"], 1)
+
+class TestStartupTimer(unittest.TestCase):
+
+    def test_steps_are_added_to_profiler(self):
+        timer = StartupTimer()
+        timer.add("imports", 0.25)
+        with timer.step("database"):
+            pass
+        with timer.step("database"):
+            pass
+        profiler = CrawlProfiler()
+        total = timer.finish(profiler)
+        self.assertGreaterEqual(total, 0)
+        self.assertEqual(list(timer.steps), ["imports", "database"])
+        self.assertEqual(profiler.totals["startup.imports"], 0.25)
+        self.assertEqual(profiler.counts["startup.database"], 1)
+        self.assertEqual(profiler.totals["startup"], total)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import tempfile
+from datetime import datetime
+
+from src.database import InstagramDatabase, open_database
+from src.records import Entry, ENTRY_COLUMNS, entry_values
+
+def make_entry(i):
+    return Entry("https://www.instagram.com/p/test/", i == 0, f"user{i}", f"comment {i}", None, 0, f"{i} likes", "2022-12-01T01:40:25.000Z", datetime(2022, 12, 1, 12))
+
+class TestEntry(unittest.TestCase):
+
+    def test_series_like_access(self):
+        entry = make_entry(1)
+        self.assertEqual(entry.get("commenter"), "user1")
+        self.assertEqual(entry["likes"], "1 likes")
+        self.assertIsNone(entry.get("unknown"))
+        self.assertRaises(KeyError, entry.__getitem__, "unknown")
+        entry["likes"] = "2 likes"
+        self.assertEqual(entry.likes, "2 likes")
+        self.assertEqual(list(entry.to_dict()), ENTRY_COLUMNS)
+        self.assertFalse(hasattr(entry, "__dict__"))
+
+    def test_values_in_column_order(self):
+        entry = make_entry(1)
+        self.assertEqual(entry_values(entry, ENTRY_COLUMNS), entry.as_tuple())
+        self.assertEqual(entry_values(entry, ["text", "commenter"]), ("comment 1", "user1"))
+        self.assertEqual(entry_values(entry.to_dict(), ["text", "commenter"]), ("comment 1", "user1"))
+
+    def test_backends_store_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for backend in ["csv", "sqlite", "ndjson"]:
+                DB = open_database(directory, "account", backend)
+                for i in range(3):
+                    DB.add_entry(f"uuid-{i}", make_entry(i))
+                DB.save_db_state()
+                self.assertEqual(DB.get_entry(1)["commenter"], "user1", backend)
+                self.assertEqual(DB.known_keys("https://www.instagram.com/p/test/"), {"uuid-0", "uuid-1", "uuid-2"})
+                if hasattr(DB, "close"):
+                    DB.close()
+            self.assertEqual(len(InstagramDatabase(directory, "account").df), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import json
+import os
+import tempfile
+import types
+
+from selenium.webdriver.common.by import By
+from src.selector_registry import SelectorRegistry, parse_selector
+
+def make_config(**entries):
+    return types.SimpleNamespace(BASE_URL="https://www.instagram.com/", **entries)
+
+class TestSelectorRegistry(unittest.TestCase):
+
+    def test_parse_selector(self):
+        self.assertEqual(parse_selector("A", "CSS_SELECTOR,article a"), (By.CSS_SELECTOR, "article a", 0))
+        self.assertEqual(parse_selector("A", "XPATH,//h2[contains(text(),'{}')]"), (By.XPATH, "//h2[contains(text(),'{}')]", 1))
+        self.assertRaises(ValueError, parse_selector, "A", "CSS_SELECTR,article a")
+        self.assertRaises(ValueError, parse_selector, "A", "CSS_SELECTOR article a")
+        self.assertRaises(ValueError, parse_selector, "A", "CSS_SELECTOR, ")
+
+    def test_invalid_config_fails_at_construction(self):
+        self.assertRaises(ValueError, SelectorRegistry, make_config(COMMENT_TEXT="CSS_SELECTR,div span"))
+
+    def test_only_selector_values_are_parsed(self):
+        registry = SelectorRegistry(make_config(OFFICIAL_ACCOUNT_NAME="Elon Musk", FAN_ACCOUNT="WDB", SITE="HTTPS://EXAMPLE.COM/a,b", TEXT="CSS_SELECTOR,div span"))
+        self.assertEqual(list(registry.selectors), ["TEXT"])
+
+    def test_required_selectors_are_checked(self):
+        for value in ["css_selector,article a", "CSS_SELECTOR article a"]:
+            with self.subTest(value):
+                with self.assertRaisesRegex(ValueError, "COMMENT_TEXT.*" + value):
+                    SelectorRegistry(make_config(COMMENT_TEXT=value), required=["COMMENT_TEXT"])
+        with self.assertRaisesRegex(ValueError, "COMMENT_TEXT is used by the crawler but missing"):
+            SelectorRegistry(make_config(), required=["COMMENT_TEXT"])
+        # the names of SELECTOR_BUDGETS are required as well
+        with self.assertRaisesRegex(ValueError, "COMMENT_LIKES"):
+            SelectorRegistry(make_config(COMMENT_LIKES="css_selector,span", SELECTOR_BUDGETS={"COMMENT_LIKES": {"timeout": 0}}))
+        registry = SelectorRegistry(make_config(COMMENT_TEXT="CSS_SELECTOR,div span"), required=["COMMENT_TEXT"])
+        self.assertEqual(registry.get("COMMENT_TEXT"), (By.CSS_SELECTOR, "div span"))
+
+    def test_get_with_variables(self):
+        registry = SelectorRegistry(make_config(ACCOUNT="XPATH,//h2[contains(text(),'{}')]", TEXT="CSS_SELECTOR,div span"))
+        self.assertEqual(registry.get("TEXT"), (By.CSS_SELECTOR, "div span"))
+        self.assertEqual(registry.get("ACCOUNT", ["elonmusk"]), (By.XPATH, "//h2[contains(text(),'elonmusk')]"))
+        self.assertNotIn("BASE_URL", registry.selectors)
+        self.assertRaises(KeyError, registry.get, "MISSING")
+
+    def test_watched_overrides_are_reloaded(self):
+        registry = SelectorRegistry(make_config(TEXT="CSS_SELECTOR,div span"))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "overrides.json")
+            with open(path, "w") as fp:
+                json.dump({"TEXT": "XPATH,//span"}, fp)
+            registry.watch(path, check_interval=0)
+            self.assertEqual(registry.get("TEXT"), (By.XPATH, "//span"))
+
+            # invalid overrides keep the previous selectors
+            with open(path, "w") as fp:
+                json.dump({"TEXT": "UNKNOWN,//span"}, fp)
+            os.utime(path, (0, 0))
+            self.assertEqual(registry.get("TEXT"), (By.XPATH, "//span"))
+
+            with open(path, "w") as fp:
+                json.dump({}, fp)
+            os.utime(path, (1, 1))
+            self.assertEqual(registry.get("TEXT"), (By.CSS_SELECTOR, "div span"))
@@ -9,8 +9,8 @@ from selenium import webdriver
 from selenium.webdriver.edge.options import Options
 from selenium.webdriver.edge.service import Service
 from selenium.webdriver.remote.webelement import WebElement
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
 from src.instagram_crawler import InstagramCrawler, get_selector
+from src.browser import DriverProfile, make_driver, resolve_driver_path
 from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import NoSuchElementException
 import config
@@ -40,7 +40,8 @@ class TestInstagramCrawler(unittest.TestCase):
 
     def setUp(self): 
         self.DB = InstagramDatabase(os.getenv("DB_CONNECTION_STRING"), os.getenv("INSTAGRAM_USERNAME"))
-        self.driver = webdriver.ChromiumEdge(service=Service(EdgeChromiumDriverManager().install()))
+        # DRIVER_PROFILE=light runs the test headless without loading media
+        self.driver = make_driver(resolve_driver_path(), DriverProfile.from_config(os.getenv("DRIVER_PROFILE", "full")))
         self.InstagramCrawler = InstagramCrawler(self.driver, self.DB)
         self.TestHelper = TestHelper()
 
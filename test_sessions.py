@@ -0,0 +1,59 @@
+import unittest
+import tempfile
+import time
+
+from src.sessions import SessionStore
+
+class FakeDriver():
+    """Records the calls SessionStore makes to a selenium webdriver.
+    """
+
+    def __init__(self, cookies = [], local_storage = {}):
+        self.cookies = list(cookies)
+        self.local_storage = dict(local_storage)
+        self.visited = []
+
+    def get(self, url): self.visited.append(url)
+
+    def get_cookies(self): return list(self.cookies)
+
+    def add_cookie(self, cookie): self.cookies.append(cookie)
+
+    def execute_script(self, script, *args):
+        if args:
+            self.local_storage.update(args[0])
+            return None
+        return dict(self.local_storage)
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SessionStore(self.tmp.name, "crawler")
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def test_restore_without_session(self):
+        driver = FakeDriver()
+        self.assertFalse(self.store.restore(driver, "https://www.instagram.com/"))
+        self.assertEqual(driver.visited, [])
+
+    def test_save_and_restore(self):
+        cookies = [
+            {"name": "sessionid", "value": "abc", "domain": ".instagram.com", "expiry": int(time.time()) + 3600, "extra": 1},
+            {"name": "old", "value": "x", "domain": ".instagram.com", "expiry": int(time.time()) - 10},
+        ]
+        self.store.save(FakeDriver(cookies, {"key": "value"}))
+
+        driver = FakeDriver()
+        self.assertTrue(self.store.restore(driver, "https://www.instagram.com/"))
+        # expired cookies and unknown keys are not restored
+        self.assertEqual([cookie["name"] for cookie in driver.cookies], ["sessionid"])
+        self.assertNotIn("extra", driver.cookies[0])
+        self.assertEqual(driver.local_storage, {"key": "value"})
+        self.assertEqual(driver.visited, ["https://www.instagram.com/"] * 2)
+
+    def test_clear(self):
+        self.store.save(FakeDriver())
+        self.store.clear()
+        self.assertIsNone(self.store.load())
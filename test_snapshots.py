@@ -0,0 +1,129 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from pandas.testing import assert_frame_equal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from fake_driver import FakeDriver, FakeSite
+from fixtures import comment_html
+from src.database import InstagramDatabase
+from src.extraction import EXTRACT_COMMENTS_SCRIPT
+from src.instagram_crawler import InstagramCrawler
+from src.journal import CrawlJournal
+from src.snapshots import SnapshotParser, SnapshotStore, extraction_selectors, parse_snapshot, read_snapshot
+from src.workers import SynchronizedDatabase
+
+class ThreadRecordingDatabase(InstagramDatabase):
+    """Database that records the thread of every add_entry() call.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def add_entry(self, post_uuid, post_entry):
+        self.threads.add(threading.get_ident())
+        super().add_entry(post_uuid, post_entry)
+
+def multi_line_comment_html(index, replies_per_comment):
+    """comment_html() with a <br> and a newline in the text of every comment and a newline in the text of every reply.
+    """
+    html = comment_html(index, replies_per_comment).replace(f"comment number {index}</span>", f" comment number {index}<br>second  line\nthird line </span>")
+    return html.replace(f"to comment {index}</span>", f"to comment {index}\non two lines</span>")
+
+def rows(DB):
+    """Rows of a database without the crawl time, by key.
+    """
+    return DB.df.drop(columns=["crawl_time"]).sort_index()
+
+class TestSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.site = FakeSite(n_comments=40, replies_per_comment=2)
+        self.post_url = self.site.post_urls("account")[0]
+        self.parser = SnapshotParser(processes=2)
+
+    def tearDown(self):
+        self.parser.close()
+        self.directory.cleanup()
+
+    def crawl(self, name, extraction, **kwargs):
+        DB = InstagramDatabase(self.directory.name, name)
+        crawler = InstagramCrawler(FakeDriver(self.site), DB, extraction=extraction, **kwargs)
+        crawler.crawl_post(self.post_url, "account")
+        return DB
+
+    def test_parse_like_extraction_script(self):
+        driver = FakeDriver(self.site)
+        driver.get(self.post_url)
+        selectors = extraction_selectors()
+        self.assertEqual(parse_snapshot(driver.page_source, selectors), driver.execute_script(EXTRACT_COMMENTS_SCRIPT, selectors, 0, None))
+
+    def test_snapshot_mode_adds_the_entries_of_bulk_mode(self):
+        store = SnapshotStore(os.path.join(self.directory.name, "snapshots"))
+        DB = self.crawl("snapshot", "snapshot", snapshot_store=store, snapshot_parser=self.parser)
+        self.parser.join()
+        bulk = self.crawl("bulk", "bulk")
+        self.assertEqual(len(DB.df), 1 + 40 * 3)
+        assert_frame_equal(rows(DB), rows(bulk))
+
+        header, html = read_snapshot(store.path(self.post_url, "account"))
+        self.assertEqual(header["post_url"], self.post_url)
+        self.assertIn("comment number 39", html)
+
+    def test_multi_line_texts_match_bulk_mode(self):
+        store = SnapshotStore(os.path.join(self.directory.name, "snapshots"))
+        with mock.patch("fake_driver.comment_html", multi_line_comment_html):
+            DB = self.crawl("snapshot", "snapshot", snapshot_store=store, snapshot_parser=self.parser)
+            self.parser.join()
+            bulk = self.crawl("bulk", "bulk")
+        # same texts and therefore the same keys
+        assert_frame_equal(rows(DB), rows(bulk))
+        texts = set(DB.df["text"])
+        self.assertIn("comment number 3\nsecond  line\nthird line", texts)
+        self.assertIn("reply 1 to comment 3\non two lines", texts)
+
+    def test_parse_stored_snapshots_again(self):
+        store = SnapshotStore(os.path.join(self.directory.name, "snapshots"))
+        self.crawl("snapshot", "snapshot", snapshot_store=store)
+        self.assertEqual(store.paths("account"), [store.path(self.post_url, "account")])
+
+        DB = InstagramDatabase(self.directory.name, "parsed")
+        self.assertEqual(self.parser.parse(store.paths("account"), SynchronizedDatabase(DB, threading.Lock())), 1 + 40 * 3)
+        assert_frame_equal(rows(DB), rows(self.crawl("bulk", "bulk")))
+
+        self.parser.parse([os.path.join(self.directory.name, "missing.html.gz")], DB)
+        self.assertEqual(len(self.parser.errors), 1)
+
+    def test_post_is_done_once_its_entries_are_saved(self):
+        store = SnapshotStore(os.path.join(self.directory.name, "snapshots"))
+        journal = CrawlJournal(os.path.join(self.directory.name, "journal.jsonl"))
+        self.parser.journal = journal
+        DB = ThreadRecordingDatabase(self.directory.name, "snapshot")
+        crawler = InstagramCrawler(FakeDriver(self.site), DB, extraction="snapshot", snapshot_store=store, snapshot_parser=self.parser)
+        self.assertTrue(crawler.marks_posts_done)
+        journal.start(self.post_url)
+        crawler.crawl_post(self.post_url, "account")
+        # the snapshot is stored, but its entries are only added by the next add_finished() or join() call
+        self.assertFalse(journal.is_done(self.post_url))
+        self.parser.join()
+        self.assertTrue(journal.is_done(self.post_url))
+        self.assertEqual(len(DB.df), 1 + 40 * 3)
+        # the entries are added by the thread that uses the database, not by the callback thread of the pool
+        self.assertEqual(DB.threads, {threading.get_ident()})
+
+        self.parser.submit(os.path.join(self.directory.name, "missing.html.gz"), DB, "https://www.instagram.com/p/missing/")
+        self.parser.join()
+        self.assertEqual(journal.get("https://www.instagram.com/p/missing/")["state"], CrawlJournal.FAILED)
+        journal.close()
+
+    def test_snapshot_mode_needs_a_store(self):
+        self.assertRaises(ValueError, InstagramCrawler, FakeDriver(self.site), None, extraction="snapshot")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import threading
+import time
+from unittest import mock
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from src.browser import DriverProfile
+from src.tabs import BrowserLock, TabDriver, TabPool
+
+class FakeElement(WebElement):
+    """Element of a FakeBrowser, remembers the window it was found in.
+    """
+
+    def __init__(self, browser, window):
+        super().__init__(browser, f"{window}-element")
+        self.browser = browser
+        self.window = window
+
+    @property
+    def text(self):
+        return self.browser.command(self.window, "text")
+
+class FakeBrowser():
+    """Driver with several windows that records which window every command was sent to and fails commands sent to the wrong one.
+    """
+
+    def __init__(self):
+        self.current_window_handle = "tab0"
+        self.switches = 0
+        self.commands = []
+        self.visible = {"tab0": True}
+        outer = self
+
+        class SwitchTo():
+            def window(self, handle):
+                outer.switches += 1
+                outer.current_window_handle = handle
+
+            def new_window(self, type_hint):
+                outer.current_window_handle = f"tab{len(outer.visible)}"
+                outer.visible[outer.current_window_handle] = True
+        self.switch_to = SwitchTo()
+
+    def command(self, window, name):
+        if window != self.current_window_handle:
+            raise AssertionError(f"{name} of {window} was sent to {self.current_window_handle}")
+        self.commands.append((window, name))
+        return name + " of " + window
+
+    def find_elements(self, by, value):
+        self.command(self.current_window_handle, "find_elements")
+        return [FakeElement(self, self.current_window_handle)] if self.visible[self.current_window_handle] else []
+
+    def execute_script(self, script, *args):
+        return self.command(self.current_window_handle, "execute_script")
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.command(self.current_window_handle, cmd)
+
+    def implicitly_wait(self, seconds):
+        pass
+
+class TestTabDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.browser = FakeBrowser()
+        self.browser.visible["tab1"] = True
+        lock = BrowserLock()
+        self.tabs = [TabDriver(self.browser, "tab0", lock, poll_frequency=0.01), TabDriver(self.browser, "tab1", lock, poll_frequency=0.01)]
+
+    def test_commands_run_in_their_tab(self):
+        first = self.tabs[0].find_element(By.CSS_SELECTOR, "ul")
+        second = self.tabs[1].find_element(By.CSS_SELECTOR, "ul")
+        self.assertEqual(first.text, "text of tab0")
+        self.assertEqual(self.tabs[1].execute_script("return 1"), "execute_script of tab1")
+        self.assertEqual(second.text, "text of tab1")
+        self.assertEqual(first, self.tabs[0].find_elements(By.CSS_SELECTOR, "ul")[0])
+        # the browser only switches when another tab sent the last command
+        self.assertEqual(self.browser.switches, 5)
+        self.tabs[0].execute_script("return 1")
+        self.assertEqual(self.browser.switches, 5)
+
+    def test_implicit_wait_doesnt_block_other_tabs(self):
+        self.browser.visible["tab0"] = False
+        self.tabs[0].implicitly_wait(0.5)
+        waiting = threading.Thread(target=lambda: self.assertRaises(NoSuchElementException, self.tabs[0].find_element, By.CSS_SELECTOR, "ul"))
+        waiting.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        self.assertEqual(len(self.tabs[1].find_elements(By.CSS_SELECTOR, "ul")), 1)
+        self.assertLess(time.monotonic() - start, 0.2)
+        waiting.join()
+
+class FakeCrawler():
+    """Crawler whose steps wait like loading comments does.
+    """
+
+    def __init__(self, driver, DB, **kwargs):
+        self.driver = driver
+        self.DB = DB
+
+    def refresh_crawler(self):
+        pass
+
+    def crawl_post_steps(self, post_url, account_name):
+        self.driver.execute_script("return 1")
+        for step in ["navigation", "comments", "hidden_comments", "replies"]:
+            time.sleep(0.1)
+            yield step
+        if post_url.endswith("broken"):
+            raise ValueError("broken post")
+        self.DB.add_entry(post_url, {"post_url": post_url})
+        yield "extraction"
+        self.DB.save_db_state()
+        yield "save_db_state"
+
+class FakeDatabase():
+
+    def __init__(self):
+        self.entries = []
+
+    def add_entry(self, key, entry):
+        self.entries.append(key)
+
+    def save_db_state(self):
+        pass
+
+class TestTabPool(unittest.TestCase):
+
+    def test_tabs_crawl_in_parallel(self):
+        browser = FakeBrowser()
+        DB = FakeDatabase()
+        post_urls = [f"post{i}" for i in range(6)] + ["broken"]
+        with mock.patch("src.tabs.InstagramCrawler", FakeCrawler):
+            pool = TabPool(lambda: browser, DB, 3, login=False)
+            start = time.monotonic()
+            states = pool.crawl(post_urls, "account")
+            seconds = time.monotonic() - start
+        # 7 posts of 0.4s in 3 tabs
+        self.assertLess(seconds, 7 * 0.4 * 0.6)
+        self.assertEqual(sorted(DB.entries), post_urls[:6])
+        self.assertEqual(states["broken"], TabPool.FAILED)
+        self.assertEqual(pool.unfinished(), ["broken"])
+        self.assertEqual(set(window for window, name in browser.commands), {"tab0", "tab1", "tab2"})
+
+    def test_profile_is_applied_to_every_tab(self):
+        browser = FakeBrowser()
+        profile = DriverProfile(block_media=True)
+        with mock.patch("src.tabs.InstagramCrawler", FakeCrawler):
+            # like src.browser.make_driver(), the first tab gets the profile when the browser starts
+            pool = TabPool(lambda: profile.apply(browser), FakeDatabase(), 3, login=False, profile=profile)
+            pool.crawl([f"post{i}" for i in range(3)], "account")
+        blocked = [window for window, name in browser.commands if name == "Network.setBlockedURLs"]
+        self.assertEqual(sorted(blocked), ["tab0", "tab1", "tab2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import os
+import tempfile
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from src.profiling import CrawlProfiler
+from src.tracing import TracingDriver, ReplayDriver, ReplayError
+
+class FakeElement(WebElement):
+    """WebElement that answers without a browser.
+    """
+
+    def __init__(self, id_, text):
+        super().__init__(None, id_)
+        self._text = text
+
+    @property
+    def text(self): return self._text
+
+    def get_attribute(self, name): return f"{name} of {self._text}"
+
+    def click(self): pass
+
+class FakeDriver():
+
+    def __init__(self):
+        self.elements = [FakeElement("e1", "first"), FakeElement("e2", "second")]
+
+    def get(self, url): pass
+
+    def find_elements(self, by, query): return list(self.elements)
+
+    def find_element(self, by, query):
+        if query == "missing":
+            raise NoSuchElementException("no such element")
+        return self.elements[0]
+
+    def execute_script(self, script, *args): return {"total": len(self.elements), "first": self.elements[0]}
+
+def crawl(driver):
+    """A short crawl that uses every kind of command.
+    """
+    driver.get("https://www.instagram.com/p/a/")
+    texts = [element.text for element in driver.find_elements(By.CSS_SELECTOR, "ul")]
+    first = driver.find_element(By.CSS_SELECTOR, "ul")
+    first.click()
+    try:
+        driver.find_element(By.CSS_SELECTOR, "missing")
+        missing = False
+    except NoSuchElementException:
+        missing = True
+    result = driver.execute_script("return 1", ["css selector", "ul"], 0)
+    return texts, first.get_attribute("datetime"), missing, result["total"], result["first"] in driver.find_elements(By.CSS_SELECTOR, "ul")
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "recording.jsonl")
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def test_commands_are_counted_per_post(self):
+        profiler = CrawlProfiler()
+        profiler.start_post("https://www.instagram.com/p/a/")
+        crawl(TracingDriver(FakeDriver(), profiler))
+        event = profiler.end_post()
+        self.assertEqual(event["phases"]["wd.find_elements"]["count"], 2)
+        self.assertEqual(event["phases"]["wd.text"]["count"], 2)
+        self.assertEqual(event["phases"]["wd.find_element"]["count"], 2)
+
+    def test_replay_returns_recorded_responses(self):
+        driver = TracingDriver(FakeDriver(), record_path=self.path)
+        recorded = crawl(driver)
+        driver.close_recording()
+        self.assertEqual(recorded, (["first", "second"], "datetime of first", True, 2, True))
+        self.assertEqual(crawl(ReplayDriver(self.path)), recorded)
+
+    def test_unknown_command_raises(self):
+        driver = TracingDriver(FakeDriver(), record_path=self.path)
+        crawl(driver)
+        driver.close_recording()
+        self.assertRaises(ReplayError, ReplayDriver(self.path).find_element, By.CSS_SELECTOR, "ol")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import io
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from src.instagram_crawler import InstagramCrawler
+from src.waits import WaitBudget, wait_for_growth
+
+BUTTON = (By.CSS_SELECTOR, "button")
+ITEMS = (By.CSS_SELECTOR, "li")
+
+class ScriptedButton():
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        self.driver.clicks += 1
+        reaction = self.driver.reactions.pop(0) if len(self.driver.reactions) > 0 else []
+        now = time.monotonic()
+        self.driver.changes.extend((now + delay, change) for delay, change in reaction)
+
+class ScriptedDriver():
+    """Page with a number of items, a button and a count of finished network requests. Every click of the button takes the
+    next reaction from reactions: a list of (delay in seconds, change) pairs, change is called with the driver once its delay passed.
+    """
+
+    def __init__(self, items = 0, reactions = None, busy = False):
+        self.items = items
+        self.reactions = list(reactions or [])
+        self.busy = busy
+        self.button = ScriptedButton(self)
+        self.resources = 0
+        self.clicks = 0
+        self.changes = []
+
+    def _update(self):
+        now = time.monotonic()
+        due = [change for at, change in self.changes if at <= now]
+        self.changes = [(at, change) for at, change in self.changes if at > now]
+        for change in due:
+            change(self)
+        if self.busy:
+            # a request finishes between every two checks, the network never goes idle
+            self.resources += 1
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def execute_script(self, script, *args):
+        self._update()
+        return self.resources
+
+    def find_elements(self, by, value):
+        self._update()
+        if (by, value) == BUTTON:
+            return [self.button] if self.button is not None else []
+        return [object()] * self.items
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if len(elements) == 0:
+            raise NoSuchElementException(value)
+        return elements[0]
+
+def load(n):
+    def change(driver):
+        driver.items += n
+    return change
+
+def remove_button(driver):
+    driver.button = None
+
+BUDGET = WaitBudget(timeout=1, appear=0.1, idle=0.2, max_stalls=3, poll_frequency=0.02)
+count_items = lambda driver: len(driver.find_elements(*ITEMS))
+
+class TestWaitForGrowth(unittest.TestCase):
+
+    def test_grown(self):
+        driver = ScriptedDriver(items=5)
+        driver.changes.append((time.monotonic() + 0.05, load(3)))
+        self.assertEqual(wait_for_growth(driver, BUDGET, count_items, 5), "grown")
+
+    def test_finished(self):
+        driver = ScriptedDriver(items=5)
+        driver.changes.append((time.monotonic() + 0.05, remove_button))
+        self.assertEqual(wait_for_growth(driver, BUDGET, count_items, 5, finished=lambda driver: driver.button is None), "finished")
+
+    def test_idle_before_timeout(self):
+        start = time.monotonic()
+        self.assertEqual(wait_for_growth(ScriptedDriver(items=5), BUDGET, count_items, 5), "idle")
+        self.assertLess(time.monotonic() - start, BUDGET.timeout)
+
+    def test_timeout_while_network_is_busy(self):
+        start = time.monotonic()
+        self.assertEqual(wait_for_growth(ScriptedDriver(items=5, busy=True), BUDGET, count_items, 5), "timeout")
+        self.assertGreaterEqual(time.monotonic() - start, BUDGET.timeout)
+
+class TestClickUntilLoaded(unittest.TestCase):
+
+    def click_until_loaded(self, driver, budget = BUDGET):
+        crawler = InstagramCrawler(driver, None)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            clicks = crawler.click_until_loaded(budget, *BUTTON, ITEMS)
+        return clicks, output.getvalue()
+
+    def test_clicks_until_button_is_gone(self):
+        driver = ScriptedDriver(reactions=[[(0.05, load(10))], [(0.05, load(10))], [(0.05, load(10)), (0.05, remove_button)]])
+        clicks, output = self.click_until_loaded(driver)
+        self.assertEqual(clicks, 3)
+        self.assertEqual(driver.items, 30)
+        self.assertNotIn("Gave up", output)
+
+    def test_gives_up_after_max_stalls(self):
+        # the button stays, but clicking it doesn't load anything
+        driver = ScriptedDriver(items=10)
+        clicks, output = self.click_until_loaded(driver)
+        self.assertEqual(clicks, BUDGET.max_stalls)
+        self.assertIn(f"Gave up after {BUDGET.max_stalls} click(s)", output)
+
+    def test_stall_counter_resets_on_growth(self):
+        driver = ScriptedDriver(reactions=[[], [], [(0.05, load(10))], [], [], [(0.05, remove_button)]])
+        clicks, output = self.click_until_loaded(driver)
+        self.assertEqual(clicks, 6)
+        self.assertNotIn("Gave up", output)
+
+    def test_content_after_button_disappeared_is_waited_for(self):
+        # the button disappears right away, the new items arrive after the button wait of the next click would have given up
+        driver = ScriptedDriver(reactions=[[(0, remove_button), (0.15, load(10))]])
+        clicks, output = self.click_until_loaded(driver)
+        self.assertEqual(clicks, 1)
+        self.assertEqual(driver.items, 10)
+
+    def test_finished_is_not_a_stall(self):
+        # the last click removes the button without loading anything, the idle page after it still counts as finished
+        driver = ScriptedDriver(reactions=[[(0, remove_button)]])
+        clicks, output = self.click_until_loaded(driver, WaitBudget(timeout=1, appear=0.1, idle=0.2, max_stalls=1, poll_frequency=0.02))
+        self.assertEqual(clicks, 1)
+        self.assertNotIn("Gave up", output)
+
+if __name__ == '__main__':
+    unittest.main()
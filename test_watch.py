@@ -0,0 +1,66 @@
+import unittest
+import tempfile
+
+from src.watch import AccountWatcher
+
+class FakeCrawler():
+    """Stands in for InstagramCrawler: the account page shows the given posts, newest first.
+    """
+
+    def __init__(self, posts, failing = []):
+        self.account_posts = list(posts)
+        self.failing = set(failing)
+        self.posts = {}
+        self.DB = None
+        self.known_post_urls = None
+        self.crawled = []
+
+    def get_all_posts(self, account_name, post_urls_path = None, known_post_urls = None, stop_after_known = 6):
+        self.known_post_urls = known_post_urls
+        self.posts = {post_url: post_url for post_url in self.account_posts}
+        return self.posts
+
+    def crawl_post(self, post_url, account_name):
+        self.crawled.append(post_url)
+        if post_url in self.failing:
+            raise Exception("post didn't load")
+        return post_url
+
+class FakeDatabase():
+
+    def save_db_state(self): pass
+
+class TestAccountWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self): self.tmp.cleanup()
+
+    def watcher(self, crawler):
+        return AccountWatcher(crawler, ["account"], lambda account_name: FakeDatabase(), interval=0, journal_directory=self.tmp.name + "/", max_attempts=2)
+
+    def test_only_new_posts_are_crawled_after_restart(self):
+        crawler = FakeCrawler(["p/2/", "p/1/"])
+        watcher = self.watcher(crawler)
+        self.assertEqual(watcher.check("account"), ["p/2/", "p/1/"])
+        self.assertIsNone(crawler.known_post_urls)
+        watcher.close()
+
+        crawler = FakeCrawler(["p/3/", "p/2/", "p/1/"])
+        watcher = self.watcher(crawler)
+        self.assertEqual(watcher.check("account"), ["p/3/"])
+        self.assertEqual(crawler.known_post_urls, {"p/1/", "p/2/"})
+        self.assertEqual(crawler.crawled, ["p/3/"])
+        watcher.close()
+
+    def test_failed_posts_are_retried_in_next_check(self):
+        crawler = FakeCrawler(["p/1/"], failing=["p/1/"])
+        watcher = self.watcher(crawler)
+        watcher.run(checks=3)
+        self.assertEqual(crawler.crawled, ["p/1/", "p/1/"])
+        self.assertEqual(watcher.journal("account").get("p/1/")["state"], "failed")
+        watcher.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from pandas.testing import assert_frame_equal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from fake_driver import FakeDriver, FakeSite
+from src.database import InstagramDatabase
+from src.instagram_crawler import InstagramCrawler
+from src.waits import WaitBudget
+
+class CountingDatabase(InstagramDatabase):
+    """Database that records the number of entries at every save_db_state() call.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.saves = []
+
+    def save_db_state(self):
+        self.saves.append(len(self.df))
+        super().save_db_state()
+
+class TestWindowedExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.site = FakeSite(n_comments=50, replies_per_comment=2, page_size=10)
+        self.post_url = self.site.post_urls("account")[0]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def crawl(self, DB, extraction, **kwargs):
+        driver = FakeDriver(self.site)
+        crawler = InstagramCrawler(driver, DB, extraction=extraction, **kwargs)
+        crawler.wait_budgets = {name: WaitBudget(timeout=2, appear=0.1, idle=0.2) for name in crawler.wait_budgets}
+        steps = list(crawler.crawl_post_steps(self.post_url, "account"))
+        return driver, crawler, steps
+
+    def test_windows_add_the_entries_of_bulk_mode(self):
+        DB = CountingDatabase(self.directory.name, "windowed")
+        driver, crawler, steps = self.crawl(DB, "windowed", extraction_window=20)
+        bulk = InstagramDatabase(self.directory.name, "bulk")
+        self.crawl(bulk, "bulk")
+        assert_frame_equal(DB.df.drop(columns=["crawl_time"]).sort_index(), bulk.df.drop(columns=["crawl_time"]).sort_index())
+
+        # 20, 20 and the last 10 comments with 2 replies each, the post entry comes with the last window
+        self.assertEqual(DB.saves, [60, 120, 151])
+        self.assertEqual(steps.count("extraction"), 3)
+        self.assertEqual(crawler.profiler.counters["windows"], 3)
+        # every extracted comment container is empty
+        self.assertNotIn("comment number", driver.page_source)
+
+    def test_incremental_stops_at_known_window(self):
+        DB = InstagramDatabase(self.directory.name, "windowed")
+        self.crawl(DB, "windowed", extraction_window=20)
+        driver, crawler, steps = self.crawl(DB, "windowed", extraction_window=20, incremental=True)
+        self.assertEqual(crawler.new_entries, 0)
+        self.assertEqual(steps.count("extraction"), 1)
+        self.assertEqual(len(DB.df), 151)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import _thread
+import threading
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from fake_driver import FakeDriver, FakeSite
+from src.database import InstagramDatabase, load_ndjson, open_database
+from src.instagram_crawler import InstagramCrawler
+from src.journal import CrawlJournal
+from src.waits import WaitBudget
+from src.records import Entry
+from src.workers import CrawlWorkerPool, SynchronizedDatabase
+
+class QuitRecordingDriver(FakeDriver):
+    """Fake driver that counts its quit() calls.
+    """
+
+    def __init__(self, site):
+        super().__init__(site)
+        self.quits = 0
+
+    def quit(self):
+        self.quits += 1
+        super().quit()
+
+class ScriptedCrawler(InstagramCrawler):
+    """InstagramCrawler with short waits that runs script[post_url](crawler) after the entries of a post are extracted and
+    before they are saved, e.g. to fail on purpose.
+    """
+
+    script = {}
+
+    def __init__(self, driver, DB, **kwargs):
+        super().__init__(driver, DB, **kwargs)
+        self.wait_budgets = {name: WaitBudget(timeout=2, appear=0.1, idle=0.2) for name in self.wait_budgets}
+
+    def extract_comments_with_script(self, post_url, account_name):
+        super().extract_comments_with_script(post_url, account_name)
+        action = self.script.get(post_url)
+        if action is not None:
+            action(self)
+
+def fail_times(n):
+    failures = [n]
+    def fail(crawler):
+        if failures[0] > 0:
+            failures[0] -= 1
+            raise ValueError("broken post")
+    return fail
+
+def interrupt(crawler):
+    _thread.interrupt_main()
+    time.sleep(0.5)
+
+def abort(crawler):
+    interrupt(crawler)
+    _thread.interrupt_main()
+    # the second interrupt quits the driver, every later command of the crawler fails
+    deadline = time.monotonic() + 5
+    while crawler.driver.quits == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    raise ConnectionError("driver quit")
+
+def interrupt_later(crawler):
+    threading.Timer(0.5, _thread.interrupt_main).start()
+
+class TestSynchronizedDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def add(self, DB, n):
+        for i in range(n):
+            DB.add_entry(f"k{i}", Entry("https://www.instagram.com/p/1/", False, f"user{i}", "text", None, 0, "Like", None, None))
+
+    def test_entries_of_a_post_are_buffered(self):
+        shared = open_database(self.directory.name, "account")
+        DB = SynchronizedDatabase(shared, threading.Lock())
+        self.add(DB, 3)
+        self.assertEqual(len(shared.df), 0)
+        self.assertEqual(DB.known_keys("https://www.instagram.com/p/1/"), {"k0", "k1", "k2"})
+        DB.discard()
+        DB.save_db_state()
+        self.assertEqual(len(shared.df), 0)
+
+    def test_streaming_database_gets_entries_right_away(self):
+        shared = open_database(self.directory.name, "account", "ndjson", flush_every=2)
+        DB = SynchronizedDatabase(shared, threading.Lock())
+        self.add(DB, 5)
+        self.assertEqual(DB._buffer, [])
+        # flushed every 2 entries, without save_db_state()
+        self.assertEqual(len(load_ndjson(shared.path)), 4)
+        DB.save_db_state()
+        self.assertEqual(len(load_ndjson(shared.path)), 5)
+        shared.close()
+
+class TestCrawlWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.site = FakeSite(n_comments=5, replies_per_comment=1, n_posts=3)
+        self.post_urls = self.site.post_urls("account")
+        self.DB = InstagramDatabase(self.directory.name, "account")
+        self.journal = CrawlJournal(os.path.join(self.directory.name, "journal.jsonl"))
+        self.drivers = []
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def make_driver(self):
+        driver = QuitRecordingDriver(self.site)
+        self.drivers.append(driver)
+        return driver
+
+    def crawl(self, script, workers, **kwargs):
+        with mock.patch("src.workers.InstagramCrawler", ScriptedCrawler), mock.patch.object(ScriptedCrawler, "script", script):
+            pool = CrawlWorkerPool(self.make_driver, self.DB, workers, login=False, crawler_kwargs={"extraction": "bulk"}, journal=self.journal)
+            states = pool.crawl(self.post_urls, "account", **kwargs)
+        return pool, states
+
+    def posts_in_db(self):
+        return set(self.DB.df["post_url"])
+
+    def test_retry_and_give_up(self):
+        pool, states = self.crawl({self.post_urls[1]: fail_times(1), self.post_urls[2]: fail_times(5)}, 2, max_attempts=2, backoff=0)
+        self.assertEqual(states, {self.post_urls[0]: "done", self.post_urls[1]: "done", self.post_urls[2]: "failed"})
+        self.assertEqual(pool.unfinished(), [self.post_urls[2]])
+        self.assertEqual(pool.errors[self.post_urls[2]], "broken post")
+        # the entries of the failed attempts are discarded, the retried post is saved once
+        self.assertEqual(self.posts_in_db(), set(self.post_urls[:2]))
+        self.assertEqual(len(self.DB.df), 2 * (1 + 5 * 2))
+        self.assertEqual(self.journal.get(self.post_urls[1])["attempts"], 2)
+        self.assertEqual(self.journal.get(self.post_urls[2])["state"], CrawlJournal.FAILED)
+        self.assertEqual(self.journal.get(self.post_urls[2])["attempts"], 2)
+        self.assertTrue(all(driver.quits > 0 for driver in self.drivers))
+
+    def test_first_interrupt_finishes_the_current_post(self):
+        pool, states = self.crawl({self.post_urls[0]: interrupt}, 1)
+        self.assertEqual(states, {self.post_urls[0]: "done", self.post_urls[1]: "pending", self.post_urls[2]: "pending"})
+        self.assertEqual(self.posts_in_db(), {self.post_urls[0]})
+        # the other posts were never started
+        self.assertIsNone(self.journal.get(self.post_urls[1]))
+        self.assertEqual(self.drivers[0].quits, 1)
+
+    def test_second_interrupt_aborts_the_current_post(self):
+        pool, states = self.crawl({self.post_urls[0]: abort}, 1, max_attempts=3)
+        self.assertEqual(states[self.post_urls[0]], "interrupted")
+        self.assertEqual(pool.unfinished(), self.post_urls)
+        self.assertEqual(len(self.DB.df), 0)
+        # the aborted attempt isn't counted
+        self.assertEqual(self.journal.get(self.post_urls[0])["state"], CrawlJournal.PENDING)
+        self.assertEqual(self.journal.get(self.post_urls[0])["attempts"], 0)
+        self.assertGreater(self.drivers[0].quits, 0)
+
+    def test_interrupt_ends_the_backoff_wait(self):
+        # the last post schedules an interrupt for when the worker waits 30s to retry the first one
+        start = time.monotonic()
+        pool, states = self.crawl({self.post_urls[0]: fail_times(1), self.post_urls[2]: interrupt_later}, 1, max_attempts=2, backoff=30)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(pool.unfinished(), [self.post_urls[0]])
+        # the retry that was waited for isn't counted
+        self.assertEqual(self.journal.get(self.post_urls[0])["attempts"], 1)
+
+if __name__ == '__main__':
+    unittest.main()